@@ -0,0 +1,561 @@
+"""
+    Benchmarks for the Dorling cartogram pipeline.
+
+    These functions are meant to be run from the QGIS Python console, e.g.:
+
+        from dorling_cartogram.benchmark import benchmark_simplification
+        benchmark_simplification(iface.activeLayer(), "population", [10, 50, 100])
+
+    Each benchmark prints a small report and returns its rows as a list of dicts.
+
+    Benchmarks on synthetic data (synthetic_dicts) do not need QGIS, e.g.:
+
+        python -c "from dorling_cartogram.benchmark import *; benchmark_broad_phase(*synthetic_dicts(60))"
+        python -c "from dorling_cartogram.benchmark import *; benchmark_schedules(*synthetic_dicts(25, alpha=2))"
+        python -c "from dorling_cartogram.benchmark import *; benchmark_tiled(*synthetic_dicts(60, alpha=2.5))"
+        python -c "from dorling_cartogram.benchmark import *; benchmark_components(*synthetic_dicts(40, alpha=2.5, islands=50))"
+        python -c "from dorling_cartogram.benchmark import *; benchmark_symmetric(*synthetic_dicts(60, alpha=2.5))"
+
+    benchmark_import_time needs the qgis module, but not a running QGIS.
+"""
+import math
+import random
+import time
+
+from .broad_phase import GridIndex, RadiusClassIndex
+
+def benchmark_simplification(layer, field_name, tolerances):
+    """
+    Measure the effect of the snapping/simplification tolerance on preprocessing.
+
+    The reference run uses no tolerance. For every tolerance, the report gives:
+    - the preprocessing time and speedup against the reference
+    - the relative change of the total shared border length
+    - the mean relative change of the border length over pairs found in both runs
+    - the number of neighbour pairs lost and gained
+
+    Args:
+        layer (QgsVectorLayer): Input polygon layer.
+        field_name (str): Field used to compute raw radius.
+        tolerances (list): Tolerances (map units) to compare.
+
+    Returns:
+        list: One dict per tolerance.
+    """
+
+    from .preprocessing import preprocessing
+
+    # --- Reference run ---
+    start_time = time.time()
+    _, reference = preprocessing(layer, field_name)
+    reference_time = time.time() - start_time
+    reference_pairs = border_lengths(reference)
+    reference_total = sum(reference_pairs.values())
+
+    rows = []
+    for tolerance in tolerances:
+        start_time = time.time()
+        _, neighbours_dict = preprocessing(layer, field_name, tolerance=tolerance)
+        elapsed = time.time() - start_time
+        pairs = border_lengths(neighbours_dict)
+        total = sum(pairs.values())
+
+        # Relative change of the border length over pairs found in both runs
+        common = [pair for pair in pairs if pair in reference_pairs and reference_pairs[pair] > 0]
+        changes = [abs(pairs[pair] - reference_pairs[pair]) / reference_pairs[pair] for pair in common]
+
+        rows.append({
+            'tolerance': tolerance,
+            'time': elapsed,
+            'speedup': reference_time / elapsed if elapsed > 0 else float('inf'),
+            'total_change': (total - reference_total) / reference_total if reference_total > 0 else 0.0,
+            'mean_pair_change': sum(changes) / len(changes) if changes else 0.0,
+            'pairs_lost': len(reference_pairs.keys() - pairs.keys()),
+            'pairs_gained': len(pairs.keys() - reference_pairs.keys())
+        })
+
+    # --- Report ---
+    print(f"[DorlingCartogram] Reference preprocessing: {reference_time:.2f} seconds, {len(reference_pairs)} pairs")
+    for row in rows:
+        print(
+            f"[DorlingCartogram] tolerance={row['tolerance']}: {row['time']:.2f} s (x{row['speedup']:.1f}), "
+            f"total border {row['total_change']:+.2%}, mean pair change {row['mean_pair_change']:.2%}, "
+            f"pairs lost {row['pairs_lost']}, gained {row['pairs_gained']}"
+        )
+
+    return rows
+
+def benchmark_render(input_layer, centroid_dict, repeats=5, size=1600, segments=64):
+    """
+    Compare render times of the three Dorling output styles.
+
+    - expression: points sized by the expression 2 * "radius_scaled" (default style)
+    - diameter: points sized by a precomputed 'diameter' field
+    - polygons: real circle polygons
+
+    Each layer is rendered alone over its full extent, 'repeats' times.
+
+    Args:
+        input_layer (QgsVectorLayer): Original polygon layer.
+        centroid_dict (dict): Solved centroid dictionary (after compute_dorling).
+        repeats (int): Number of renders per style.
+        size (int): Output image width and height in pixels.
+        segments (int): Number of segments per circle for the polygon output.
+
+    Returns:
+        list: One dict per style with the best and mean render time.
+    """
+
+    from qgis.core import QgsMapSettings, QgsMapRendererSequentialJob
+    from qgis.PyQt.QtCore import QSize
+    from .layer_builder import create_point_layer, create_circle_layer, style_layer
+
+    # --- Build one layer per style ---
+    expression_layer = create_point_layer(input_layer, centroid_dict, "dorling_expression")
+    style_layer(expression_layer)
+
+    diameter_layer = create_point_layer(input_layer, centroid_dict, "dorling_diameter", diameter=True)
+    style_layer(diameter_layer, diameter_field="diameter")
+
+    polygon_layer = create_circle_layer(input_layer, centroid_dict, "dorling_polygons", segments)
+
+    rows = []
+    for name, layer in (("expression", expression_layer), ("diameter", diameter_layer), ("polygons", polygon_layer)):
+        settings = QgsMapSettings()
+        settings.setLayers([layer])
+        settings.setDestinationCrs(layer.crs())
+        settings.setExtent(layer.extent())
+        settings.setOutputSize(QSize(size, size))
+
+        times = []
+        for _ in range(repeats):
+            job = QgsMapRendererSequentialJob(settings)
+            start_time = time.time()
+            job.start()
+            job.waitForFinished()
+            times.append(time.time() - start_time)
+
+        rows.append({'style': name, 'best': min(times), 'mean': sum(times) / len(times)})
+
+    # --- Report ---
+    for row in rows:
+        print(f"[DorlingCartogram] Render {row['style']}: best {row['best']:.3f} s, mean {row['mean']:.3f} s")
+
+    return rows
+
+def benchmark_broad_phase(centroid_dict, neighbours_dict=None):
+    """
+    Count the candidate pairs returned by the uniform grid (r1 + rmax windows, same as
+    QgsSpatialIndex) and by the radius-class grid for one iteration.
+
+    Args:
+        centroid_dict (dict): Centroid dictionary.
+        neighbours_dict (dict): Unused, accepted so that synthetic_dicts can be unpacked directly.
+
+    Returns:
+        list: One dict per broad phase with the candidate count, true overlaps and query time.
+    """
+
+    rmax = max(props['radius_scaled'] for props in centroid_dict.values())
+
+    rows = []
+    for name, index in (("grid", GridIndex(centroid_dict)), ("radius_class", RadiusClassIndex(centroid_dict))):
+        candidates, overlaps = 0, 0
+        start_time = time.time()
+        for id1, props1 in centroid_dict.items():
+            x1, y1, r1 = props1['x'], props1['y'], props1['radius_scaled']
+            if name == "grid":
+                nearby_ids = index.intersects(x1 - r1 - rmax, y1 - r1 - rmax, x1 + r1 + rmax, y1 + r1 + rmax)
+            else:
+                nearby_ids = index.query(x1, y1, r1)
+            for id2 in nearby_ids:
+                if id2 == id1:
+                    continue
+                candidates += 1
+                props2 = centroid_dict[id2]
+                if math.hypot(props2['x'] - x1, props2['y'] - y1) < r1 + props2['radius_scaled']:
+                    overlaps += 1
+        rows.append({'index': name, 'candidates': candidates, 'overlaps': overlaps, 'time': time.time() - start_time})
+
+    # --- Report ---
+    for row in rows:
+        print(
+            f"[DorlingCartogram] {row['index']}: {row['candidates']} candidate pairs "
+            f"({row['overlaps']} overlapping) in {row['time']:.2f} seconds"
+        )
+    print(f"[DorlingCartogram] Candidate reduction: x{rows[0]['candidates'] / max(rows[1]['candidates'], 1):.1f}")
+
+    return rows
+
+def benchmark_schedules(centroid_dict, neighbours_dict, iterations_list=(50, 100, 200), schedules=None,
+                        friction=0.25, ratio=0.4):
+    """
+    Compare cooling schedules (see schedules.py) at several iteration counts.
+
+    Every run starts from a copy of the same dictionaries. The report gives the quality metrics
+    of each run, then for each schedule the fewest iterations reaching the overlap ratio of the
+    constant schedule at the largest iteration count.
+
+    Args:
+        centroid_dict (dict): Preprocessed centroid dictionary (not modified).
+        neighbours_dict (dict): Neighbour pairs.
+        iterations_list (list): Iteration counts to try.
+        schedules (list): Schedules to compare (defaults to all).
+        friction, ratio (float): Requested (final) parameters.
+
+    Returns:
+        list: One dict per run.
+    """
+
+    from .dorling_core import compute_dorling
+    from .schedules import SCHEDULES
+    from .sweep import score_layout
+
+    schedules = schedules or SCHEDULES
+
+    rows = []
+    for schedule in schedules:
+        for iterations in iterations_list:
+            run_dict = {fid: dict(props) for fid, props in centroid_dict.items()}
+            start_time = time.time()
+            compute_dorling(run_dict, neighbours_dict, friction, ratio, iterations, index='radius_class', schedule=schedule)
+            row = {'schedule': schedule, 'iterations': iterations, 'time': time.time() - start_time}
+            row.update(score_layout(run_dict, neighbours_dict))
+            rows.append(row)
+
+    # --- Report ---
+    for row in rows:
+        print(
+            f"[DorlingCartogram] {row['schedule']}, {row['iterations']} iterations: "
+            f"overlaps {row['overlap_ratio']:.2%} of the area, contacts {row['contacts']:.2%}, "
+            f"displacement {row['displacement_mean']:.2f}, score {row['score']:.4f} ({row['time']:.2f} seconds)"
+        )
+
+    # Iterations needed to match the longest constant run
+    reference = [row for row in rows if row['schedule'] == 'constant' and row['iterations'] == max(iterations_list)]
+    if reference:
+        target = reference[0]['overlap_ratio']
+        for schedule in schedules:
+            reached = [row['iterations'] for row in rows if row['schedule'] == schedule and row['overlap_ratio'] <= target]
+            needed = f"{min(reached)} iterations" if reached else f"more than {max(iterations_list)} iterations"
+            print(f"[DorlingCartogram] {schedule}: {needed} to reach {target:.2%} overlap")
+
+    return rows
+
+def benchmark_tiled(centroid_dict, neighbours_dict, configurations=((4, 4, 1), (4, 4, 5), (8, 8, 1)),
+                    iterations=100, friction=0.25, ratio=0.4):
+    """
+    Compare the tiled solver (see tiled.py) with the single-domain compute_dorling.
+
+    Every run starts from a copy of the same dictionaries. The reference is compute_dorling
+    with the grid broad phase, the same one as the tiles. For each configuration the report gives:
+    - the wall time and its speedup against the reference
+    - the critical path: the sum over exchanges of the CPU time of the slowest tile, i.e. the
+      expected time with one core per process (without the exchanges)
+    - the quality metrics, and the mean distance to the reference positions in mean radii
+
+    Args:
+        centroid_dict (dict): Preprocessed centroid dictionary (not modified).
+        neighbours_dict (dict): Neighbour pairs.
+        configurations (list): (tiles, processes, exchange_every) of each run.
+        iterations (int): Number of iterations of every run.
+        friction, ratio (float): Simulation parameters.
+
+    Returns:
+        list: One dict per run, the reference first.
+    """
+
+    from .dorling_core import compute_dorling
+    from .sweep import score_layout
+    from .tiled import compute_dorling_tiled
+
+    mean_radius = sum(props['radius_scaled'] for props in centroid_dict.values()) / len(centroid_dict)
+
+    # --- Single-domain reference ---
+    reference = {fid: dict(props) for fid, props in centroid_dict.items()}
+    start_time = time.time()
+    compute_dorling(reference, neighbours_dict, friction, ratio, iterations, index='grid')
+    reference_time = time.time() - start_time
+    row = {'tiles': 1, 'processes': 1, 'exchange_every': None, 'time': reference_time, 'critical_path': reference_time, 'difference': 0.0}
+    row.update(score_layout(reference, neighbours_dict))
+    rows = [row]
+
+    # --- Tiled runs ---
+    for tiles, processes, exchange_every in configurations:
+        run_dict = {fid: dict(props) for fid, props in centroid_dict.items()}
+        start_time = time.time()
+        stats = compute_dorling_tiled(run_dict, neighbours_dict, friction, ratio, iterations, tiles, processes, exchange_every)
+        elapsed = time.time() - start_time
+
+        difference = sum(
+            math.hypot(props['x'] - reference[fid]['x'], props['y'] - reference[fid]['y']) for fid, props in run_dict.items()
+        ) / len(run_dict) / mean_radius
+
+        row = {
+            'tiles': stats['tiles'], 'processes': stats['processes'], 'exchange_every': exchange_every,
+            'time': elapsed, 'critical_path': sum(max(seconds.values()) for seconds in stats['tile_seconds']),
+            'difference': difference
+        }
+        row.update(score_layout(run_dict, neighbours_dict))
+        rows.append(row)
+
+    # --- Report ---
+    for row in rows:
+        name = "single domain" if row['exchange_every'] is None else f"{row['tiles']} tiles, {row['processes']} processes, exchange every {row['exchange_every']}"
+        print(
+            f"[DorlingCartogram] {name}: {row['time']:.2f} seconds (speedup {reference_time / row['time']:.2f}), "
+            f"critical path {row['critical_path']:.2f} seconds (speedup {reference_time / row['critical_path']:.2f}), "
+            f"overlaps {row['overlap_ratio']:.2%} of the area, contacts {row['contacts']:.2%}, "
+            f"{row['difference']:.3f} mean radii from the reference"
+        )
+
+    return rows
+
+def benchmark_components(centroid_dict, neighbours_dict, iterations=200, tolerance=1e-3, processes=None,
+                         friction=0.25, ratio=0.4):
+    """
+    Compare solving independent components (see components.py) with one compute_dorling run.
+
+    Every run starts from a copy of the same dictionaries. The report gives the time and quality
+    metrics of both runs, the iterations and CPU time of the largest components, and the
+    critical path: the CPU time of the slowest component, i.e. the expected time with enough cores.
+
+    Args:
+        centroid_dict (dict): Preprocessed centroid dictionary (not modified).
+        neighbours_dict (dict): Neighbour pairs.
+        iterations (int): Number of iterations (maximum for the components).
+        tolerance (float): Convergence check of the components.
+        processes (int): Number of worker processes.
+        friction, ratio (float): Simulation parameters.
+
+    Returns:
+        list: The single run, then the component run.
+    """
+
+    from .components import compute_dorling_components
+    from .dorling_core import compute_dorling
+    from .sweep import score_layout
+
+    # --- Single run over all circles ---
+    run_dict = {fid: dict(props) for fid, props in centroid_dict.items()}
+    start_time = time.time()
+    compute_dorling(run_dict, neighbours_dict, friction, ratio, iterations, index='grid')
+    row = {'mode': 'single', 'time': time.time() - start_time}
+    row['critical_path'] = row['time']
+    row.update(score_layout(run_dict, neighbours_dict))
+    rows = [row]
+
+    # --- Independent components ---
+    run_dict = {fid: dict(props) for fid, props in centroid_dict.items()}
+    start_time = time.time()
+    components = compute_dorling_components(run_dict, neighbours_dict, friction, ratio, iterations, tolerance, processes=processes)
+    row = {'mode': 'components', 'time': time.time() - start_time, 'components': components}
+    row['critical_path'] = max((component['seconds'] for component in components), default=0.0)
+    row.update(score_layout(run_dict, neighbours_dict))
+    rows.append(row)
+
+    # --- Report ---
+    for row in rows:
+        print(
+            f"[DorlingCartogram] {row['mode']}: {row['time']:.2f} seconds, critical path {row['critical_path']:.2f} seconds, "
+            f"overlaps {row['overlap_ratio']:.2%} of the area, contacts {row['contacts']:.2%}"
+        )
+    solved = [component for component in components if component['iterations']]
+    print(
+        f"[DorlingCartogram] {len(components)} components, {len(solved)} solved in workers: "
+        f"{sum(component['seconds'] for component in solved):.2f} CPU seconds in total, "
+        f"iterations from {min((c['iterations'] for c in solved), default=0)} to {max((c['iterations'] for c in solved), default=0)}"
+    )
+
+    return rows
+
+def benchmark_symmetric(centroid_dict, neighbours_dict, iterations=50, friction=0.25, ratio=0.4, index='grid'):
+    """
+    Compare the symmetric pair kernel (kernels.symmetric_iteration) with dorling_iteration.
+
+    Both runs start from a copy of the same dictionaries and the same broad phase
+    (the kernel reproduces its candidates). The report gives, on the starting layout, the number of
+    pair evaluations (distance and overlap) per iteration of each, then the time of the runs and
+    the largest distance between their final positions, in mean radii.
+
+    Args:
+        centroid_dict (dict): Preprocessed centroid dictionary (not modified).
+        neighbours_dict (dict): Neighbour pairs.
+        iterations (int): Number of iterations of each run.
+        friction, ratio (float): Simulation parameters.
+        index (str): Broad phase of both runs, 'grid' or 'radius_class'.
+
+    Returns:
+        list: One dict per kernel.
+    """
+
+    from .dorling_core import compute_dorling, query_index
+    from .kernels import build_neighbour_pairs, centroid_arrays, unique_pairs
+
+    rmax = max(props['radius_scaled'] for props in centroid_dict.values())
+    mean_radius = sum(props['radius_scaled'] for props in centroid_dict.values()) / len(centroid_dict)
+
+    # --- Pair evaluations per iteration ---
+    # Loop: every candidate from each side, then every neighbour from each side
+    spatial_index = RadiusClassIndex(centroid_dict) if index == 'radius_class' else GridIndex(centroid_dict)
+    loop_pairs = sum(
+        len(query_index(spatial_index, props['x'], props['y'], props['radius_scaled'], rmax)) - 1 + len(neighbours_dict.get(fid, ()))
+        for fid, props in centroid_dict.items()
+    )
+    # Kernel: unique pairs, candidates and neighbours merged
+    x, y, r = centroid_arrays(centroid_dict)
+    kernel_pairs = len(unique_pairs(x, y, r, rmax, build_neighbour_pairs(centroid_dict, neighbours_dict), index)[0])
+
+    rows, finals = [], []
+    for attraction, pairs in (('loop', loop_pairs), ('symmetric', kernel_pairs)):
+        run_dict = {fid: dict(props) for fid, props in centroid_dict.items()}
+        start_time = time.time()
+        compute_dorling(run_dict, neighbours_dict, friction, ratio, iterations, index=index, attraction=attraction)
+        rows.append({'kernel': attraction, 'pairs': pairs, 'time': time.time() - start_time})
+        finals.append(run_dict)
+
+    difference = max(
+        math.hypot(props['x'] - finals[1][fid]['x'], props['y'] - finals[1][fid]['y']) for fid, props in finals[0].items()
+    ) / mean_radius
+
+    # --- Report ---
+    for row in rows:
+        print(f"[DorlingCartogram] {row['kernel']}: {row['pairs']} pair evaluations per iteration, {row['time']:.2f} seconds")
+    print(f"[DorlingCartogram] Largest position difference: {difference:.2e} mean radii")
+
+    return rows
+
+def benchmark_import_time(package=None, heavy=('numpy', 'scipy', 'shapely', 'pyproj')):
+    """
+    Measure the cost of loading the plugin module, as QGIS does at startup.
+
+    The plugin submodules are removed from sys.modules first, so that they are imported again.
+    Third-party modules already loaded by QGIS (e.g. numpy) cannot be unloaded: the report
+    only lists the heavy ones that the import newly brought in.
+
+    Args:
+        package (str): Plugin package name (defaults to the package of this module).
+        heavy (tuple): Third-party modules to watch.
+
+    Returns:
+        list: One row { 'seconds', 'plugin_modules', 'heavy_modules' }.
+    """
+
+    import importlib
+    import sys
+
+    package = package or __name__.rpartition('.')[0]
+
+    # Forget the plugin submodules (but not the package itself, nor this module)
+    for name in [name for name in sys.modules if name.startswith(f"{package}.") and name != __name__]:
+        del sys.modules[name]
+    before = set(sys.modules)
+
+    start_time = time.perf_counter()
+    importlib.import_module(f"{package}.dorling_cartogram")
+    seconds = time.perf_counter() - start_time
+
+    loaded = set(sys.modules) - before
+    row = {
+        'seconds': seconds,
+        'plugin_modules': sorted(name for name in loaded if name.startswith(f"{package}.")),
+        'heavy_modules': sorted(name for name in heavy if name in loaded)
+    }
+
+    print(f"[DorlingCartogram] Plugin module imported in {seconds * 1000:.1f} ms")
+    print(f"[DorlingCartogram] Plugin modules loaded: {', '.join(row['plugin_modules'])}")
+    print(f"[DorlingCartogram] Heavy modules loaded: {', '.join(row['heavy_modules']) or 'none'}")
+
+    return [row]
+
+def synthetic_dicts(side=50, alpha=1.2, seed=0, islands=0):
+    """
+    Build preprocessing results for a synthetic layer, without QGIS.
+
+    The layer is a side x side grid of unit squares (rook neighbours share a border of
+    length 1, diagonal ones touch at a corner), with heavy-tailed (Pareto) values, so that
+    a few circles are much larger than the rest.
+
+    Args:
+        side (int): Number of squares per side.
+        alpha (float): Pareto shape (smaller = heavier tail).
+        seed (int): Random seed.
+        islands (int): Number of 2 x 2 island groups added in a row below the grid, far enough
+            apart to be independent components (see components.py). fids follow those of the grid.
+
+    Returns:
+        centroid_dict, neighbours_dict: Same formats as preprocessing.
+    """
+
+    rng = random.Random(seed)
+
+    # --- Neighbours ---
+    neighbours_dict = {}
+    for i in range(side):
+        for j in range(side):
+            fid = i * side + j
+            neighbours_dict[fid] = {}
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    ni, nj = i + di, j + dj
+                    if (di, dj) != (0, 0) and 0 <= ni < side and 0 <= nj < side:
+                        neighbours_dict[fid][ni * side + nj] = 1.0 if di == 0 or dj == 0 else 0.0
+
+    # --- Centroids ---
+    centroid_dict = {}
+    for i in range(side):
+        for j in range(side):
+            value = 100 * rng.paretovariate(alpha)
+            centroid_dict[i * side + j] = {
+                'x': i + 0.5,
+                'y': j + 0.5,
+                'x_orig': i + 0.5,
+                'y_orig': j + 0.5,
+                'perimeter': 4.0,
+                'radius_raw': math.sqrt(value / math.pi),
+                'radius_scaled': 0.0,
+                'xvec': 0.0,
+                'yvec': 0.0
+            }
+
+    # Same scale factor as preprocessing: mean neighbour distance / mean combined raw radii
+    tdist, tradius = 0.0, 0.0
+    for id1, neighbours in neighbours_dict.items():
+        for id2 in neighbours:
+            if id1 < id2:
+                p1, p2 = centroid_dict[id1], centroid_dict[id2]
+                tdist += math.hypot(p2['x'] - p1['x'], p2['y'] - p1['y'])
+                tradius += p1['radius_raw'] + p2['radius_raw']
+    scale = tdist / tradius
+
+    for props in centroid_dict.values():
+        props['radius_scaled'] = props['radius_raw'] * scale
+
+    # --- Islands, with the scale factor of the grid ---
+    gap = 4 * max(props['radius_scaled'] for props in centroid_dict.values()) + 2
+    for k in range(islands):
+        first = side * side + 4 * k
+        for m in range(4):
+            i, j = divmod(m, 2)
+            x, y = k * gap + i + 0.5, -gap + j + 0.5
+            value = 100 * rng.paretovariate(alpha)
+            radius_raw = math.sqrt(value / math.pi)
+            centroid_dict[first + m] = {
+                'x': x, 'y': y, 'x_orig': x, 'y_orig': y, 'perimeter': 4.0,
+                'radius_raw': radius_raw, 'radius_scaled': radius_raw * scale, 'xvec': 0.0, 'yvec': 0.0
+            }
+            # All four squares touch: rook neighbours share a border, the diagonal one a corner
+            neighbours_dict[first + m] = {first + n: (1.0 if (n ^ m) != 3 else 0.0) for n in range(4) if n != m}
+
+    return centroid_dict, neighbours_dict
+
+def border_lengths(neighbours_dict):
+    """
+    Flatten a neighbours dictionary into { (id1, id2): border_length } with id1 < id2.
+    """
+    return {
+        (id1, id2): length
+        for id1, neighbours in neighbours_dict.items()
+        for id2, length in neighbours.items()
+        if id1 < id2
+    }
@@ -0,0 +1,465 @@
+"""
+    Broad phase for circle queries without QGIS.
+
+    - GridIndex: a uniform grid over circle centres, used in place of QgsSpatialIndex when the
+      simulation runs outside QGIS (e.g. in worker processes). Queries return the same
+      candidates as QgsSpatialIndex.intersects: every centre inside the search rectangle.
+    - RadiusClassIndex: one grid per class of radii, so that a query only looks as far
+      as the circles of each class can reach (heavy-tailed radius distributions).
+    - PackedClassIndex: the same classes in sorted arrays, built with array operations,
+      for passes that only query around a few circles (see finishing.py).
+    - grid_pairs: enumeration of all candidate pairs at once with array operations.
+    - class_pairs: the same with one grid per pair of radius classes, so that the candidates
+      of heavy-tailed layers do not grow with the largest circle.
+"""
+import math
+
+import numpy as np
+
+class GridIndex:
+    """
+    Uniform grid of circle centres.
+
+    The default cell size is the largest circle diameter, so the search window of
+    dorling_iteration (r1 + rmax around a centre) spans at most 3 x 3 cells.
+    """
+
+    def __init__(self, centroid_dict, cell_size=None):
+        """
+        Args:
+            centroid_dict (dict): { fid: { 'x', 'y', 'radius_scaled', ... } }
+            cell_size (float): Grid cell size (defaults to 2 * rmax).
+        """
+
+        if cell_size is None:
+            rmax = max((props['radius_scaled'] for props in centroid_dict.values()), default=0.0)
+            cell_size = 2 * rmax
+        self.cell_size = cell_size if cell_size > 0 else 1.0
+
+        self.cells = {} # { (i, j): [fid, ...] }
+        self.positions = {} # { fid: (x, y) }
+
+        for fid, props in centroid_dict.items():
+            self.insert(fid, props['x'], props['y'])
+
+    def cell(self, x, y):
+        """Returns the (i, j) cell containing a point."""
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, fid, x, y):
+        """Add a centre to the grid."""
+        self.positions[fid] = (x, y)
+        self.cells.setdefault(self.cell(x, y), []).append(fid)
+
+    def remove(self, fid):
+        """Remove a centre from the grid."""
+        x, y = self.positions.pop(fid)
+        key = self.cell(x, y)
+        bucket = self.cells[key]
+        bucket.remove(fid)
+        if not bucket:
+            del self.cells[key]
+
+    def move(self, fid, x, y):
+        """Update the position of a centre."""
+        old_x, old_y = self.positions[fid]
+        if self.cell(old_x, old_y) == self.cell(x, y):
+            self.positions[fid] = (x, y)
+        else:
+            self.remove(fid)
+            self.insert(fid, x, y)
+
+    def intersects(self, xmin, ymin, xmax, ymax):
+        """
+        Returns the IDs of all centres inside a rectangle.
+
+        Args:
+            xmin, ymin, xmax, ymax (float): Search rectangle.
+
+        Returns:
+            list: Matching feature IDs.
+        """
+
+        imin, jmin = self.cell(xmin, ymin)
+        imax, jmax = self.cell(xmax, ymax)
+
+        ids = []
+        for i in range(imin, imax + 1):
+            for j in range(jmin, jmax + 1):
+                for fid in self.cells.get((i, j), ()):
+                    x, y = self.positions[fid]
+                    if xmin <= x <= xmax and ymin <= y <= ymax:
+                        ids.append(fid)
+
+        return ids
+
+class RadiusClassIndex:
+    """
+    Hierarchical grid: circles are grouped into radius classes (powers of 'base'),
+    each class having its own grid sized on its largest circle.
+
+    A query for a circle of radius r looks, in each class c, for centres within r + rmax_c,
+    instead of r + rmax of the whole layer. Small circles no longer pay for the largest one.
+
+    Unlike GridIndex, the candidates are not those of QgsSpatialIndex with an r + rmax window:
+    far small circles are skipped. They can never overlap the query circle, but the
+    closest-distance force limit of dorling_iteration is then taken over fewer circles.
+    """
+
+    def __init__(self, centroid_dict, base=2.0):
+        """
+        Args:
+            centroid_dict (dict): { fid: { 'x', 'y', 'radius_scaled', ... } }
+            base (float): Ratio between the radius bounds of two consecutive classes.
+        """
+
+        n = len(centroid_dict)
+        r = np.fromiter((props['radius_scaled'] for props in centroid_dict.values()), dtype=float, count=n)
+        classes, class_rmax = radius_classes(r, base)
+
+        # --- Group circles by radius class ---
+        members = {}
+        for (fid, props), k in zip(centroid_dict.items(), classes.tolist()):
+            members.setdefault(k, {})[fid] = props
+
+        # --- One grid per class, sized on the largest circle of the class ---
+        self.classes = [] # [ (rmax_c, GridIndex), ... ]
+        self.grid_of = {} # { fid: GridIndex of its class }
+        for k in sorted(members):
+            class_dict = members[k]
+            grid = GridIndex(class_dict)
+            self.classes.append((float(class_rmax[k]), grid))
+            for fid in class_dict:
+                self.grid_of[fid] = grid
+
+    def move(self, fid, x, y):
+        """Update the position of a circle."""
+        self.grid_of[fid].move(fid, x, y)
+
+    def query(self, x, y, r):
+        """
+        Returns the IDs of all circles that may overlap the circle (x, y, r).
+
+        Args:
+            x, y (float): Circle centre.
+            r (float): Circle radius.
+
+        Returns:
+            list: Candidate feature IDs.
+        """
+
+        ids = []
+        for class_rmax, grid in self.classes:
+            w = r + class_rmax
+            ids.extend(grid.intersects(x - w, y - w, x + w, y + w))
+
+        return ids
+
+class PackedClassIndex:
+    """
+    Radius classes of RadiusClassIndex, packed into sorted arrays.
+
+    The index is built with array operations, without Python work per circle, and circles are
+    referred to by their position in the arrays. A query looks in each class for the centres
+    within r + rmax_c, like RadiusClassIndex.query, with one binary search per row of cells.
+
+    Moved circles leave the packed arrays for a small GridIndex, updated at every move, so that
+    moving a few circles costs nothing in proportion to the layer size.
+    """
+
+    def __init__(self, x, y, r, base=2.0):
+        """
+        Args:
+            x, y, r (np.ndarray): Circle centres and radii.
+            base (float): Ratio between the radius bounds of two consecutive classes.
+        """
+
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        self.r = np.array(r, dtype=float)
+        self.rmax = float(self.r.max()) if len(self.r) else 0.0
+
+        classes, class_rmax = radius_classes(self.r, base)
+        order = np.argsort(classes, kind='stable')
+        bounds = np.searchsorted(classes[order], np.arange(len(class_rmax) + 1))
+
+        # --- One packed grid per class: members sorted by cell, row by row ---
+        self.classes = []
+        for k, rmax_c in enumerate(class_rmax.tolist()):
+            members = order[bounds[k]:bounds[k + 1]]
+            cell_size = 2 * rmax_c if rmax_c > 0 else 1.0
+            cx = np.floor(self.x[members] / cell_size).astype(np.int64)
+            cy = np.floor(self.y[members] / cell_size).astype(np.int64)
+            cx0, cy0 = int(cx.min()), int(cy.min())
+            ncols = int(cx.max()) - cx0 + 1
+            keys = (cy - cy0) * ncols + (cx - cx0)
+            sort = np.argsort(keys, kind='stable')
+            self.classes.append({
+                'rmax': rmax_c, 'cell_size': cell_size, 'origin': (cx0, cy0),
+                'ncols': ncols, 'nrows': int(cy.max()) - cy0 + 1,
+                'keys': keys[sort], 'members': members[sort]
+            })
+
+        # Moved circles, out of the packed arrays
+        self.moved = np.zeros(len(self.x), dtype=bool)
+        self.overlay = GridIndex({}, cell_size=2 * self.rmax)
+
+    def move(self, k, x, y):
+        """Update the position of circle k."""
+        self.x[k], self.y[k] = x, y
+        if self.moved[k]:
+            self.overlay.move(k, x, y)
+        else:
+            self.moved[k] = True
+            self.overlay.insert(k, x, y)
+
+    def query(self, x, y, r):
+        """
+        Returns the positions of all circles that may overlap the circle (x, y, r).
+
+        Args:
+            x, y (float): Circle centre.
+            r (float): Circle radius.
+
+        Returns:
+            np.ndarray: Candidate positions.
+        """
+
+        found = []
+        for grid in self.classes:
+            w = r + grid['rmax']
+            cell_size = grid['cell_size']
+            cx0, cy0 = grid['origin']
+            ncols = grid['ncols']
+
+            # Cells of the search window, clipped to the grid
+            ix0 = max(math.floor((x - w) / cell_size) - cx0, 0)
+            ix1 = min(math.floor((x + w) / cell_size) - cx0, ncols - 1)
+            iy0 = max(math.floor((y - w) / cell_size) - cy0, 0)
+            iy1 = min(math.floor((y + w) / cell_size) - cy0, grid['nrows'] - 1)
+            if ix0 > ix1 or iy0 > iy1:
+                continue
+
+            # One contiguous run of keys per row
+            rows = np.arange(iy0, iy1 + 1) * ncols
+            starts = np.searchsorted(grid['keys'], rows + ix0, side='left')
+            ends = np.searchsorted(grid['keys'], rows + ix1, side='right')
+            sizes = ends - starts
+            total = int(sizes.sum())
+            if total == 0:
+                continue
+            positions = np.arange(total) + np.repeat(starts - (np.cumsum(sizes) - sizes), sizes)
+            candidates = grid['members'][positions]
+
+            # Exact window, on the circles still in place
+            candidates = candidates[~self.moved[candidates]]
+            inside = (np.abs(self.x[candidates] - x) <= w) & (np.abs(self.y[candidates] - y) <= w)
+            found.append(candidates[inside])
+
+        # Moved circles, within the window of the largest class
+        w = r + self.rmax
+        moved = self.overlay.intersects(x - w, y - w, x + w, y + w)
+        if moved:
+            found.append(np.array(moved, dtype=np.int64))
+
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+def radius_classes(r, base=2.0):
+    """
+    Group radii into classes: class k holds the radii between rmin * base^k and rmin * base^(k+1),
+    with rmin the smallest positive radius (radii of 0 go to the first class).
+
+    Args:
+        r (np.ndarray): Radii.
+        base (float): Ratio between the radius bounds of two consecutive classes.
+
+    Returns:
+        classes (np.ndarray): Class of each radius, numbered from 0 without empty classes.
+        class_rmax (np.ndarray): Largest radius of each class.
+    """
+
+    positive = r > 0
+    rmin = r[positive].min() if positive.any() else 1.0
+
+    levels = np.zeros(len(r), dtype=np.int64)
+    levels[positive] = np.floor(np.log(r[positive] / rmin) / math.log(base)).astype(np.int64)
+    _, classes = np.unique(levels, return_inverse=True)
+    classes = classes.reshape(-1)
+
+    class_rmax = np.zeros(classes.max() + 1 if len(classes) else 0)
+    np.maximum.at(class_rmax, classes, r)
+
+    return classes, class_rmax
+
+def grid_pairs(x, y, cell_size):
+    """
+    Enumerate all pairs of points lying in the same or in adjacent grid cells, with array operations.
+
+    With cell_size >= the largest interaction distance, the result contains every pair
+    closer than that distance (and more, to be filtered by the caller).
+
+    Args:
+        x, y (np.ndarray): Point coordinates.
+        cell_size (float): Grid cell size.
+
+    Returns:
+        (np.ndarray, np.ndarray): Indices i, j of the candidate pairs, each pair once.
+    """
+
+    if len(x) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if cell_size <= 0:
+        cell_size = 1.0
+
+    # Cell coordinates, shifted by one so that neighbouring keys never wrap around a row
+    cx = np.floor((x - x.min()) / cell_size).astype(np.int64) + 1
+    cy = np.floor((y - y.min()) / cell_size).astype(np.int64) + 1
+    ncols = cx.max() + 2
+    keys = cy * ncols + cx
+
+    # Group points by cell
+    order = np.argsort(keys, kind='stable')
+    cells, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    pairs_i, pairs_j = [], []
+
+    # Same cell, then half of the 8 neighbouring cells (the other half is covered symmetrically)
+    for ox, oy in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        target = cells + oy * ncols + ox
+        pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        found = cells[pos] == target
+        a = np.nonzero(found)[0]
+        b = pos[found]
+
+        # Expand every combination of members of cell a and cell b
+        sizes = counts[a] * counts[b]
+        total = sizes.sum()
+        if total == 0:
+            continue
+        cell_pair = np.repeat(np.arange(len(a)), sizes)
+        local = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        ia = local // counts[b][cell_pair]
+        ib = local % counts[b][cell_pair]
+
+        # Within a cell, keep each pair once
+        if ox == 0 and oy == 0:
+            keep = ia < ib
+            cell_pair, ia, ib = cell_pair[keep], ia[keep], ib[keep]
+
+        pairs_i.append(order[starts[a][cell_pair] + ia])
+        pairs_j.append(order[starts[b][cell_pair] + ib])
+
+    if not pairs_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+def cross_pairs(xa, ya, xb, yb, cell_size):
+    """
+    Enumerate all pairs of a point of set a and a point of set b lying in the same or in
+    adjacent grid cells, with array operations.
+
+    Args:
+        xa, ya (np.ndarray): Coordinates of the points of set a.
+        xb, yb (np.ndarray): Coordinates of the points of set b.
+        cell_size (float): Grid cell size.
+
+    Returns:
+        (np.ndarray, np.ndarray): Indices i (in a), j (in b) of the candidate pairs.
+    """
+
+    if len(xa) == 0 or len(xb) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if cell_size <= 0:
+        cell_size = 1.0
+
+    # Cell coordinates on a common grid, shifted by one as in grid_pairs
+    x0 = min(xa.min(), xb.min())
+    y0 = min(ya.min(), yb.min())
+    cxa = np.floor((xa - x0) / cell_size).astype(np.int64) + 1
+    cya = np.floor((ya - y0) / cell_size).astype(np.int64) + 1
+    cxb = np.floor((xb - x0) / cell_size).astype(np.int64) + 1
+    cyb = np.floor((yb - y0) / cell_size).astype(np.int64) + 1
+    ncols = max(cxa.max(), cxb.max()) + 2
+    keys_a = cya * ncols + cxa
+    keys_b = cyb * ncols + cxb
+
+    # Group the points of set b by cell
+    order = np.argsort(keys_b, kind='stable')
+    cells, starts, counts = np.unique(keys_b[order], return_index=True, return_counts=True)
+
+    pairs_i, pairs_j = [], []
+
+    # Every point of set a against the 9 cells around it
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            target = keys_a + oy * ncols + ox
+            pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+            found = cells[pos] == target
+            a = np.nonzero(found)[0]
+            b = pos[found]
+
+            # Expand every member of the b cell
+            sizes = counts[b]
+            total = sizes.sum()
+            if total == 0:
+                continue
+            point = np.repeat(np.arange(len(a)), sizes)
+            local = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+            pairs_i.append(a[point])
+            pairs_j.append(order[starts[b][point] + local])
+
+    if not pairs_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+def class_pairs(x, y, r, margin=0.0, relative_margin=0.0, base=2.0):
+    """
+    Enumerate candidate pairs of circles with one grid per pair of radius classes.
+
+    A single grid sized on the largest circle makes every small circle a candidate of every
+    other within the largest diameter: on heavy-tailed radii, this is close to all pairs.
+    Here each pair of radius classes (a, b) is enumerated on a grid sized for their own
+    largest circles, so small circles are only paired with large ones near those.
+
+    The result contains every pair whose centres are
+    closer than r_i + r_j + margin + relative_margin * max(r_i, r_j) (and more, to be
+    filtered by the caller).
+
+    Args:
+        x, y, r (np.ndarray): Circle centres and radii.
+        margin (float): Fixed distance added to the interaction distance.
+        relative_margin (float): Share of the larger radius of each pair added to the interaction distance.
+        base (float): Ratio between the radius bounds of two consecutive classes (see radius_classes).
+
+    Returns:
+        (np.ndarray, np.ndarray): Indices i, j of the candidate pairs, each pair once.
+    """
+
+    if len(x) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    classes, class_rmax = radius_classes(r, base)
+    order = np.argsort(classes, kind='stable')
+    bounds = np.searchsorted(classes[order], np.arange(len(class_rmax) + 1))
+    members = [order[bounds[k]:bounds[k + 1]] for k in range(len(class_rmax))]
+
+    pairs_i, pairs_j = [], []
+    for a, members_a in enumerate(members):
+        for b in range(a, len(members)):
+            members_b = members[b]
+            ra, rb = class_rmax[a], class_rmax[b]
+            cell_size = ra + rb + margin + relative_margin * max(ra, rb)
+
+            if a == b:
+                i, j = grid_pairs(x[members_a], y[members_a], cell_size)
+            else:
+                i, j = cross_pairs(x[members_a], y[members_a], x[members_b], y[members_b], cell_size)
+            pairs_i.append(members_a[i])
+            pairs_j.append(members_b[j])
+
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
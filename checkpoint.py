@@ -0,0 +1,181 @@
+"""
+    Checkpoints for long Dorling simulations.
+
+    A checkpoint stores the state needed to resume compute_dorling with identical results:
+    the iteration number, the parameters, the cooling schedule and its state, and for every
+    circle its position, motion vector and scaled radius. It is written as a compact
+    little-endian binary file:
+
+    - header: magic, version, iteration, circle count, friction, ratio, iterations,
+      total displacement of the last iteration (NaN before the first one), schedule size
+    - schedule (JSON): name, options and state of the cooling schedule (see schedules.py)
+    - fids (int64), then x, y, xvec, yvec, radius_scaled (float64), one array each
+
+    Files are written to a temporary path and renamed, so a crash during a write
+    never leaves a truncated checkpoint behind. Files damaged otherwise (disk full,
+    copied partially) are rejected with a ValueError, and compute_dorling ignores them.
+"""
+import json
+import math
+import os
+import struct
+
+from array import array
+
+MAGIC = b"DORLCKPT"
+VERSION = 2
+HEADER = struct.Struct("<8sIIQddIdI")
+KEYS = ('x', 'y', 'xvec', 'yvec', 'radius_scaled')
+
+def save_checkpoint(path, centroid_dict, iteration, friction, ratio, iterations,
+                    schedule='constant', schedule_options=None, schedule_state=None, displacement=None):
+    """
+    Write the current simulation state to a checkpoint file.
+
+    Args:
+        path (str): Checkpoint file path.
+        centroid_dict (dict): { fid: { 'x', 'y', 'xvec', 'yvec', 'radius_scaled', ... } }
+        iteration (int): Last completed iteration.
+        friction (float): Damping factor of the run.
+        ratio (float): Repulsion/attraction balance of the run.
+        iterations (int): Total number of iterations of the run.
+        schedule (str): Cooling schedule of the run.
+        schedule_options (dict): Options of the schedule (see make_schedule).
+        schedule_state (dict): State of a stateful schedule (parameters.state), None otherwise.
+        displacement (float): Total displacement of the last iteration, seen by the schedule at the next one.
+    """
+
+    fids = array('q', centroid_dict.keys())
+    props = list(centroid_dict.values())
+    schedule_data = json.dumps({
+        'schedule': schedule, 'options': schedule_options or {}, 'state': schedule_state
+    }).encode('utf-8')
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(
+            MAGIC, VERSION, iteration, len(fids), friction, ratio, iterations,
+            math.nan if displacement is None else displacement, len(schedule_data)
+        ))
+        f.write(schedule_data)
+        fids.tofile(f)
+        for key in KEYS:
+            array('d', (p[key] for p in props)).tofile(f)
+
+    # Atomic replacement of the previous checkpoint
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint file.
+
+    Args:
+        path (str): Checkpoint file path.
+
+    Returns:
+        dict: { 'iteration', 'friction', 'ratio', 'iterations', 'displacement', 'schedule', 'schedule_options',
+            'schedule_state', 'fids', 'x', 'y', 'xvec', 'yvec', 'radius_scaled' }
+
+    Raises:
+        ValueError: The file is not a checkpoint of this version, or is truncated.
+    """
+
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"Truncated checkpoint: {path}")
+
+        magic, version, iteration, n, friction, ratio, iterations, displacement, schedule_size = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a Dorling checkpoint (version {VERSION}): {path}")
+
+        checkpoint = {
+            'iteration': iteration, 'friction': friction, 'ratio': ratio, 'iterations': iterations,
+            'displacement': None if math.isnan(displacement) else displacement
+        }
+
+        schedule_data = f.read(schedule_size)
+        if len(schedule_data) != schedule_size:
+            raise ValueError(f"Truncated checkpoint: {path}")
+        schedule = json.loads(schedule_data.decode('utf-8'))
+        checkpoint['schedule'] = schedule['schedule']
+        checkpoint['schedule_options'] = schedule['options']
+        checkpoint['schedule_state'] = schedule['state']
+
+        checkpoint['fids'] = read_array(f, 'q', n, path)
+        for key in KEYS:
+            checkpoint[key] = read_array(f, 'd', n, path)
+
+    return checkpoint
+
+def read_array(f, typecode, n, path):
+    """
+    Read n values of an array, checking that the file holds them all.
+
+    Raises:
+        ValueError: The file ends before the array (damaged or partially written checkpoint).
+    """
+
+    values = array(typecode)
+    data = f.read(n * values.itemsize)
+    if len(data) != n * values.itemsize:
+        raise ValueError(f"Truncated checkpoint: {path}")
+    values.frombytes(data)
+
+    return values
+
+def restore_checkpoint(path, centroid_dict, friction, ratio, iterations,
+                       schedule='constant', schedule_options=None, schedule_state=None):
+    """
+    Restore a checkpoint into centroid_dict, and the state of a stateful schedule.
+
+    The checkpoint must come from a run with the same parameters, the same schedule,
+    the same features and the same radii, otherwise resuming would not reproduce the
+    original run.
+
+    Args:
+        path (str): Checkpoint file path.
+        centroid_dict (dict): Centroid dictionary to update in place.
+        friction (float): Damping factor of the run.
+        ratio (float): Repulsion/attraction balance of the run.
+        iterations (int): Total number of iterations of the run.
+        schedule (str): Cooling schedule of the run.
+        schedule_options (dict): Options of the schedule.
+        schedule_state (dict): State of a stateful schedule (parameters.state), updated in place.
+
+    Returns:
+        iteration (int): Last completed iteration stored in the checkpoint.
+        displacement (float): Total displacement of that iteration (None before the first one).
+    """
+
+    checkpoint = load_checkpoint(path)
+
+    # --- Check that the checkpoint belongs to this run ---
+    if (checkpoint['friction'], checkpoint['ratio'], checkpoint['iterations']) != (friction, ratio, iterations):
+        raise ValueError("Checkpoint parameters differ from the current run")
+    # Options are compared as stored (through JSON)
+    options = json.loads(json.dumps(schedule_options or {}))
+    if (checkpoint['schedule'], checkpoint['schedule_options']) != (schedule, options):
+        raise ValueError("Checkpoint schedule differs from the current run")
+    if (checkpoint['schedule_state'] is None) != (schedule_state is None):
+        raise ValueError("Checkpoint schedule state differs from the current run")
+    if set(checkpoint['fids']) != set(centroid_dict):
+        raise ValueError("Checkpoint features differ from the current run")
+
+    for i, fid in enumerate(checkpoint['fids']):
+        if centroid_dict[fid]['radius_scaled'] != checkpoint['radius_scaled'][i]:
+            raise ValueError("Checkpoint radii differ from the current run")
+
+    # --- Restore positions and motion vectors ---
+    for i, fid in enumerate(checkpoint['fids']):
+        props = centroid_dict[fid]
+        props['x'] = checkpoint['x'][i]
+        props['y'] = checkpoint['y'][i]
+        props['xvec'] = checkpoint['xvec'][i]
+        props['yvec'] = checkpoint['yvec'][i]
+
+    # --- Restore the schedule state ---
+    if schedule_state is not None:
+        schedule_state.update(checkpoint['schedule_state'])
+
+    return checkpoint['iteration'], checkpoint['displacement']
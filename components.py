@@ -0,0 +1,208 @@
+"""
+    Independent solving of disconnected components.
+
+    Islands, enclaves and distant clusters often have no neighbour in the rest of the layer
+    and never come close enough to interact with it. Such groups are independent problems:
+    compute_dorling_components finds them and solves each one in a worker process, with its
+    own convergence check, so that a small island group can finish early while the mainland
+    keeps iterating.
+
+    Two circles belong to the same component when they are geographic neighbours, or when
+    their centres are closer than r1 + r2 + margin (they may collide once circles start moving).
+    The margin defaults to the larger radius of each pair: a margin of twice the largest radius
+    of the layer would let one very large circle join every region around it into a single
+    component, and on heavy-tailed radii most of the layer ends up in one worker. With the
+    per-pair margin, two components can still meet when their circles travel further than
+    expected: after the run, circles of different components that overlap are moved apart
+    by the finishing pass (see finishing.remove_overlaps), the other circles stay in place.
+
+    Workers do not need QGIS.
+"""
+import multiprocessing
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .broad_phase import class_pairs
+from .dorling_core import compute_dorling
+from .finishing import remove_overlaps
+from .sweep import python_executable
+
+def find_components(centroid_dict, neighbours_dict, margin=None):
+    """
+    Split circles into independent components, from adjacency and spatial proximity.
+
+    Args:
+        centroid_dict (dict): { fid: { 'x', 'y', 'radius_scaled', ... } }
+        neighbours_dict (dict): Neighbour pairs.
+        margin (float): Extra distance under which two circles are connected (defaults to the larger radius of each pair).
+
+    Returns:
+        list: Lists of feature IDs, largest component first.
+    """
+
+    fids = list(centroid_dict)
+    if not fids:
+        return []
+    position = {fid: k for k, fid in enumerate(fids)}
+
+    x = np.array([centroid_dict[fid]['x'] for fid in fids])
+    y = np.array([centroid_dict[fid]['y'] for fid in fids])
+    r = np.array([centroid_dict[fid]['radius_scaled'] for fid in fids])
+
+    # --- Union-find over the circles ---
+    parent = list(range(len(fids)))
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]] # Path halving
+            k = parent[k]
+        return k
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    # Geographic neighbours
+    for id1, neighbours in neighbours_dict.items():
+        for id2 in neighbours:
+            if id1 < id2 and id1 in position and id2 in position:
+                union(position[id1], position[id2])
+
+    # Circles close enough to collide (candidates per pair of radius classes)
+    if margin is None:
+        i, j = class_pairs(x, y, r, relative_margin=1.0)
+        reach = r[i] + r[j] + np.maximum(r[i], r[j])
+    else:
+        i, j = class_pairs(x, y, r, margin=margin)
+        reach = r[i] + r[j] + margin
+    close = np.hypot(x[j] - x[i], y[j] - y[i]) < reach
+    for a, b in zip(i[close].tolist(), j[close].tolist()):
+        union(a, b)
+
+    groups = {}
+    for k, fid in enumerate(fids):
+        groups.setdefault(find(k), []).append(fid)
+
+    return sorted(groups.values(), key=len, reverse=True)
+
+def compute_dorling_components(centroid_dict, neighbours_dict, friction=0.25, ratio=0.4, iterations=200,
+                               tolerance=1e-3, margin=None, processes=None, schedule='constant', schedule_options=None):
+    """
+    Solve every independent component in its own worker, each with its own convergence check.
+
+    Args:
+        centroid_dict (dict): Dictionary of centroids (see compute_dorling), updated in place.
+        neighbours_dict (dict): Neighbour pairs with shared border lengths.
+        friction (float): Damping factor applied to motion vectors.
+        ratio (float): Balance between repulsion and attraction forces.
+        iterations (int): Maximum number of iterations of each component.
+        tolerance (float): Convergence check of each component (see compute_dorling). None runs all iterations.
+        margin (float): Proximity margin of find_components.
+        processes (int): Number of worker processes (defaults to the CPU count).
+        schedule (str): Cooling schedule of each component (see schedules.py).
+        schedule_options (dict): Optional arguments of make_schedule.
+
+    Returns:
+        list: One dict per component { 'size', 'iterations', 'seconds' }, largest first.
+    """
+
+    # Start the timer to measure execution time
+    start_time = time.time()
+
+    components = find_components(centroid_dict, neighbours_dict, margin)
+    print(f"[DorlingCartogram] {len(components)} independent components (largest: {len(components[0]) if components else 0} circles)")
+
+    rows = [{'size': len(fids), 'iterations': 0, 'seconds': 0.0} for fids in components]
+
+    # Spawned workers work the same way inside and outside QGIS
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(python_executable())
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        # Largest components first, so that they do not start last
+        futures = {}
+        for number, fids in enumerate(components):
+            if len(fids) == 1:
+                continue # A lone circle feels no force
+            component_dict = {fid: centroid_dict[fid] for fid in fids}
+            component_neighbours = {fid: neighbours_dict.get(fid, {}) for fid in fids}
+            future = executor.submit(
+                solve_component, component_dict, component_neighbours, friction, ratio, iterations,
+                tolerance, schedule, schedule_options
+            )
+            futures[future] = number
+
+        # Components are merged back as soon as they finish
+        for future in as_completed(futures):
+            number = futures[future]
+            states, last_iteration, seconds = future.result()
+            for fid, (x, y, xvec, yvec) in states.items():
+                props = centroid_dict[fid]
+                props['x'], props['y'], props['xvec'], props['yvec'] = x, y, xvec, yvec
+            rows[number]['iterations'] = last_iteration
+            rows[number]['seconds'] = seconds
+
+    # Components must not have met: move apart the circles that did
+    conflicts = cross_component_overlaps(centroid_dict, components)
+    if conflicts:
+        print(f"[DorlingCartogram] {len(conflicts)} circles overlap another component, moving them apart")
+        remove_overlaps(centroid_dict, movable=conflicts)
+
+    # End the timer and display the execution time
+    end_time = time.time()
+    print(f"[DorlingCartogram] Components solved in {end_time - start_time:.2f} seconds")
+    for row in rows[:10]:
+        print(f"[DorlingCartogram] Component of {row['size']} circles: {row['iterations']} iterations, {row['seconds']:.2f} seconds")
+
+    return rows
+
+def solve_component(component_dict, neighbours_dict, friction, ratio, iterations, tolerance, schedule, schedule_options):
+    """
+    Run compute_dorling on one component, in a worker.
+
+    Returns:
+        states (dict): { fid: (x, y, xvec, yvec) } final state.
+        last_iteration (int): Number of iterations run.
+        seconds (float): Computation time.
+    """
+
+    start_time = time.process_time()
+    last_iteration = compute_dorling(
+        component_dict, neighbours_dict, friction, ratio, iterations, index='grid',
+        schedule=schedule, schedule_options=schedule_options, tolerance=tolerance
+    )
+
+    states = {fid: (props['x'], props['y'], props['xvec'], props['yvec']) for fid, props in component_dict.items()}
+    return states, last_iteration, time.process_time() - start_time
+
+def cross_component_overlaps(centroid_dict, components):
+    """
+    Find the circles that overlap a circle of another component.
+
+    Args:
+        centroid_dict (dict): Solved centroids.
+        components (list): Lists of feature IDs (see find_components).
+
+    Returns:
+        set: IDs of the circles of overlapping pairs from different components.
+    """
+
+    if len(components) < 2:
+        return set()
+
+    fids = [fid for fids in components for fid in fids]
+    component_of = np.concatenate([np.full(len(fids), k) for k, fids in enumerate(components)])
+    x = np.array([centroid_dict[fid]['x'] for fid in fids])
+    y = np.array([centroid_dict[fid]['y'] for fid in fids])
+    r = np.array([centroid_dict[fid]['radius_scaled'] for fid in fids])
+
+    i, j = class_pairs(x, y, r)
+    different = component_of[i] != component_of[j]
+    i, j = i[different], j[different]
+    overlapping = np.hypot(x[j] - x[i], y[j] - y[i]) < r[i] + r[j]
+
+    return {fids[k] for k in np.concatenate((i[overlapping], j[overlapping])).tolist()}
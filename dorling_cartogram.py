@@ -24,21 +24,20 @@
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, QVariant
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QMessageBox
-
-# Initialize Qt resources from file resources.py
-from .resources import *
-# Import the code for the dialog
-from .dorling_cartogram_dialog import DorlingCartogramDialog
 import os.path
+import zlib
 
-from qgis.core import QgsProject, QgsVectorLayer, QgsFeature, QgsField, QgsFields, QgsGeometry, QgsPointXY, QgsWkbTypes
-
-from .preprocessing import *
-from .dorling_core import *
-from .layer_builder import *
+from qgis.core import QgsProject, QgsWkbTypes
 
 import time
 
+# The dialog and the pipeline modules (preprocessing, dorling_core, layer_builder and their
+# numeric backends) are imported on first use in run(), not when QGIS loads the plugin.
+# See benchmark.benchmark_import_time for the import cost of this module.
+
+# Output modes, in the order of the output combo box
+OUTPUT_EXPRESSION, OUTPUT_DIAMETER, OUTPUT_POLYGONS = 0, 1, 2
+
 
 class DorlingCartogram:
     """QGIS Plugin Implementation."""
@@ -75,6 +74,9 @@ class DorlingCartogram:
         # Must be set in initGui() to survive plugin reloads
         self.first_start = None
 
+        # Preprocessing results of the session (created on first run)
+        self.preprocessing_cache = None
+
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
         """Get the translation for a string using Qt translation API.
@@ -168,6 +170,9 @@ class DorlingCartogram:
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
 
+        # Initialize Qt resources from file resources.py
+        from . import resources
+
         icon_path = os.path.join(os.path.dirname(__file__), 'icon.png')
         self.add_action(
             icon_path,
@@ -246,6 +251,9 @@ class DorlingCartogram:
         # Get the selected layer object
         selected_layer = self.layer_list[layer_index]
 
+        # Use the selected layer for the filter expression builder
+        self.dlg.mExpressionLineEditFilter.setLayer(selected_layer)
+
         # Find all numeric fields (Int, Double, LongLong)
         numeric_field_names = []
         for field in selected_layer.fields():
@@ -257,6 +265,28 @@ class DorlingCartogram:
         self.dlg.comboBoxField.addItems(numeric_field_names)
 
 
+    def checkpoint_path(self, layer, field_name, crs=None):
+        """
+        Returns the checkpoint file used for a layer and field, or None if checkpoints are disabled.
+
+        Checkpoints are enabled by setting 'DorlingCartogram/checkpoint_dir' to a directory
+        (e.g. from the Python console with QSettings().setValue(...)). An interrupted run
+        with the same layer, field and parameters resumes from its last checkpoint.
+        Runs reprojected into another CRS (see reprojection.py) use their own checkpoint.
+        """
+
+        checkpoint_dir = QSettings().value('DorlingCartogram/checkpoint_dir', '')
+        if not checkpoint_dir:
+            return None
+
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        name = f"{layer.id()}_{field_name}"
+        if crs is not None:
+            # Authority ID, or a short hash of the definition of a custom CRS
+            name += f"_{crs.authid() or format(zlib.crc32(crs.toProj().encode()), 'x')}"
+        safe_name = "".join(c if c.isalnum() else "_" for c in name)
+        return os.path.join(checkpoint_dir, f"{safe_name}.dorlingckpt")
+
     def unload(self):
         """Removes the plugin menu item and icon from QGIS GUI."""
         for action in self.actions:
@@ -265,6 +295,10 @@ class DorlingCartogram:
                 action)
             self.iface.removeToolBarIcon(action)
 
+        # Release cached preprocessing results and layer connections
+        if self.preprocessing_cache is not None:
+            self.preprocessing_cache.clear()
+
 
     def run(self):
         """Run method that performs all the real work"""
@@ -273,6 +307,8 @@ class DorlingCartogram:
         # Only create GUI ONCE in callback, so that it will only load when the plugin is started
         if self.first_start == True:
             self.first_start = False
+            # Import the code for the dialog
+            from .dorling_cartogram_dialog import DorlingCartogramDialog
             self.dlg = DorlingCartogramDialog()
             self.dlg.comboBoxLayer.currentIndexChanged.connect(self.populate_fields)
 
@@ -284,6 +320,7 @@ class DorlingCartogram:
         self.dlg.doubleSpinBoxFriction.setValue(0.25)
         self.dlg.doubleSpinBoxRatio.setValue(0.4)
         self.dlg.mQgsSpinBoxIterations.setValue(200)
+        self.dlg.doubleSpinBoxTolerance.setValue(0.0)
 
         # show the dialog
         self.dlg.show()
@@ -294,6 +331,14 @@ class DorlingCartogram:
         # See if OK was pressed
         if result:
 
+            # Load the pipeline on first use
+            from .preprocessing import FilterError, preprocessing
+            from .dorling_core import compute_dorling
+            from .layer_builder import create_point_layer, create_circle_layer, style_layer
+            from .schedules import SCHEDULES
+            from .profiling import NULL_PROFILER
+            from .reprojection import destination_crs, crs_name
+
             # Start timer to measure execution time
             start_time = time.time()
             
@@ -304,34 +349,139 @@ class DorlingCartogram:
             friction = self.dlg.doubleSpinBoxFriction.value()
             ratio = self.dlg.doubleSpinBoxRatio.value()
             iterations = self.dlg.mQgsSpinBoxIterations.value()
+            tolerance = self.dlg.doubleSpinBoxTolerance.value()
+            selected_only = self.dlg.checkBoxSelectedOnly.isChecked()
+            expression = self.dlg.mExpressionLineEditFilter.expression().strip()
+            output_mode = self.dlg.comboBoxOutput.currentIndex()
+            segments = self.dlg.mQgsSpinBoxSegments.value()
+            finish = self.dlg.checkBoxFinish.isChecked()
+            join = self.dlg.checkBoxJoin.isChecked()
+            schedule = SCHEDULES[self.dlg.comboBoxSchedule.currentIndex()] # Same order as the combo box
             
             # If layer and field are selected, start building the Dorling layer
             if selected_layer and selected_field:
                 # Display selected layer, field and parameters
-                print(f"[DorlingCartogram] Layer: {selected_layer.name()}, Field: {selected_field}", f"Friction: {friction}, Ratio: {ratio}, Iterations: {iterations}")
-
-                # Check if the selected layer uses a projected CRS
-                if selected_layer.crs().isGeographic():
-                    QMessageBox.warning(
-                        self.dlg,
-                        "Invalid CRS",
-                        "The selected layer uses a geographic CRS (in degrees). Please reproject it to a projected CRS (e.g., EPSG:3857) before proceeding."
-                    )
+                print(f"[DorlingCartogram] Layer: {selected_layer.name()}, Field: {selected_field}", f"Friction: {friction}, Ratio: {ratio}, Iterations: {iterations}, Tolerance: {tolerance}, Schedule: {schedule}")
+
+                # Processing CRS, chosen with the 'DorlingCartogram/crs' setting (e.g. 'EPSG:3035'),
+                # automatic for geographic layers (see reprojection.py). None keeps the layer CRS.
+                try:
+                    crs = destination_crs(selected_layer, QSettings().value('DorlingCartogram/crs', ''))
+                except ValueError as e:
+                    QMessageBox.warning(self.dlg, "Invalid CRS", str(e))
                     return
+                if crs is not None:
+                    print(f"[DorlingCartogram] Processing CRS: {crs_name(selected_layer.crs())} -> {crs_name(crs)}")
                 
-                # Prepocessing
-                centroid_dict, neighbours_dict = preprocessing(selected_layer, selected_field)
-
-                # Compute Dorling
-                compute_dorling(centroid_dict, neighbours_dict, friction, ratio, iterations)
-
-                # Build layer and style layer
-                layer_name = f"{selected_layer.name()}_{selected_field}_dorling"
-                dorling_layer = create_point_layer(selected_layer, centroid_dict, layer_name)
-                style_layer(dorling_layer)
-
-                # Add layer to map
-                QgsProject.instance().addMapLayer(dorling_layer)
+                # Optional streaming preprocessing, enabled by the 'DorlingCartogram/chunk_size' setting
+                # (maximum number of features held in memory at once, 0 = whole layer)
+                chunk_size = int(QSettings().value('DorlingCartogram/chunk_size', 0) or 0)
+
+                # Session cache of preprocessing results, sized by the 'DorlingCartogram/cache_mb' setting (0 = disabled)
+                cache_mb = int(QSettings().value('DorlingCartogram/cache_mb', 256) or 0)
+                if self.preprocessing_cache is None:
+                    from .preprocessing_cache import PreprocessingCache
+                    self.preprocessing_cache = PreprocessingCache()
+                self.preprocessing_cache.max_bytes = cache_mb * 1024 * 1024
+                cache_key = self.preprocessing_cache.key(
+                    selected_layer, selected_field, tolerance=tolerance,
+                    selected_only=selected_only, expression=expression,
+                    crs=crs_name(crs) if crs is not None else None
+                )
+                if cache_mb > 0:
+                    cached = self.preprocessing_cache.get(cache_key)
+                else:
+                    # Disabled: entries stored under an earlier budget are dropped, not reused
+                    self.preprocessing_cache.clear()
+                    cached = None
+
+                # Optional profiling, enabled by the 'DorlingCartogram/profile_dir' setting (see profiling.py)
+                profile_dir = QSettings().value('DorlingCartogram/profile_dir', '')
+                if profile_dir:
+                    from .profiling import StageProfiler
+                    profiler = StageProfiler(profile_dir)
+                else:
+                    profiler = NULL_PROFILER
+
+                # Profiles are written even when a stage fails, which also stops the memory tracing
+                try:
+                    # Prepocessing (skipped when the layer was already processed with the same parameters)
+                    if cached is not None:
+                        centroid_dict, neighbours_dict = cached
+                        print("[DorlingCartogram] Preprocessing reused from cache")
+                    else:
+                        try:
+                            with profiler.stage('preprocessing'):
+                                centroid_dict, neighbours_dict = preprocessing(
+                                    selected_layer, selected_field, tolerance=tolerance,
+                                    selected_only=selected_only, expression=expression,
+                                    chunk_size=chunk_size or None, crs=crs
+                                )
+                        except FilterError as e:
+                            QMessageBox.warning(self.dlg, "Invalid filter", str(e))
+                            return
+                        if cache_mb > 0:
+                            self.preprocessing_cache.put(cache_key, selected_layer, centroid_dict, neighbours_dict)
+
+                    # Check that some features remain after filtering
+                    if not centroid_dict:
+                        QMessageBox.warning(self.dlg, "No features", "No features match the selection or filter expression.")
+                        return
+
+                    # Optional checkpoints, enabled by the 'DorlingCartogram/checkpoint_dir' setting
+                    checkpoint_path = self.checkpoint_path(selected_layer, selected_field, crs)
+
+                    # Optional tiled solver, enabled by the 'DorlingCartogram/tiles' setting
+                    # (number of tiles simulated in parallel processes, see tiled.py; 0 = single domain)
+                    tiles = int(QSettings().value('DorlingCartogram/tiles', 0) or 0)
+
+                    # Optional solving of independent components in parallel processes, enabled by the
+                    # 'DorlingCartogram/components' setting (see components.py)
+                    components = QSettings().value('DorlingCartogram/components', False, type=bool)
+
+                    # Compute Dorling
+                    if tiles > 1:
+                        from .tiled import compute_dorling_tiled
+                        with profiler.stage('tiled'):
+                            compute_dorling_tiled(centroid_dict, neighbours_dict, friction, ratio, iterations, tiles=tiles, schedule=schedule)
+                    elif components:
+                        from .components import compute_dorling_components
+                        with profiler.stage('components'):
+                            compute_dorling_components(centroid_dict, neighbours_dict, friction, ratio, iterations, schedule=schedule)
+                    else:
+                        compute_dorling(
+                            centroid_dict, neighbours_dict, friction, ratio, iterations,
+                            checkpoint_path=checkpoint_path, resume=True, schedule=schedule,
+                            profiler=profiler
+                        )
+
+                    # The run is complete, its checkpoint is no longer needed
+                    if checkpoint_path and os.path.exists(checkpoint_path):
+                        os.remove(checkpoint_path)
+
+                    # Optional finishing pass: no overlap left in the output
+                    if finish:
+                        from .finishing import remove_overlaps
+                        with profiler.stage('finishing'):
+                            remove_overlaps(centroid_dict)
+
+                    # Build layer and style layer
+                    layer_name = f"{selected_layer.name()}_{selected_field}_dorling"
+                    with profiler.stage('output'):
+                        if output_mode == OUTPUT_POLYGONS:
+                            dorling_layer = create_circle_layer(selected_layer, centroid_dict, layer_name, segments, join=join, crs=crs)
+                        elif output_mode == OUTPUT_DIAMETER:
+                            dorling_layer = create_point_layer(selected_layer, centroid_dict, layer_name, diameter=True, join=join, crs=crs)
+                            style_layer(dorling_layer, diameter_field="diameter")
+                        else:
+                            dorling_layer = create_point_layer(selected_layer, centroid_dict, layer_name, join=join, crs=crs)
+                            style_layer(dorling_layer)
+
+                    # Add layer to map
+                    QgsProject.instance().addMapLayer(dorling_layer)
+                finally:
+                    # Write the profiles of the run
+                    profiler.close()
 
                 # End timer and display execution time
                 end_time = time.time()
@@ -14,15 +14,15 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_Dialog(object):
     def setupUi(self, Dialog):
         Dialog.setObjectName("Dialog")
-        Dialog.resize(518, 320)
+        Dialog.resize(518, 520)
         self.label = QtWidgets.QLabel(Dialog)
         self.label.setGeometry(QtCore.QRect(30, 30, 91, 16))
         self.label.setObjectName("label")
         self.PushButtonOk = QtWidgets.QPushButton(Dialog)
-        self.PushButtonOk.setGeometry(QtCore.QRect(270, 280, 113, 32))
+        self.PushButtonOk.setGeometry(QtCore.QRect(270, 480, 113, 32))
         self.PushButtonOk.setObjectName("PushButtonOk")
         self.PushButtonCancel = QtWidgets.QPushButton(Dialog)
-        self.PushButtonCancel.setGeometry(QtCore.QRect(390, 280, 113, 32))
+        self.PushButtonCancel.setGeometry(QtCore.QRect(390, 480, 113, 32))
         self.PushButtonCancel.setObjectName("PushButtonCancel")
         self.comboBoxLayer = QtWidgets.QComboBox(Dialog)
         self.comboBoxLayer.setGeometry(QtCore.QRect(170, 20, 321, 32))
@@ -60,6 +60,57 @@ class Ui_Dialog(object):
         self.mQgsSpinBoxIterations.setMaximum(10000)
         self.mQgsSpinBoxIterations.setProperty("value", 200)
         self.mQgsSpinBoxIterations.setObjectName("mQgsSpinBoxIterations")
+        self.label_7 = QtWidgets.QLabel(Dialog)
+        self.label_7.setGeometry(QtCore.QRect(30, 240, 131, 16))
+        self.label_7.setObjectName("label_7")
+        self.doubleSpinBoxTolerance = QtWidgets.QDoubleSpinBox(Dialog)
+        self.doubleSpinBoxTolerance.setGeometry(QtCore.QRect(180, 240, 90, 22))
+        self.doubleSpinBoxTolerance.setMaximum(100000.0)
+        self.doubleSpinBoxTolerance.setSingleStep(1.0)
+        self.doubleSpinBoxTolerance.setObjectName("doubleSpinBoxTolerance")
+        self.checkBoxSelectedOnly = QtWidgets.QCheckBox(Dialog)
+        self.checkBoxSelectedOnly.setGeometry(QtCore.QRect(30, 280, 231, 20))
+        self.checkBoxSelectedOnly.setObjectName("checkBoxSelectedOnly")
+        self.label_8 = QtWidgets.QLabel(Dialog)
+        self.label_8.setGeometry(QtCore.QRect(30, 320, 131, 16))
+        self.label_8.setObjectName("label_8")
+        self.mExpressionLineEditFilter = QgsExpressionLineEdit(Dialog)
+        self.mExpressionLineEditFilter.setGeometry(QtCore.QRect(170, 315, 321, 27))
+        self.mExpressionLineEditFilter.setObjectName("mExpressionLineEditFilter")
+        self.label_9 = QtWidgets.QLabel(Dialog)
+        self.label_9.setGeometry(QtCore.QRect(30, 360, 131, 16))
+        self.label_9.setObjectName("label_9")
+        self.comboBoxOutput = QtWidgets.QComboBox(Dialog)
+        self.comboBoxOutput.setGeometry(QtCore.QRect(170, 350, 321, 32))
+        self.comboBoxOutput.setObjectName("comboBoxOutput")
+        self.comboBoxOutput.addItem("")
+        self.comboBoxOutput.addItem("")
+        self.comboBoxOutput.addItem("")
+        self.label_10 = QtWidgets.QLabel(Dialog)
+        self.label_10.setGeometry(QtCore.QRect(30, 400, 131, 16))
+        self.label_10.setObjectName("label_10")
+        self.mQgsSpinBoxSegments = QgsSpinBox(Dialog)
+        self.mQgsSpinBoxSegments.setGeometry(QtCore.QRect(180, 400, 90, 27))
+        self.mQgsSpinBoxSegments.setMinimum(8)
+        self.mQgsSpinBoxSegments.setMaximum(720)
+        self.mQgsSpinBoxSegments.setProperty("value", 64)
+        self.mQgsSpinBoxSegments.setObjectName("mQgsSpinBoxSegments")
+        self.checkBoxFinish = QtWidgets.QCheckBox(Dialog)
+        self.checkBoxFinish.setGeometry(QtCore.QRect(290, 400, 211, 20))
+        self.checkBoxFinish.setObjectName("checkBoxFinish")
+        self.label_11 = QtWidgets.QLabel(Dialog)
+        self.label_11.setGeometry(QtCore.QRect(30, 450, 131, 16))
+        self.label_11.setObjectName("label_11")
+        self.comboBoxSchedule = QtWidgets.QComboBox(Dialog)
+        self.comboBoxSchedule.setGeometry(QtCore.QRect(170, 440, 321, 32))
+        self.comboBoxSchedule.setObjectName("comboBoxSchedule")
+        self.comboBoxSchedule.addItem("")
+        self.comboBoxSchedule.addItem("")
+        self.comboBoxSchedule.addItem("")
+        self.comboBoxSchedule.addItem("")
+        self.checkBoxJoin = QtWidgets.QCheckBox(Dialog)
+        self.checkBoxJoin.setGeometry(QtCore.QRect(290, 280, 211, 20))
+        self.checkBoxJoin.setObjectName("checkBoxJoin")
 
         self.retranslateUi(Dialog)
         self.PushButtonOk.clicked.connect(Dialog.accept) # type: ignore
@@ -76,4 +127,24 @@ class Ui_Dialog(object):
         self.label_4.setText(_translate("Dialog", "Friction"))
         self.label_5.setText(_translate("Dialog", "Ratio (Attraction %)"))
         self.label_6.setText(_translate("Dialog", "Iterations"))
+        self.label_7.setText(_translate("Dialog", "Simplify tolerance"))
+        self.doubleSpinBoxTolerance.setToolTip(_translate("Dialog", "Snapping and simplification tolerance in map units, applied before neighbour detection (0 = disabled)"))
+        self.checkBoxSelectedOnly.setText(_translate("Dialog", "Selected features only"))
+        self.label_8.setText(_translate("Dialog", "Filter expression"))
+        self.label_9.setText(_translate("Dialog", "Output"))
+        self.comboBoxOutput.setItemText(0, _translate("Dialog", "Points (size expression)"))
+        self.comboBoxOutput.setItemText(1, _translate("Dialog", "Points (diameter field)"))
+        self.comboBoxOutput.setItemText(2, _translate("Dialog", "Circle polygons"))
+        self.label_10.setText(_translate("Dialog", "Circle segments"))
+        self.checkBoxFinish.setToolTip(_translate("Dialog", "Move the circles that still overlap after the last iteration to the nearest free position"))
+        self.checkBoxFinish.setText(_translate("Dialog", "Remove remaining overlaps"))
+        self.label_11.setText(_translate("Dialog", "Cooling schedule"))
+        self.comboBoxSchedule.setToolTip(_translate("Dialog", "How friction and ratio vary over the iterations: they start with larger moves and more repulsion, and end on the values above"))
+        self.comboBoxSchedule.setItemText(0, _translate("Dialog", "Constant"))
+        self.comboBoxSchedule.setItemText(1, _translate("Dialog", "Linear"))
+        self.comboBoxSchedule.setItemText(2, _translate("Dialog", "Exponential"))
+        self.comboBoxSchedule.setItemText(3, _translate("Dialog", "Displacement-driven"))
+        self.checkBoxJoin.setToolTip(_translate("Dialog", "Store only the source fid in the output and join the original attributes on it (needs an integer primary key, e.g. GeoPackage)"))
+        self.checkBoxJoin.setText(_translate("Dialog", "Join attributes by fid"))
 from qgsspinbox import QgsSpinBox
+from qgsexpressionlineedit import QgsExpressionLineEdit
@@ -8,13 +8,27 @@
     - Positions (x, y) are updated accordingly.
 """
 import math
+import os
 import time
 
 from math import hypot
 
-from qgis.core import QgsSpatialIndex, QgsRectangle, QgsFeature, QgsGeometry, QgsPointXY
-
-def compute_dorling(centroid_dict, neighbours_dict,friction = 0.25, ratio = 0.4, iterations = 200):
+# QGIS is optional here: without it (e.g. in worker processes) the grid index is used
+try:
+    from qgis.core import QgsSpatialIndex, QgsRectangle, QgsFeature, QgsGeometry, QgsPointXY
+    HAS_QGIS = True
+except ImportError:
+    HAS_QGIS = False
+
+from .broad_phase import GridIndex, RadiusClassIndex
+from .checkpoint import save_checkpoint, restore_checkpoint
+from .schedules import make_schedule
+from .profiling import NULL_PROFILER
+
+def compute_dorling(centroid_dict, neighbours_dict,friction = 0.25, ratio = 0.4, iterations = 200,
+                    checkpoint_path = None, checkpoint_every = 50, resume = False, index = None,
+                    metrics_every = None, attraction = 'loop', schedule = 'constant', schedule_options = None,
+                    profiler = None, tolerance = None):
     """
     Run multiple iterations of the Dorling cartogram algorithm.
 
@@ -24,39 +38,161 @@ def compute_dorling(centroid_dict, neighbours_dict,friction = 0.25, ratio = 0.4,
         friction (float): Damping factor applied to motion vectors.
         ratio (float): Balance between repulsion and attraction forces (0 = only repulsion, 1 = only attraction).
         iterations (int): Number of iterations to run.
+        checkpoint_path (str): Optional checkpoint file, written every 'checkpoint_every' iterations.
+        checkpoint_every (int): Number of iterations between two checkpoints.
+        resume (bool): Resume from checkpoint_path if it exists and matches this run.
+        index (str): Broad phase, 'qgis' (QgsSpatialIndex), 'grid' (GridIndex, no QGIS needed)
+            or 'radius_class' (RadiusClassIndex, for heavy-tailed radii). Defaults to 'qgis' when QGIS is available.
+        metrics_every (int): Optional number of iterations between two quality measurements (see metrics.py).
+        attraction (str): Attraction kernel, 'loop' (per-neighbour Python loop), 'sparse'
+            (sparse matrix of border_length / perimeter weights, see kernels.py) or 'symmetric'
+            (whole iterations over unique interacting pairs, see kernels.symmetric_iteration;
+            its search windows follow the index).
+        schedule (str): Cooling schedule of friction and ratio, 'constant', 'linear', 'exponential'
+            or 'displacement' (see schedules.py). friction and ratio are the values reached at the end.
+        schedule_options (dict): Optional arguments of make_schedule (start_friction, start_ratio, decay).
+        profiler (StageProfiler): Optional profiler, each phase of the iterations is a stage (see profiling.py).
+        tolerance (float): Optional convergence check: stop once the mean displacement of an iteration
+            falls below this fraction of the mean radius. None runs all iterations.
+
+    Returns:
+        int: Number of the last iteration run.
     """
 
     # Start the timer to measure execution time
     start_time = time.time()
 
+    # Nothing to solve
+    if not centroid_dict:
+        return 0
+
     # Compute the maximum radius among all scaled circles.
     # This is used to define the search window size in the spatial index.
     rmax = max(props['radius_scaled'] for props in centroid_dict.values())
 
+    # Choose the broad phase
+    if index is None:
+        index = 'qgis' if HAS_QGIS else 'grid'
+
     displacements = {}
+
+    # Profiling is opt-in: without a profiler, stages are a shared no-op context
+    profiler = profiler or NULL_PROFILER
+
+    # Parameters of each iteration
+    parameters = make_schedule(schedule, friction, ratio, iterations, **(schedule_options or {}))
+    total_displacement = None
+
+    # The sparse attraction kernel is optional (it needs numpy)
+    if attraction == 'sparse':
+        from .kernels import build_attraction_matrix, sparse_attraction, centroid_arrays
+        attraction_matrix = build_attraction_matrix(centroid_dict, neighbours_dict)
+
+    # The symmetric kernel handles repulsion and attraction of each pair at once (it needs numpy)
+    if attraction == 'symmetric':
+        from .kernels import build_neighbour_pairs, symmetric_iteration
+        neighbour_pairs = build_neighbour_pairs(centroid_dict, neighbours_dict)
+
+    # Quality metrics are optional (they need numpy)
+    if metrics_every:
+        from .metrics import compute_metrics
+        metrics_history = {}
+
+    # Resume from a previous checkpoint if requested
+    first_iteration = 1
+    if checkpoint_path and resume and os.path.exists(checkpoint_path):
+        try:
+            last_iteration, total_displacement = restore_checkpoint(
+                checkpoint_path, centroid_dict, friction, ratio, iterations,
+                schedule, schedule_options, getattr(parameters, 'state', None)
+            )
+            first_iteration = last_iteration + 1
+            print(f"[DorlingCartogram] Resuming from checkpoint at iteration {last_iteration}")
+        except ValueError as e:
+            print(f"[DorlingCartogram] Ignoring checkpoint: {e}")
     
-    # Perform the algorithm for a fixed number of iterations
-    for i in range (1, iterations + 1):
-        # Rebuild the spatial index with current positions
-        spatial_index = create_spatial_index(centroid_dict)
+    # Displacement below which the layout has converged
+    if tolerance is not None:
+        threshold = tolerance * sum(props['radius_scaled'] for props in centroid_dict.values())
 
-        # Run one iteration of the Dorling algorithm
-        total_displacement = dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, friction, ratio)
+    # Perform the algorithm for a fixed number of iterations
+    i = first_iteration - 1
+    for i in range (first_iteration, iterations + 1):
+        # Parameters of this iteration, from the schedule
+        friction_i, ratio_i = parameters(i, total_displacement)
+
+        if attraction == 'symmetric':
+            # Run one iteration over unique pairs: repulsion and attraction of each pair at once
+            with profiler.stage('iteration'):
+                total_displacement = symmetric_iteration(centroid_dict, neighbour_pairs, rmax, friction_i, ratio_i, index)
+
+        else:
+            # Rebuild the spatial index with current positions
+            with profiler.stage('broad_phase'):
+                if index == 'grid':
+                    spatial_index = GridIndex(centroid_dict)
+                elif index == 'radius_class':
+                    spatial_index = RadiusClassIndex(centroid_dict)
+                else:
+                    spatial_index = create_spatial_index(centroid_dict)
+
+            # Compute all attraction vectors at once
+            attraction_vectors = None
+            if attraction == 'sparse':
+                with profiler.stage('attraction'):
+                    x, y, r = centroid_arrays(centroid_dict)
+                    xattract, yattract = sparse_attraction(attraction_matrix, x, y, r)
+                    attraction_vectors = (xattract.tolist(), yattract.tolist())
+
+            # Run one iteration of the Dorling algorithm
+            with profiler.stage('iteration'):
+                total_displacement = dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, friction_i, ratio_i, attraction_vectors)
 
         # Store the total displacement for every 10 iteration
         if i % 10 == 0:
             displacements[i] = round(total_displacement)
 
+        # Measure the layout quality every 'metrics_every' iterations
+        if metrics_every and i % metrics_every == 0:
+            with profiler.stage('metrics'):
+                metrics_history[i] = compute_metrics(centroid_dict, neighbours_dict)
+
+        # Save the state every 'checkpoint_every' iterations
+        if checkpoint_path and i % checkpoint_every == 0:
+            with profiler.stage('checkpoint'):
+                save_checkpoint(
+                    checkpoint_path, centroid_dict, i, friction, ratio, iterations,
+                    schedule, schedule_options, getattr(parameters, 'state', None), total_displacement
+                )
+
+        # Stop early once converged
+        if tolerance is not None and total_displacement < threshold:
+            print(f"[DorlingCartogram] Converged at iteration {i}")
+            break
+
+    # Last iteration run (before the early stop, if any)
+    last_iteration = i
+
     # End the timer and display the execution time
     end_time = time.time()
     print(f"[DorlingCartogram] Dorling iterations completed in {end_time - start_time:.2f} seconds")
 
     # Print the displacements for every 10 iteration
     print(f"[DorlingCartogram] Displacements (iteration: displacement): {displacements}")
+
+    # Print the quality metrics
+    if metrics_every:
+        for metrics_iteration, metrics in metrics_history.items():
+            print(
+                f"[DorlingCartogram] Metrics at iteration {metrics_iteration}: {metrics['overlap_count']} overlaps "
+                f"({metrics['overlap_ratio']:.2%} of the area), contacts {metrics['contacts']:.2%}, "
+                f"displacement mean {metrics['displacement_mean']:.1f} / max {metrics['displacement_max']:.1f}, "
+                f"angular distortion {metrics['angular_distortion']:.1f}°"
+            )
     
-    return
+    return last_iteration
 
-def dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, friction = 0.25, ratio = 0.4):
+def dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, friction = 0.25, ratio = 0.4, attraction_vectors = None, active_ids = None):
     """
     One iteration of the Dorling algorithm.
 
@@ -68,17 +204,30 @@ def dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, frict
     Args:
         centroid_dict (dict): { fid: { 'x', 'y', 'radius_scaled', 'perimeter', ... } }
         neighbours_dict (dict): { id1: { id2: border_length, ... } }
-        spatial_index (QgsSpatialIndex): spatial index of current centroids
+        spatial_index (QgsSpatialIndex, GridIndex or RadiusClassIndex): spatial index of current centroids
         rmax (float): max radius (scaled), used for search window
         friction (float): damping factor
         ratio (float): balance between repulsion and attraction (attraction %)
+        attraction_vectors (tuple): optional precomputed (xattract, yattract) lists in centroid_dict order
+            (active_ids order when given), replacing the attraction loop (see kernels.sparse_attraction)
+        active_ids (list): optional IDs of the circles to move. The other circles are frozen: they still
+            repel and attract the active ones, but keep their position (see incremental.py)
+
+    Returns:
+        float: Total displacement of the moved circles.
     """
 
     # Initialize cumulative displacement to monitor convergence
     total_displacement = 0.0
+
+    # Circles to move: all of them, or only the active ones
+    if active_ids is None:
+        moving = centroid_dict.items()
+    else:
+        moving = [(fid, centroid_dict[fid]) for fid in active_ids]
     
     # --- Iterate over each centroid ---
-    for id1, props1 in centroid_dict.items():
+    for k, (id1, props1) in enumerate(moving):
         # Extract position and geometric properties
         x1, y1 = props1['x'], props1['y']
         perimeter1 = props1['perimeter']
@@ -92,8 +241,7 @@ def dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, frict
         closest = float('inf')
         
         # Define a bounding box to search and retrieve potentially overlapping circles
-        search_rect = QgsRectangle(x1 - r1 - rmax, y1 - r1 - rmax, x1 + r1 + rmax, y1 + r1 + rmax)
-        nearby_ids = spatial_index.intersects(search_rect)
+        nearby_ids = query_index(spatial_index, x1, y1, r1, rmax)
 
         # --- Repulsion forces ---
         # Repulsion between overlapping circles to avoid collisions
@@ -123,8 +271,13 @@ def dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, frict
 
         # --- Attraction forces ---
         # Attraction toward original geographic neighbors
+        if attraction_vectors is not None:
+            # Precomputed by the sparse kernel
+            xattract = attraction_vectors[0][k]
+            yattract = attraction_vectors[1][k]
+
         # Iterate over all original neighbors
-        if id1 in neighbours_dict:
+        elif id1 in neighbours_dict:
             for id2, border_length in neighbours_dict[id1].items():
                 # ignore self
                 if id1 == id2:
@@ -170,7 +323,7 @@ def dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, frict
         props1['yvec'] = friction * (props1['yvec'] + ytotal)
 
     # --- Update positions ---
-    for id, props in centroid_dict.items():
+    for id, props in moving:
         # props['x'] += props['xvec']
         # props['y'] += props['yvec']
 
@@ -184,6 +337,31 @@ def dorling_iteration(centroid_dict, neighbours_dict, spatial_index, rmax, frict
 
     return total_displacement
 
+def query_index(spatial_index, x, y, r, rmax):
+    """
+    Returns the IDs of the centroids that may overlap a circle, for any kind of spatial index.
+
+    QgsSpatialIndex and GridIndex return every centroid within r + rmax (bounding box).
+    RadiusClassIndex narrows the window per radius class.
+
+    Args:
+        spatial_index (QgsSpatialIndex, GridIndex or RadiusClassIndex): spatial index of current centroids
+        x, y (float): circle centre
+        r (float): circle radius
+        rmax (float): max radius (scaled)
+
+    Returns:
+        list: Candidate feature IDs.
+    """
+
+    if isinstance(spatial_index, RadiusClassIndex):
+        return spatial_index.query(x, y, r)
+
+    xmin, ymin, xmax, ymax = x - r - rmax, y - r - rmax, x + r + rmax, y + r + rmax
+    if isinstance(spatial_index, GridIndex):
+        return spatial_index.intersects(xmin, ymin, xmax, ymax)
+    return spatial_index.intersects(QgsRectangle(xmin, ymin, xmax, ymax))
+
 def circles_overlap(x1, y1, r1, x2, y2, r2):
     """
     Computes the distance and overlap between two circles.
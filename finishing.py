@@ -0,0 +1,290 @@
+"""
+    Overlap-free finishing pass.
+
+    After the simulation, a few circles may still overlap. This pass moves each conflicting
+    circle, smallest first, to the nearest position where it overlaps no other circle:
+
+    - candidate positions are tangent to one nearby circle (pushed straight away from it)
+      or to two nearby circles at once
+    - candidates are tried by increasing displacement, the first free one is kept
+    - when no nearby candidate is free, the neighbourhood is enlarged
+
+    A repaired circle is never overlapped again, because later moves only go to free
+    positions, so a single pass over the conflicting circles leaves the layout overlap-free.
+
+    Conflicts are found per pair of radius classes (see broad_phase.class_pairs), and the
+    circles are indexed in packed arrays (PackedClassIndex) where moved circles are updated
+    one by one. Candidates are tested only against the circles around them. Beyond these
+    array operations over the layer, the cost depends on the remaining conflicts.
+"""
+import math
+import time
+
+import numpy as np
+
+from .broad_phase import PackedClassIndex, class_pairs, cross_pairs, radius_classes
+
+# Largest number of candidate / circle pairs tested at once, without a grid
+DENSE_TEST_SIZE = 100_000
+
+# Largest number of candidate positions tested at once
+MAX_CHUNK = 4096
+
+def remove_overlaps(centroid_dict, tolerance=1e-9, movable=None):
+    """
+    Remove the remaining overlaps of a solved layout, in place.
+
+    Args:
+        centroid_dict (dict): { fid: { 'x', 'y', 'radius_scaled', ... } }
+        tolerance (float): Relative overlap (of r1 + r2) still accepted as touching.
+            Moved circles are placed this much apart from their new neighbours.
+        movable (set): Optional IDs of the circles that may move (defaults to all). Overlaps
+            of these circles are removed; the other circles stay in place.
+
+    Returns:
+        dict: { 'conflicts' (overlapping circles found), 'moved' (circles moved), 'displacement' (total) }
+    """
+
+    # Start the timer to measure execution time
+    start_time = time.time()
+
+    fids = list(centroid_dict)
+    x, y, r = circle_arrays(centroid_dict, fids)
+    conflicts = overlapping_positions(x, y, r, tolerance)
+    if movable is not None:
+        conflicts = np.array([k for k in conflicts.tolist() if fids[k] in movable], dtype=np.int64)
+
+    moved, total_displacement = 0, 0.0
+
+    if len(conflicts):
+        index = PackedClassIndex(x, y, r)
+
+        # Smallest circles first: they fit in gaps, larger ones keep their place
+        for k in sorted(conflicts.tolist(), key=lambda k: (r[k], fids[k])):
+            x0, y0 = index.x[k], index.y[k]
+
+            # Skip circles freed by earlier moves
+            if is_free(index, k, x0, y0, tolerance):
+                continue
+
+            new_x, new_y = nearest_free_position(index, k, tolerance)
+            index.move(k, new_x, new_y)
+            props = centroid_dict[fids[k]]
+            props['x'], props['y'] = new_x, new_y
+
+            moved += 1
+            total_displacement += math.hypot(new_x - x0, new_y - y0)
+
+    # End the timer and display the execution time
+    end_time = time.time()
+    print(
+        f"[DorlingCartogram] Finishing pass: {len(conflicts)} overlapping circles, {moved} moved "
+        f"(total displacement {total_displacement:.1f}) in {end_time - start_time:.2f} seconds"
+    )
+
+    return {'conflicts': len(conflicts), 'moved': moved, 'displacement': total_displacement}
+
+def nearest_free_position(index, k, tolerance=1e-9):
+    """
+    Find the nearest position where circle k overlaps no other circle.
+
+    Args:
+        index (PackedClassIndex): Index of current positions.
+        k (int): Position of the circle to move in the index arrays.
+        tolerance (float): Relative gap left between tangent circles.
+
+    Returns:
+        (float, float): New centre.
+    """
+
+    x, y, r = float(index.x[k]), float(index.y[k]), float(index.r[k])
+
+    # Look for candidates within a growing displacement 'reach'
+    reach = max(r, 1e-12)
+    tested = -1.0
+    while True:
+        # Every circle that may overlap a position within reach
+        others = index.query(x, y, r + reach)
+        others = others[others != k]
+        cx, cy, cr = index.x[others], index.y[others], index.r[others]
+
+        # Only circles whose tangency circle passes within reach give candidates
+        near = np.abs(np.hypot(cx - x, cy - y) - (r + cr)) <= reach
+        px, py = tangent_positions(x, y, r, cx[near], cy[near], cr[near], tolerance)
+
+        # Candidates beyond reach are tried again with the next reach, with all the circles around them.
+        # Those within the previous reach were already tested against every circle that can reach them
+        displacement = np.hypot(px - x, py - y)
+        within = (displacement <= reach) & (displacement > tested)
+        px, py, displacement = px[within], py[within], displacement[within]
+
+        # Test candidates nearest first, by growing chunks
+        # (the first free candidate is usually among the nearest ones)
+        order = np.argsort(displacement, kind='stable')
+        start, chunk = 0, 256
+        while start < len(order):
+            batch = order[start:start + chunk]
+            start += chunk
+            chunk = min(2 * chunk, MAX_CHUNK)
+            free = free_positions(px[batch], py[batch], r, cx, cy, cr, tolerance)
+            if free.any():
+                best = batch[np.argmax(free)]
+                return float(px[best]), float(py[best])
+
+        tested = reach
+        reach *= 2
+        if reach > 64 * (r + index.rmax) * max(1, len(index.x)) ** 0.5:
+            break
+
+    # No free position nearby: leave the extent of all circles
+    xmax = float(np.max(index.x + index.r))
+    return xmax + r * (1 + tolerance), y
+
+def free_positions(px, py, r, cx, cy, cr, tolerance=1e-9):
+    """
+    Check which candidate positions of a circle of radius r overlap none of the circles around.
+
+    Each radius class of the circles around is tested at once, every candidate against every
+    circle of the class, unless that makes too many pairs: candidates and circles of the class
+    are then paired on a grid sized for the class (see broad_phase.cross_pairs), so that each
+    candidate is only tested against the circles that can reach it.
+
+    Args:
+        px, py (np.ndarray): Candidate centres.
+        r (float): Radius of the moved circle.
+        cx, cy, cr (np.ndarray): Centres and radii of the circles around.
+        tolerance (float): Relative overlap (of r1 + r2) still accepted as touching.
+
+    Returns:
+        np.ndarray: True for the free candidates.
+    """
+
+    blocked = np.zeros(len(px), dtype=bool)
+    if len(px) == 0 or len(cx) == 0:
+        return ~blocked
+
+    # Small neighbourhoods are a single group
+    if len(px) * len(cx) <= DENSE_TEST_SIZE:
+        groups = [(np.arange(len(cx)), None)]
+    else:
+        classes, class_rmax = radius_classes(cr)
+        groups = [(np.flatnonzero(classes == c), rmax_c) for c, rmax_c in enumerate(class_rmax.tolist())]
+
+    for members, rmax_c in groups:
+        if len(px) * len(members) <= DENSE_TEST_SIZE:
+            # Every candidate against every circle of the group
+            mx, my, mr = cx[members], cy[members], cr[members]
+            overlap = r + mr[None, :] - np.hypot(px[:, None] - mx[None, :], py[:, None] - my[None, :])
+            blocked |= np.any(overlap > tolerance * (r + mr[None, :]), axis=1)
+        else:
+            # Pairs of candidates and circles close enough, on a grid
+            i, j = cross_pairs(px, py, cx[members], cy[members], r + rmax_c)
+            j = members[j]
+            overlap = r + cr[j] - np.hypot(px[i] - cx[j], py[i] - cy[j])
+            blocked[i[overlap > tolerance * (r + cr[j])]] = True
+
+    return ~blocked
+
+def tangent_positions(x, y, r, cx, cy, cr, tolerance=1e-9):
+    """
+    Candidate positions for a circle of radius r, tangent to one or two nearby circles.
+
+    Args:
+        x, y (float): Current centre.
+        r (float): Radius.
+        cx, cy, cr (np.ndarray): Centres and radii of the circles around.
+        tolerance (float): Relative gap left between tangent circles.
+
+    Returns:
+        (np.ndarray, np.ndarray): Candidate centres.
+    """
+
+    # Centres tangent to circle k lie on a circle of radius a_k around it
+    a = (r + cr) * (1 + tolerance)
+
+    # --- Tangent to one circle: pushed straight away from its centre ---
+    dx, dy = x - cx, y - cy
+    d = np.hypot(dx, dy)
+    coincident = d <= 1e-12
+    d = np.where(coincident, 1.0, d)
+    ux = np.where(coincident, 1.0, dx / d)
+    uy = np.where(coincident, 0.0, dy / d)
+    single_x, single_y = cx + ux * a, cy + uy * a
+
+    # --- Tangent to two circles: intersections of the enlarged circles, of the pairs close enough ---
+    i, j = class_pairs(cx, cy, a)
+    dx, dy = cx[j] - cx[i], cy[j] - cy[i]
+    d = np.hypot(dx, dy)
+    a1, a2 = a[i], a[j]
+    valid = (d > 1e-12) & (d <= a1 + a2) & (d >= np.abs(a1 - a2))
+    dx, dy, d, a1, a2, x1, y1 = dx[valid], dy[valid], d[valid], a1[valid], a2[valid], cx[i][valid], cy[i][valid]
+
+    l = (a1 * a1 - a2 * a2 + d * d) / (2 * d)
+    h = np.sqrt(np.maximum(a1 * a1 - l * l, 0.0))
+    mx, my = x1 + l * dx / d, y1 + l * dy / d
+    nx, ny = -h * dy / d, h * dx / d
+
+    px = np.concatenate((single_x, mx + nx, mx - nx))
+    py = np.concatenate((single_y, my + ny, my - ny))
+    return px, py
+
+def is_free(index, k, x, y, tolerance=1e-9):
+    """
+    Check that circle k at (x, y) overlaps no other circle.
+    """
+
+    r = index.r[k]
+    others = index.query(x, y, r)
+    others = others[others != k]
+    r2 = index.r[others]
+    overlap = r + r2 - np.hypot(index.x[others] - x, index.y[others] - y)
+
+    return not np.any(overlap > tolerance * (r + r2))
+
+def circle_arrays(centroid_dict, fids):
+    """
+    Extract centres and radii as arrays, in the order of fids.
+
+    Returns:
+        x, y, r (np.ndarray)
+    """
+
+    n = len(fids)
+    x = np.fromiter((centroid_dict[fid]['x'] for fid in fids), dtype=float, count=n)
+    y = np.fromiter((centroid_dict[fid]['y'] for fid in fids), dtype=float, count=n)
+    r = np.fromiter((centroid_dict[fid]['radius_scaled'] for fid in fids), dtype=float, count=n)
+    return x, y, r
+
+def overlapping_positions(x, y, r, tolerance=1e-9):
+    """
+    Find all circles involved in an overlap, with array operations.
+
+    Args:
+        x, y, r (np.ndarray): Circle centres and radii.
+        tolerance (float): Relative overlap (of r1 + r2) still accepted as touching.
+
+    Returns:
+        np.ndarray: Sorted positions of the overlapping circles.
+    """
+
+    i, j = class_pairs(x, y, r)
+    overlap = r[i] + r[j] - np.hypot(x[j] - x[i], y[j] - y[i])
+    conflict = overlap > tolerance * (r[i] + r[j])
+
+    return np.unique(np.concatenate((i[conflict], j[conflict])))
+
+def overlapping_ids(centroid_dict, fids, tolerance=1e-9):
+    """
+    Find all circles involved in an overlap.
+
+    Args:
+        centroid_dict (dict): Centroid dictionary.
+        fids (list): Feature IDs, in the order used for the arrays.
+        tolerance (float): Relative overlap (of r1 + r2) still accepted as touching.
+
+    Returns:
+        set: IDs of the overlapping circles.
+    """
+
+    x, y, r = circle_arrays(centroid_dict, fids)
+    return {fids[k] for k in overlapping_positions(x, y, r, tolerance).tolist()}
@@ -0,0 +1,180 @@
+"""
+    Incremental re-solve when the values of a few regions change.
+
+    A full rerun preprocesses the whole layer and moves every circle again. When only a
+    handful of values change, most of the solved layout is still valid. IncrementalSolver
+    keeps a solved state and, for each update:
+
+    - updates the radii of the changed regions, with the scale factor of the solved state
+      (a full rerun would recompute it, and slightly resize every circle)
+    - re-simulates only the active circles: the changed ones and those they overlap.
+      All others are frozen: they repel and attract the active circles but do not move
+    - after every iteration, frozen circles that an active circle overlaps more than in the
+      solved state become active, so the re-solved neighbourhood grows only as far as the
+      change pushes (the residual overlaps of the solved state do not spread it)
+
+    The grid index of the centres is built once and then moved along with the active circles,
+    so an update costs in proportion to the active neighbourhood, not to the layer size
+    (the index is only rebuilt when a new radius exceeds the largest one).
+
+    This module does not depend on QGIS, e.g.:
+
+        solver = IncrementalSolver(centroid_dict, neighbours_dict)
+        solver.update({12: 35000.0, 47: 1200.0})
+"""
+import math
+import time
+
+from .broad_phase import GridIndex
+from .dorling_core import dorling_iteration, query_index, circles_overlap
+
+class IncrementalSolver:
+    """
+    Solved layout that can be updated region by region.
+    """
+
+    def __init__(self, centroid_dict, neighbours_dict, friction=0.25, ratio=0.4):
+        """
+        Args:
+            centroid_dict (dict): Solved centroids (see preprocessing and compute_dorling), updated in place.
+            neighbours_dict (dict): Neighbour pairs with shared border lengths.
+            friction (float): Damping factor of the re-solves.
+            ratio (float): Balance between repulsion and attraction of the re-solves.
+        """
+
+        self.centroid_dict = centroid_dict
+        self.neighbours_dict = neighbours_dict
+        self.friction = friction
+        self.ratio = ratio
+
+        # Scale factor of the solved state: scaled / raw radius of any circle
+        self.scale = next(
+            (props['radius_scaled'] / props['radius_raw'] for props in centroid_dict.values() if props['radius_raw'] > 0),
+            1.0
+        )
+
+        self.rmax = max((props['radius_scaled'] for props in centroid_dict.values()), default=0.0)
+        self.index = GridIndex(centroid_dict)
+
+    def update(self, values, iterations=100, tolerance=1e-3):
+        """
+        Apply new values and re-solve the affected neighbourhood.
+
+        Args:
+            values (dict): { fid: new value } of the changed regions.
+            iterations (int): Maximum number of iterations.
+            tolerance (float): Stop when the mean displacement of the active circles falls
+                below this fraction of their mean radius.
+
+        Returns:
+            set: IDs of the circles that were re-solved (the others did not move).
+
+        Raises:
+            ValueError: A region is not in the solved layout.
+        """
+
+        start_time = time.time()
+        centroid_dict = self.centroid_dict
+
+        # Nothing changed, nothing to re-solve
+        if not values:
+            return set()
+
+        unknown = [fid for fid in values if fid not in centroid_dict]
+        if unknown:
+            raise ValueError(f"Unknown regions: {', '.join(map(repr, unknown[:10]))}")
+
+        # Solved state of the changed circles, before their new radius
+        solved = {fid: (centroid_dict[fid]['x'], centroid_dict[fid]['y'], centroid_dict[fid]['radius_scaled']) for fid in values}
+
+        # --- New radii ---
+        for fid, value in values.items():
+            props = centroid_dict[fid]
+            props['radius_raw'] = math.sqrt(value / math.pi) if value and value > 0 else 0.0
+            props['radius_scaled'] = props['radius_raw'] * self.scale
+
+        # A larger circle than the largest one needs wider queries, and larger grid cells
+        rmax = max(centroid_dict[fid]['radius_scaled'] for fid in values)
+        if rmax > self.rmax:
+            self.rmax = rmax
+            self.index = GridIndex(centroid_dict)
+
+        # --- Active circles: the changed ones and those they overlap ---
+        active = []
+        active_set = set()
+        origins = {} # { fid: (x, y, r) } in the solved state, before the update
+        self.activate(values, active, active_set, origins)
+        origins.update(solved)
+        self.activate(self.overlapped(values, active_set, origins, tolerance), active, active_set, origins)
+
+        for i in range(1, iterations + 1):
+            displacement = dorling_iteration(
+                centroid_dict, self.neighbours_dict, self.index, self.rmax,
+                self.friction, self.ratio, active_ids=active
+            )
+
+            # Keep the grid in step with the moved circles
+            for fid in active:
+                props = centroid_dict[fid]
+                self.index.move(fid, props['x'], props['y'])
+
+            # Expand to the frozen circles that the active ones now overlap
+            self.activate(self.overlapped(active, active_set, origins, tolerance), active, active_set, origins)
+
+            # Stop once the neighbourhood has settled
+            mean_radius = sum(centroid_dict[fid]['radius_scaled'] for fid in active) / len(active)
+            if displacement / len(active) < tolerance * mean_radius:
+                break
+
+        end_time = time.time()
+        print(
+            f"[DorlingCartogram] Incremental update of {len(values)} regions: {len(active)} of "
+            f"{len(centroid_dict)} circles re-solved in {i} iterations, {end_time - start_time:.2f} seconds"
+        )
+
+        return active_set
+
+    def activate(self, fids, active, active_set, origins):
+        """
+        Add circles to the active list, with no leftover velocity from the solved state.
+
+        Their position and radius before they move are kept in 'origins'.
+        """
+
+        for fid in fids:
+            if fid in active_set:
+                continue
+            active.append(fid)
+            active_set.add(fid)
+            props = self.centroid_dict[fid]
+            origins[fid] = (props['x'], props['y'], props['radius_scaled'])
+            props['xvec'] = 0.0
+            props['yvec'] = 0.0
+
+    def overlapped(self, fids, active_set, origins, tolerance):
+        """
+        Returns the frozen circles that any of the given circles overlaps more than in the solved state.
+
+        The solved state has residual overlaps: only an increase of more than 'tolerance'
+        times the smaller radius counts, compared with the overlap of the same pair in 'origins'.
+        """
+
+        centroid_dict = self.centroid_dict
+        found = set()
+        for id1 in fids:
+            props1 = centroid_dict[id1]
+            x1, y1, r1 = props1['x'], props1['y'], props1['radius_scaled']
+            x0, y0, r0 = origins[id1]
+            for id2 in query_index(self.index, x1, y1, r1, self.rmax):
+                if id2 in active_set or id2 in found:
+                    continue
+                props2 = centroid_dict[id2]
+                x2, y2, r2 = props2['x'], props2['y'], props2['radius_scaled']
+                overlap = circles_overlap(x1, y1, r1, x2, y2, r2)[3]
+                if overlap <= 0:
+                    continue
+                solved_overlap = max(circles_overlap(x0, y0, r0, x2, y2, r2)[3], 0.0)
+                if overlap - solved_overlap > tolerance * min(r1, r2):
+                    found.add(id2)
+
+        return found
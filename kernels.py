@@ -0,0 +1,334 @@
+"""
+    Array kernels for the Dorling iteration.
+
+    - Attraction: the adjacency is kept as a sparse matrix of border_length / perimeter weights,
+      and all attraction vectors of an iteration are computed with sparse and array operations.
+      The work scales with the number of neighbour pairs, at native speed.
+    - Symmetric pairs: a whole iteration over the unique interacting pairs. Candidate pairs of
+      the broad phase and neighbour pairs are merged, the distance and overlap of each pair are
+      computed once, and the contributions are scattered to both circles (equal and opposite
+      repulsion, attraction weighted by the perimeter of each side). dorling_iteration evaluates
+      every overlapping pair from both sides, and neighbour pairs again in the attraction loop.
+      The search windows follow the broad phase of the loop: r + rmax for a grid, r + rmax of the
+      radius class of the other circle for RadiusClassIndex.
+
+    Kernels work on arrays in centroid_dict order, so their results can be read by position
+    in dorling_iteration.
+"""
+import numpy as np
+
+from .broad_phase import class_pairs, grid_pairs, radius_classes
+
+# scipy is optional: without it, sparse products fall back to np.bincount
+try:
+    from scipy import sparse
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+def build_attraction_matrix(centroid_dict, neighbours_dict):
+    """
+    Build the sparse attraction matrix W, with W[i, j] = border_length(i, j) / perimeter(i).
+
+    Rows and columns follow the order of centroid_dict. Self pairs, neighbours missing
+    from centroid_dict and regions without perimeter are ignored.
+
+    Args:
+        centroid_dict (dict): { fid: { 'perimeter', ... } }
+        neighbours_dict (dict): { id1: { id2: border_length, ... } }
+
+    Returns:
+        dict: {
+            'n': number of circles,
+            'rows', 'cols', 'weights': COO entries (np.ndarray), in CSR order,
+            'matrix': scipy CSR matrix (None without scipy)
+        }
+    """
+
+    position = {fid: k for k, fid in enumerate(centroid_dict)}
+
+    rows, cols, weights = [], [], []
+    for id1, props1 in centroid_dict.items():
+        perimeter1 = props1['perimeter']
+        if id1 not in neighbours_dict or perimeter1 <= 0:
+            continue
+        for id2, border_length in neighbours_dict[id1].items():
+            if id2 == id1 or id2 not in position:
+                continue
+            rows.append(position[id1])
+            cols.append(position[id2])
+            weights.append(border_length / perimeter1)
+
+    n = len(centroid_dict)
+    rows = np.array(rows, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    weights = np.array(weights, dtype=float)
+
+    matrix = None
+    if HAS_SCIPY:
+        matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(n, n))
+        matrix.sum_duplicates()
+        # Read the entries back in CSR order, so that matrix.data can be replaced in place
+        coo = matrix.tocoo()
+        rows, cols, weights = coo.row.astype(np.int64), coo.col.astype(np.int64), coo.data
+
+    return {'n': n, 'rows': rows, 'cols': cols, 'weights': weights, 'matrix': matrix}
+
+def sparse_attraction(attraction_matrix, x, y, r):
+    """
+    Compute the attraction vectors of all circles.
+
+    For each neighbour pair (i, j) that does not overlap (overlap < 0):
+        factor = -overlap * W[i, j] / dist
+        attraction(i) += factor * (p_j - p_i)
+
+    The per-pair differences p_j - p_i are summed by row (sparse row sums, or np.bincount),
+    rather than expanded as F @ p - p * (F @ 1): with projected coordinates around 1e6,
+    the two products nearly cancel and most significant digits of the attraction are lost.
+
+    Args:
+        attraction_matrix (dict): Result of build_attraction_matrix.
+        x, y, r (np.ndarray): Current positions and scaled radii (centroid_dict order).
+
+    Returns:
+        (np.ndarray, np.ndarray): xattract, yattract.
+    """
+
+    rows = attraction_matrix['rows']
+    cols = attraction_matrix['cols']
+    weights = attraction_matrix['weights']
+    n = attraction_matrix['n']
+
+    # Distance and overlap of every neighbour pair
+    dx = x[cols] - x[rows]
+    dy = y[cols] - y[rows]
+    dist = np.hypot(dx, dy)
+    overlap = r[rows] + r[cols] - dist
+
+    # Attraction only between separated circles
+    active = (overlap < 0) & (dist > 1e-6)
+    factor = np.zeros_like(dist)
+    factor[active] = -overlap[active] * weights[active] / dist[active]
+
+    matrix = attraction_matrix['matrix']
+    if matrix is not None:
+        # Same sparsity pattern, with the per-pair contributions as values
+        f = matrix.copy()
+        f.data = factor * dx
+        xattract = np.asarray(f.sum(axis=1)).ravel()
+        f.data = factor * dy
+        yattract = np.asarray(f.sum(axis=1)).ravel()
+    else:
+        xattract = np.bincount(rows, weights=factor * dx, minlength=n)
+        yattract = np.bincount(rows, weights=factor * dy, minlength=n)
+
+    return xattract, yattract
+
+def centroid_arrays(centroid_dict):
+    """
+    Extract current positions and scaled radii as arrays (centroid_dict order).
+
+    Returns:
+        x, y, r (np.ndarray)
+    """
+
+    n = len(centroid_dict)
+    props = centroid_dict.values()
+    x = np.fromiter((p['x'] for p in props), dtype=float, count=n)
+    y = np.fromiter((p['y'] for p in props), dtype=float, count=n)
+    r = np.fromiter((p['radius_scaled'] for p in props), dtype=float, count=n)
+    return x, y, r
+
+def build_neighbour_pairs(centroid_dict, neighbours_dict):
+    """
+    Collect each neighbour pair once, with the attraction weights of both sides.
+
+    Positions follow the order of centroid_dict. As in build_attraction_matrix, self pairs,
+    neighbours missing from centroid_dict and sides without perimeter get no attraction.
+
+    Args:
+        centroid_dict (dict): { fid: { 'perimeter', ... } }
+        neighbours_dict (dict): { id1: { id2: border_length, ... } }
+
+    Returns:
+        dict: {
+            'n': number of circles,
+            'keys': sorted pair keys i * n + j with i < j (np.ndarray),
+            'weights_i', 'weights_j': border_length / perimeter of the i and j sides (np.ndarray)
+        }
+    """
+
+    position = {fid: k for k, fid in enumerate(centroid_dict)}
+    n = len(centroid_dict)
+
+    weights = {} # { (i, j): [weight_i, weight_j] } with i < j
+    for id1, neighbours in neighbours_dict.items():
+        if id1 not in position:
+            continue
+        k1 = position[id1]
+        perimeter1 = centroid_dict[id1]['perimeter']
+        for id2, border_length in neighbours.items():
+            if id2 == id1 or id2 not in position:
+                continue
+            k2 = position[id2]
+            pair = weights.setdefault((min(k1, k2), max(k1, k2)), [0.0, 0.0])
+            if perimeter1 > 0:
+                pair[0 if k1 < k2 else 1] = border_length / perimeter1
+
+    pairs = sorted(weights.items())
+    keys = np.array([i * n + j for (i, j), _ in pairs], dtype=np.int64)
+    weights_i = np.array([w[0] for _, w in pairs], dtype=float)
+    weights_j = np.array([w[1] for _, w in pairs], dtype=float)
+
+    return {'n': n, 'keys': keys, 'weights_i': weights_i, 'weights_j': weights_j}
+
+def search_reach(r, rmax, index='grid'):
+    """
+    Reach of each circle in the search windows of the others.
+
+    Circle i sees circle j when their centres are within r_i + reach_j on each axis:
+    reach_j is rmax with a grid (or QgsSpatialIndex), and the largest radius of the class
+    of j with RadiusClassIndex, as in RadiusClassIndex.query.
+
+    Args:
+        r (np.ndarray): Scaled radii (centroid_dict order).
+        rmax (float): Max radius (scaled).
+        index (str): Broad phase of compute_dorling, 'qgis', 'grid' or 'radius_class'.
+
+    Returns:
+        np.ndarray: Reach of each circle.
+    """
+
+    if index == 'radius_class':
+        classes, class_rmax = radius_classes(r)
+        return class_rmax[classes]
+    return np.full(len(r), float(rmax))
+
+def unique_pairs(x, y, r, rmax, neighbour_pairs, index='grid'):
+    """
+    Enumerate the interacting pairs of an iteration, each once.
+
+    Candidates are the pairs of the broad phase within the search window of either side
+    (r_i + reach_j on each axis, see search_reach). Neighbour pairs are appended after them,
+    and removed from the candidates so that no pair appears twice.
+
+    Args:
+        x, y, r (np.ndarray): Current positions and scaled radii (centroid_dict order).
+        rmax (float): Max radius (scaled).
+        neighbour_pairs (dict): Result of build_neighbour_pairs.
+        index (str): Broad phase whose candidates are reproduced, 'qgis', 'grid' or 'radius_class'.
+
+    Returns:
+        i, j (np.ndarray): Positions of the pairs, i < j.
+        candidates (int): Number of candidate pairs, before the neighbour pairs.
+    """
+
+    n = len(x)
+    reach = search_reach(r, rmax, index)
+    if index == 'radius_class':
+        # Cells of rmax_a + rmax_b per pair of classes cover both windows
+        a, b = class_pairs(x, y, r)
+    else:
+        a, b = grid_pairs(x, y, 2 * rmax)
+    i, j = np.minimum(a, b), np.maximum(a, b)
+
+    # Keep the candidates inside the search window of either side
+    window = np.maximum(r[i] + reach[j], r[j] + reach[i])
+    near = (np.abs(x[j] - x[i]) <= window) & (np.abs(y[j] - y[i]) <= window)
+    i, j = i[near], j[near]
+
+    # Neighbour pairs are appended once: drop them from the candidates (binary search in the sorted keys)
+    neighbour_keys = neighbour_pairs['keys']
+    if len(neighbour_keys):
+        keys = i * n + j
+        found = np.minimum(np.searchsorted(neighbour_keys, keys), len(neighbour_keys) - 1)
+        other = neighbour_keys[found] != keys
+        i, j = i[other], j[other]
+    candidates = len(i)
+    i = np.concatenate((i, neighbour_keys // n))
+    j = np.concatenate((j, neighbour_keys % n))
+
+    return i, j, candidates
+
+def symmetric_iteration(centroid_dict, neighbour_pairs, rmax, friction=0.25, ratio=0.4, index='grid'):
+    """
+    One iteration of the Dorling algorithm over unique interacting pairs.
+
+    Same forces, limits and updates as dorling_iteration with the same broad phase:
+    - candidates of circle i are the centres j within r_i + reach_j on each axis (see search_reach);
+      they set the closest distance of the repulsion limit and repel i when they overlap it
+    - neighbours attract each other when they are separated
+
+    Args:
+        centroid_dict (dict): { fid: { 'x', 'y', 'radius_scaled', 'xvec', 'yvec', ... } }, updated in place.
+        neighbour_pairs (dict): Result of build_neighbour_pairs.
+        rmax (float): Max radius (scaled), used for the search window.
+        friction (float): Damping factor.
+        ratio (float): Balance between repulsion and attraction (attraction %).
+        index (str): Broad phase of dorling_iteration to reproduce, 'qgis', 'grid' or 'radius_class'.
+
+    Returns:
+        float: Total displacement.
+    """
+
+    x, y, r = centroid_arrays(centroid_dict)
+    n = len(x)
+    props = list(centroid_dict.values())
+    xvec = np.fromiter((p['xvec'] for p in props), dtype=float, count=n)
+    yvec = np.fromiter((p['yvec'] for p in props), dtype=float, count=n)
+
+    # --- Unique pairs: broad phase candidates and neighbours, merged ---
+    i, j, candidates = unique_pairs(x, y, r, rmax, neighbour_pairs, index)
+
+    # Distance and overlap, once per pair
+    dx = x[j] - x[i]
+    dy = y[j] - y[i]
+    dist = np.hypot(dx, dy)
+    overlap = r[i] + r[j] - dist
+
+    # --- Closest distance, over the search window of each side ---
+    closest = np.full(n, np.inf)
+    reach = search_reach(r, rmax, index)
+    window_i = r[i] + reach[j]
+    window_j = r[j] + reach[i]
+    seen_i = (np.abs(dx) <= window_i) & (np.abs(dy) <= window_i)
+    seen_j = (np.abs(dx) <= window_j) & (np.abs(dy) <= window_j)
+    np.minimum.at(closest, i[seen_i], dist[seen_i])
+    np.minimum.at(closest, j[seen_j], dist[seen_j])
+
+    # --- Repulsion: equal and opposite ---
+    repelling = (overlap > 0) & (dist > 1e-6)
+    factor = np.where(repelling, overlap / np.where(repelling, dist, 1.0), 0.0)
+    xrepel = np.bincount(j, weights=factor * dx, minlength=n) - np.bincount(i, weights=factor * dx, minlength=n)
+    yrepel = np.bincount(j, weights=factor * dy, minlength=n) - np.bincount(i, weights=factor * dy, minlength=n)
+
+    # --- Attraction: opposite, weighted by the perimeter of each side ---
+    weights_i = np.concatenate((np.zeros(candidates), neighbour_pairs['weights_i']))
+    weights_j = np.concatenate((np.zeros(candidates), neighbour_pairs['weights_j']))
+
+    attracting = (overlap < 0) & (dist > 1e-6)
+    pull = np.where(attracting, -overlap / np.where(attracting, dist, 1.0), 0.0)
+    xattract = np.bincount(i, weights=pull * weights_i * dx, minlength=n) - np.bincount(j, weights=pull * weights_j * dx, minlength=n)
+    yattract = np.bincount(i, weights=pull * weights_i * dy, minlength=n) - np.bincount(j, weights=pull * weights_j * dy, minlength=n)
+
+    # --- Limit repulsion forces to the closest neighbour ---
+    repdst = np.hypot(xrepel, yrepel)
+    limited = repdst > closest
+    scale = np.where(limited, closest / (repdst + 1e-6), 1.0)
+    xrepel *= scale
+    yrepel *= scale
+
+    # --- Limit attraction forces ---
+    atrdst = np.hypot(xattract, yattract)
+    bounded = (repdst > 0.0) & (atrdst > 1e-6)
+    xattract = np.where(bounded, repdst * xattract / (atrdst + 1.0), xattract)
+    yattract = np.where(bounded, repdst * yattract / (atrdst + 1.0), yattract)
+
+    # --- Combine forces, update motion vectors and positions ---
+    xvec = friction * (xvec + (1.0 - ratio) * xrepel + ratio * xattract)
+    yvec = friction * (yvec + (1.0 - ratio) * yrepel + ratio * yattract)
+
+    for p, new_x, new_y, new_xvec, new_yvec in zip(props, (x + xvec).tolist(), (y + yvec).tolist(), xvec.tolist(), yvec.tolist()):
+        p['x'], p['y'], p['xvec'], p['yvec'] = new_x, new_y, new_xvec, new_yvec
+
+    return float(np.hypot(xvec, yvec).sum())
@@ -1,10 +1,13 @@
+import math
+import struct
+
 from qgis.core import (
-    QgsVectorLayer, QgsFeature, QgsGeometry, QgsField, QgsPointXY,
-    QgsProperty, QgsSingleSymbolRenderer, QgsSymbol, QgsUnitTypes
+    QgsVectorLayer, QgsFeature, QgsFeatureRequest, QgsGeometry, QgsField, QgsPointXY,
+    QgsProperty, QgsSingleSymbolRenderer, QgsSymbol, QgsUnitTypes, QgsVectorLayerJoinInfo
 )
 from PyQt5.QtCore import QVariant
 
-def create_point_layer(input_layer, centroid_dict, layer_name="dorling"):
+def create_point_layer(input_layer, centroid_dict, layer_name="dorling", diameter=False, join=False, crs=None):
     """
     Create a memory point layer from a centroid_dict + original layer attributes.
 
@@ -12,55 +15,50 @@ def create_point_layer(input_layer, centroid_dict, layer_name="dorling"):
         input_layer (QgsVectorLayer): Original polygon layer (for attributes and CRS).
         centroid_dict (dict): { fid: { 'x': x, 'y': y, 'radius_raw': r_raw, 'radius_scaled': r_scaled, 'xvec': xvec, 'yvec': yvec } }
         layer_name (str): Name for the output memory layer.
+        diameter (bool): Also store the diameter (2 * radius_scaled) in a 'diameter' field,
+            so that the renderer can read the symbol size directly (see style_layer).
+        join (bool): Only store the source fid and link the original attributes with a join
+            (see join_key_field), instead of copying them into every feature.
+        crs (QgsCoordinateReferenceSystem): CRS of the centroids, when preprocessing reprojected
+            the layer (None = CRS of the input layer).
 
     Returns:
         QgsVectorLayer: Point memory layer with centroids and attributes.
     """
 
-    # Create memory point layer
-    crs = input_layer.crs().authid()
-    point_layer = QgsVectorLayer(f"Point?crs={crs}", layer_name, "memory")
-    provider = point_layer.dataProvider()
-
-    # --- Define fields ---
-    # Copy original fields
-    fields = input_layer.fields().toList()
-    # Add Dorling fields
-    fields.append(QgsField("radius_scaled", QVariant.Double))
-    # fields.append(QgsField("xvec", QVariant.Double))
-    # fields.append(QgsField("yvec", QVariant.Double))
+    # Join on the source fid when the input layer allows it
+    join_field = join_key_field(input_layer) if join else None
 
-    provider.addAttributes(fields)
-    point_layer.updateFields()
+    # Create memory point layer
+    point_layer, provider = create_output_layer("Point", input_layer, layer_name, diameter, join_field is not None, crs)
 
     # --- Build features from centroids ---
 
-    # Map original features by ID for quick lookup
-    input_feat_dict = {feat.id(): feat for feat in input_layer.getFeatures()}
+    # Map original attributes (or only the fid, when joined) by ID for quick lookup
+    input_attrs_dict = source_attributes(input_layer, centroid_dict, join_field)
 
     features = []
     for fid, props in centroid_dict.items():
         # Skip if the feature ID is not in the original input layer
-        if fid not in input_feat_dict:
+        if fid not in input_attrs_dict:
             continue
         
         # Extract centroid position and additional values
         x = props['x']
         y = props['y']
         radius_scaled = props['radius_scaled']
-        xvec = props['xvec']
-        yvec = props['yvec']
 
-        # Retrieve original feature and its attributes
-        orig_feat = input_feat_dict[fid]
-        orig_attrs = orig_feat.attributes()
+        # Retrieve original attributes
+        orig_attrs = input_attrs_dict[fid]
 
         # Create a new point feature at the centroid position
         new_feat = QgsFeature()
         new_feat.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
 
         # Combine original attributes and Dorling fields
-        new_attrs = orig_attrs + [radius_scaled, xvec, yvec]
+        new_attrs = orig_attrs + [radius_scaled]
+        if diameter:
+            new_attrs.append(2 * radius_scaled)
         new_feat.setAttributes(new_attrs)
 
         features.append(new_feat)
@@ -69,25 +67,229 @@ def create_point_layer(input_layer, centroid_dict, layer_name="dorling"):
     provider.addFeatures(features)
     point_layer.updateExtents()
 
+    # Link the original attributes
+    if join_field:
+        add_source_join(point_layer, input_layer, join_field)
+
     return point_layer
 
-def style_layer(layer, scaled_radius_field="radius_scaled"):
+def create_circle_layer(input_layer, centroid_dict, layer_name="dorling", segments=64, join=False, crs=None):
+    """
+    Create a memory polygon layer with real circles from a centroid_dict + original layer attributes.
+
+    Circles are built directly as WKB from a unit circle computed once,
+    so they render and export without any data-defined symbol size.
+
+    Args:
+        input_layer (QgsVectorLayer): Original polygon layer (for attributes and CRS).
+        centroid_dict (dict): { fid: { 'x': x, 'y': y, 'radius_scaled': r_scaled, ... } }
+        layer_name (str): Name for the output memory layer.
+        segments (int): Number of segments used to approximate each circle.
+        join (bool): Only store the source fid and join the original attributes (see create_point_layer).
+        crs (QgsCoordinateReferenceSystem): CRS of the centroids (see create_point_layer).
+
+    Returns:
+        QgsVectorLayer: Polygon memory layer with circles and attributes.
+    """
+
+    # Join on the source fid when the input layer allows it
+    join_field = join_key_field(input_layer) if join else None
+
+    # Create memory polygon layer
+    polygon_layer, provider = create_output_layer("Polygon", input_layer, layer_name, join=join_field is not None, crs=crs)
+
+    # Original attributes (or only the fid, when joined)
+    input_attrs_dict = source_attributes(input_layer, centroid_dict, join_field)
+
+    # Build all circles at once
+    fids = [fid for fid in centroid_dict if fid in input_attrs_dict]
+    wkbs = circle_polygons_wkb(
+        [centroid_dict[fid]['x'] for fid in fids],
+        [centroid_dict[fid]['y'] for fid in fids],
+        [centroid_dict[fid]['radius_scaled'] for fid in fids],
+        segments
+    )
+
+    features = []
+    for fid, wkb in zip(fids, wkbs):
+        geom = QgsGeometry()
+        geom.fromWkb(wkb)
+
+        new_feat = QgsFeature()
+        new_feat.setGeometry(geom)
+        new_feat.setAttributes(input_attrs_dict[fid] + [centroid_dict[fid]['radius_scaled']])
+
+        features.append(new_feat)
+
+    # --- Add features ---
+    provider.addFeatures(features)
+    polygon_layer.updateExtents()
+
+    # Link the original attributes
+    if join_field:
+        add_source_join(polygon_layer, input_layer, join_field)
+
+    return polygon_layer
+
+def source_attributes(input_layer, centroid_dict, join_field=None):
+    """
+    Attributes copied from the input layer into each output feature.
+
+    Args:
+        input_layer (QgsVectorLayer): Original polygon layer.
+        centroid_dict (dict): Processed features.
+        join_field (str): Join key field. When given, only the fid is kept and the input layer is not read.
+
+    Returns:
+        dict: { fid: [attribute, ...] }
+    """
+
+    if join_field:
+        return {fid: [fid] for fid in centroid_dict}
+
+    # Only the processed features are fetched, without their geometry
+    request = QgsFeatureRequest().setFilterFids(list(centroid_dict)).setFlags(QgsFeatureRequest.NoGeometry)
+    return {feat.id(): feat.attributes() for feat in input_layer.getFeatures(request)}
+
+def join_key_field(input_layer):
+    """
+    Returns the field of the input layer whose values are the feature IDs, or None.
+
+    This is the single integer primary key of providers such as GeoPackage or PostGIS.
+    Layers without one (e.g. shapefiles, memory layers) cannot be joined on their fid:
+    attributes are then copied, and a message is printed.
+    """
+
+    fields = input_layer.fields()
+    pk_indexes = input_layer.dataProvider().pkAttributeIndexes()
+
+    if len(pk_indexes) == 1:
+        field = fields.at(pk_indexes[0])
+        if field.type() in (QVariant.Int, QVariant.LongLong, QVariant.UInt, QVariant.ULongLong):
+            return field.name()
+
+    print(f"[DorlingCartogram] {input_layer.name()} has no integer primary key: attributes are copied instead of joined")
+    return None
+
+def add_source_join(layer, input_layer, join_field):
+    """
+    Join the original attributes on the 'source_fid' field, without prefix.
+
+    Args:
+        layer (QgsVectorLayer): Output layer.
+        input_layer (QgsVectorLayer): Original polygon layer.
+        join_field (str): Key field of the input layer (see join_key_field).
+    """
+
+    join_info = QgsVectorLayerJoinInfo()
+    join_info.setJoinLayer(input_layer)
+    join_info.setJoinFieldName(join_field)
+    join_info.setTargetFieldName("source_fid")
+    join_info.setPrefix("")
+    join_info.setUsingMemoryCache(True) # Attributes are read once, then looked up by key
+    join_info.setEditable(False)
+
+    layer.addJoin(join_info)
+    print(f"[DorlingCartogram] Attributes of {input_layer.name()} joined on '{join_field}'")
+
+def circle_polygons_wkb(xs, ys, radii, segments=64):
+    """
+    Build circle polygons as little-endian WKB.
+
+    The unit circle is computed once and each polygon is packed in a single call.
+
+    Args:
+        xs, ys (list): Circle centres.
+        radii (list): Circle radii.
+        segments (int): Number of segments per circle.
+
+    Returns:
+        list: WKB bytes of each circle.
+    """
+
+    # Unit circle, closed ring
+    angles = [2 * math.pi * k / segments for k in range(segments)]
+    unit = [(math.cos(a), math.sin(a)) for a in angles]
+    unit.append(unit[0])
+
+    # Byte order, geometry type (Polygon), ring count, point count, then coordinates
+    packer = struct.Struct(f"<BIII{2 * (segments + 1)}d")
+
+    wkbs = []
+    for x, y, r in zip(xs, ys, radii):
+        coords = []
+        for cx, cy in unit:
+            coords.append(x + r * cx)
+            coords.append(y + r * cy)
+        wkbs.append(packer.pack(1, 3, 1, segments + 1, *coords))
+
+    return wkbs
+
+def create_output_layer(geometry_type, input_layer, layer_name, diameter=False, join=False, crs=None):
+    """
+    Create an empty memory layer with the original fields plus the Dorling fields.
+
+    Args:
+        geometry_type (str): Memory layer geometry type ('Point' or 'Polygon').
+        input_layer (QgsVectorLayer): Original polygon layer (for fields and CRS).
+        layer_name (str): Name for the output memory layer.
+        diameter (bool): Add a 'diameter' field.
+        join (bool): Only add a 'source_fid' field instead of copying the original fields.
+        crs (QgsCoordinateReferenceSystem): CRS of the layer (None = CRS of the input layer).
+
+    Returns:
+        (QgsVectorLayer, QgsVectorDataProvider): The layer and its provider.
+    """
+
+    if crs is None:
+        crs = input_layer.crs()
+    layer = QgsVectorLayer(f"{geometry_type}?crs={crs.authid()}", layer_name, "memory")
+    # Custom CRS (e.g. the automatic projection, see reprojection.py) have no authority ID
+    if not crs.authid():
+        layer.setCrs(crs)
+    provider = layer.dataProvider()
+
+    # --- Define fields ---
+    # Copy original fields, or only keep the source fid when they are joined
+    if join:
+        fields = [QgsField("source_fid", QVariant.LongLong)]
+    else:
+        fields = input_layer.fields().toList()
+    # Add Dorling fields
+    fields.append(QgsField("radius_scaled", QVariant.Double))
+    if diameter:
+        fields.append(QgsField("diameter", QVariant.Double))
+
+    provider.addAttributes(fields)
+    layer.updateFields()
+
+    return layer, provider
+
+def style_layer(layer, scaled_radius_field="radius_scaled", diameter_field=None):
     """
     Apply a simple style to the Dorling centroid layer:
     - Circles with diameter = 2 * scaled_radius
     - In map units
 
+    When a diameter field is given, the size is read directly from that field
+    instead of evaluating an expression for every feature on every repaint.
+
     Args:
         layer (QgsVectorLayer): The centroid layer with 'radius_scaled' field.
         scaled_radius_field (str): Name of the scaled radius field.
+        diameter_field (str): Name of a precomputed diameter field (optional).
     """
 
     # Create a simple circle symbol
     symbol = QgsSymbol.defaultSymbol(layer.geometryType())
 
-    # Set size property: diameter = 2 * radius_scaled
-    size_expr = f"2 * \"{scaled_radius_field}\""
-    symbol.setDataDefinedSize(QgsProperty.fromExpression(size_expr))
+    if diameter_field:
+        # Set size property: read the diameter field
+        symbol.setDataDefinedSize(QgsProperty.fromField(diameter_field))
+    else:
+        # Set size property: diameter = 2 * radius_scaled
+        size_expr = f"2 * \"{scaled_radius_field}\""
+        symbol.setDataDefinedSize(QgsProperty.fromExpression(size_expr))
 
     # Force unit to be map units (meters if CRS is in meters)
     symbol.symbolLayer(0).setSizeUnit(QgsUnitTypes.RenderMapUnits)
@@ -0,0 +1,185 @@
+"""
+    Quality metrics of a Dorling layout, computed with array operations over the whole layer.
+
+    - Overlaps: number of overlapping circle pairs and their total overlap (lens) area
+    - Contacts: share of original neighbour pairs whose circles still touch
+    - Displacement: mean and max distance between each circle and its original centroid
+    - Angular distortion: mean change of the direction between original neighbours
+
+    They are cheap enough to be computed every few iterations (see compute_dorling)
+    and in benchmarks.
+"""
+import math
+
+import numpy as np
+
+from .broad_phase import class_pairs
+
+def compute_metrics(centroid_dict, neighbours_dict, touch_tolerance=0.01):
+    """
+    Compute all quality metrics of a layout.
+
+    Args:
+        centroid_dict (dict): { fid: { 'x', 'y', 'x_orig', 'y_orig', 'radius_scaled', ... } }
+        neighbours_dict (dict): { id1: { id2: border_length, ... } }
+        touch_tolerance (float): Two neighbours still touch when their distance is at most
+            (1 + touch_tolerance) * (r1 + r2).
+
+    Returns:
+        dict: {
+            'overlap_count': number of overlapping pairs,
+            'overlap_area': total overlap area,
+            'overlap_ratio': overlap area / total circle area,
+            'contacts': share of neighbour pairs still touching,
+            'displacement_mean': mean displacement from the original centroid,
+            'displacement_max': max displacement from the original centroid,
+            'angular_distortion': mean absolute change of neighbour directions (degrees)
+        }
+    """
+
+    fids, x, y, r, x0, y0 = layout_arrays(centroid_dict)
+    i, j = neighbour_pairs(neighbours_dict, fids)
+
+    metrics = overlap_metrics(x, y, r)
+    metrics['contacts'] = contact_share(x, y, r, i, j, touch_tolerance)
+    metrics.update(displacement_metrics(x, y, x0, y0))
+    metrics['angular_distortion'] = angular_distortion(x, y, x0, y0, i, j)
+
+    return metrics
+
+def layout_arrays(centroid_dict):
+    """
+    Extract the layout as arrays.
+
+    Returns:
+        fids, x, y, r, x_orig, y_orig (np.ndarray): One entry per circle, in centroid_dict order.
+    """
+
+    n = len(centroid_dict)
+    props = centroid_dict.values()
+
+    fids = np.fromiter(centroid_dict.keys(), dtype=np.int64, count=n)
+    x = np.fromiter((p['x'] for p in props), dtype=float, count=n)
+    y = np.fromiter((p['y'] for p in props), dtype=float, count=n)
+    r = np.fromiter((p['radius_scaled'] for p in props), dtype=float, count=n)
+    x0 = np.fromiter((p['x_orig'] for p in props), dtype=float, count=n)
+    y0 = np.fromiter((p['y_orig'] for p in props), dtype=float, count=n)
+
+    return fids, x, y, r, x0, y0
+
+def neighbour_pairs(neighbours_dict, fids):
+    """
+    Convert a neighbours dictionary into index arrays (each pair once).
+
+    Args:
+        neighbours_dict (dict): { id1: { id2: border_length, ... } }
+        fids (np.ndarray): Feature IDs, giving the index of each circle.
+
+    Returns:
+        (np.ndarray, np.ndarray): Indices i, j of the neighbour pairs.
+    """
+
+    position = {fid: k for k, fid in enumerate(fids.tolist())}
+    pairs = [
+        (position[id1], position[id2])
+        for id1, neighbours in neighbours_dict.items() if id1 in position
+        for id2 in neighbours if id1 < id2 and id2 in position
+    ]
+
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    pairs = np.array(pairs, dtype=np.int64)
+    return pairs[:, 0], pairs[:, 1]
+
+def overlap_metrics(x, y, r):
+    """
+    Count overlapping pairs and sum their lens areas.
+
+    Returns:
+        dict: { 'overlap_count', 'overlap_area', 'overlap_ratio' }
+    """
+
+    total_area = math.pi * np.sum(r * r)
+
+    # Candidate pairs, per pair of radius classes (a few large circles do not make every pair a candidate)
+    i, j = class_pairs(x, y, r)
+    d = np.hypot(x[j] - x[i], y[j] - y[i])
+    overlapping = d < r[i] + r[j]
+    d, r1, r2 = d[overlapping], r[i][overlapping], r[j][overlapping]
+
+    area = lens_area(d, r1, r2).sum()
+
+    return {
+        'overlap_count': int(overlapping.sum()),
+        'overlap_area': float(area),
+        'overlap_ratio': float(area / total_area) if total_area > 0 else 0.0
+    }
+
+def lens_area(d, r1, r2):
+    """
+    Intersection area of pairs of overlapping circles.
+
+    Args:
+        d (np.ndarray): Distances between centres (d < r1 + r2).
+        r1, r2 (np.ndarray): Radii.
+
+    Returns:
+        np.ndarray: Intersection areas.
+    """
+
+    rmin = np.minimum(r1, r2)
+
+    # One circle inside the other
+    contained = d <= np.abs(r1 - r2)
+
+    # Partial overlap (distances are clipped to avoid invalid values on contained pairs)
+    dc = np.where(contained, np.abs(r1 - r2) + rmin + 1e-12, d)
+    dc = np.maximum(dc, 1e-12)
+    a1 = r1 * r1 * np.arccos(np.clip((dc * dc + r1 * r1 - r2 * r2) / (2 * dc * r1), -1.0, 1.0))
+    a2 = r2 * r2 * np.arccos(np.clip((dc * dc + r2 * r2 - r1 * r1) / (2 * dc * r2), -1.0, 1.0))
+    k = (-dc + r1 + r2) * (dc + r1 - r2) * (dc - r1 + r2) * (dc + r1 + r2)
+    partial = a1 + a2 - 0.5 * np.sqrt(np.maximum(k, 0.0))
+
+    return np.where(contained, math.pi * rmin * rmin, partial)
+
+def contact_share(x, y, r, i, j, touch_tolerance=0.01):
+    """
+    Share of neighbour pairs whose circles still touch (or overlap).
+    """
+
+    if len(i) == 0:
+        return 1.0
+
+    d = np.hypot(x[j] - x[i], y[j] - y[i])
+    return float(np.mean(d <= (1.0 + touch_tolerance) * (r[i] + r[j])))
+
+def displacement_metrics(x, y, x0, y0):
+    """
+    Mean and max distance between each circle and its original centroid.
+
+    Returns:
+        dict: { 'displacement_mean', 'displacement_max' }
+    """
+
+    displacement = np.hypot(x - x0, y - y0)
+    return {
+        'displacement_mean': float(displacement.mean()) if len(displacement) else 0.0,
+        'displacement_max': float(displacement.max()) if len(displacement) else 0.0
+    }
+
+def angular_distortion(x, y, x0, y0, i, j):
+    """
+    Mean absolute change (degrees) of the direction from each neighbour to the other.
+    """
+
+    if len(i) == 0:
+        return 0.0
+
+    before = np.arctan2(y0[j] - y0[i], x0[j] - x0[i])
+    after = np.arctan2(y[j] - y[i], x[j] - x[i])
+
+    # Wrap the difference to [-pi, pi]
+    delta = np.angle(np.exp(1j * (after - before)))
+
+    return float(np.degrees(np.abs(delta)).mean())
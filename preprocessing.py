@@ -1,17 +1,45 @@
 import math
 import time
 from math import hypot
-from qgis.core import (
-    QgsVectorLayer, QgsFeature, QgsSpatialIndex, QgsGeometry, QgsPointXY
-)
 
-def preprocessing(input_layer, field_name):
+# QGIS is optional here: create_dicts_bulk also serves layers read without QGIS (see service.py)
+try:
+    from qgis.core import (
+        QgsVectorLayer, QgsFeature, QgsSpatialIndex, QgsGeometry, QgsPointXY, QgsRectangle,
+        QgsFeatureRequest, QgsExpression, QgsExpressionContext, QgsExpressionContextUtils, QgsProject
+    )
+    HAS_QGIS = True
+except ImportError:
+    HAS_QGIS = False
+
+# Optional bulk backend: vectorized GEOS operations from shapely >= 2.0
+try:
+    import numpy as np
+    import shapely
+    HAS_BULK = int(shapely.__version__.split('.')[0]) >= 2
+except ImportError:
+    HAS_BULK = False
+
+class FilterError(ValueError):
+    """Invalid filter expression (see filter_feature_ids)."""
+
+def preprocessing(input_layer, field_name, bulk=None, tolerance=0.0, selected_only=False, expression=None, chunk_size=None, crs=None):
     """
     Full preprocessing pipeline: compute centroids and neighbours.
 
     Args:
         input_layer (QgsVectorLayer): Input polygon layer (regions to be converted into circles).
         field_name (str): Field name used to compute the raw radius of each region (e.g. population, area, etc.).
+        bulk (bool): Use the bulk (WKB + STRtree) path. Defaults to True when shapely >= 2.0 is available.
+        tolerance (float): Snapping and simplification tolerance (map units) applied before neighbour detection. 0 disables it.
+        selected_only (bool): Only process the selected features.
+        expression (str): Optional filter expression limiting the processed features.
+        chunk_size (int): Streaming mode: read the layer in spatial chunks of at most this many
+            features (plus a halo), so that only one chunk of geometries is held in memory
+            (see create_dicts_chunked). None reads the whole layer at once.
+        crs (QgsCoordinateReferenceSystem): Projected CRS into which geometries are transformed
+            as they are read (see reprojection.py). None keeps the layer CRS.
+            The tolerance is then in units of this CRS.
 
     Returns:
         centroid_dict (dict): 
@@ -20,6 +48,8 @@ def preprocessing(input_layer, field_name):
                 { fid: { 
                     'x': x, 
                     'y': y, 
+                    'x_orig': x, 
+                    'y_orig': y, 
                     'perimeter': perimeter, 
                     'radius_raw': r_raw, 
                     'radius_scaled': r_scaled, 
@@ -36,11 +66,39 @@ def preprocessing(input_layer, field_name):
     # Start the timer to measure execution time
     start_time = time.time()
 
-    # Build the neighbours dictionary
-    neighbours_dict = create_neighbours_dict(input_layer)
-
-    # Create the centroid dictionary
-    centroid_dict = create_centroid_dict(input_layer, field_name, neighbours_dict)
+    # Use the bulk path whenever it is available
+    if bulk is None:
+        bulk = HAS_BULK
+    elif bulk and not HAS_BULK:
+        print("[DorlingCartogram] shapely >= 2.0 not available, falling back to per-feature preprocessing")
+        bulk = False
+
+    # Resolve the selection and filter expression into feature IDs (None = all features)
+    filter_ids = filter_feature_ids(input_layer, selected_only, expression)
+
+    # Reprojection: the bulk path transforms the whole geometry array at once when pyproj is
+    # available, every other path lets the feature requests transform each geometry
+    transform = None
+    if crs is not None and bulk and not chunk_size:
+        from .reprojection import bulk_transformer
+        transform = bulk_transformer(input_layer.crs(), crs)
+    request_crs = crs if transform is None else None
+    if crs is not None:
+        print(f"[DorlingCartogram] Reprojecting on the fly ({'pyproj, bulk' if transform else 'feature requests'})")
+
+    if chunk_size:
+        # Bounded memory: one spatial chunk of geometries at a time
+        centroid_dict, neighbours_dict = create_dicts_chunked(input_layer, field_name, chunk_size, tolerance, filter_ids, bulk, request_crs)
+    elif bulk:
+        # Export all geometries once, then process them as arrays
+        fids, wkbs, values = read_layer_wkb(input_layer, field_name, filter_ids, request_crs)
+        centroid_dict, neighbours_dict = create_dicts_bulk(fids, wkbs, values, tolerance, transform)
+    else:
+        # Build the neighbours dictionary
+        neighbours_dict = create_neighbours_dict(input_layer, tolerance, filter_ids, request_crs)
+
+        # Create the centroid dictionary
+        centroid_dict = create_centroid_dict(input_layer, field_name, neighbours_dict, tolerance, filter_ids, request_crs)
 
     # End the timer and display the execution time
     end_time = time.time()
@@ -48,7 +106,7 @@ def preprocessing(input_layer, field_name):
 
     return centroid_dict, neighbours_dict
 
-def create_neighbours_dict(layer):
+def create_neighbours_dict(layer, tolerance=0.0, filter_ids=None, crs=None):
     """
     Build a dictionary of neighbouring polygon pairs:
     {
@@ -56,8 +114,14 @@ def create_neighbours_dict(layer):
         ...
     }
 
+    Without shapely only the snapping part of the tolerance is applied:
+    simplifying each polygon on its own would break shared borders.
+
     Args:
         layer (QgsVectorLayer): A polygon vector layer.
+        tolerance (float): Snapping tolerance (map units). 0 disables it.
+        filter_ids (set): Feature IDs to process (None = all features).
+        crs (QgsCoordinateReferenceSystem): CRS into which geometries are transformed (None = layer CRS).
 
     Returns:
         dict: Neighbour relationship dictionary where each region ID maps
@@ -68,8 +132,14 @@ def create_neighbours_dict(layer):
     index = QgsSpatialIndex()
     feature_dict = {} # Dictionary to store features
 
+    # Only geometries are needed
+    request = build_feature_request(layer, [], True, filter_ids, crs)
+
     # Add each feature to the spatial index
-    for feat in layer.getFeatures():
+    for feat in layer.getFeatures(request):
+        # Snap vertices to a grid so that nearly coincident borders become shared
+        if tolerance > 0:
+            feat.setGeometry(feat.geometry().snappedToGrid(tolerance, tolerance))
         index.insertFeature(feat)
         feature_dict[feat.id()] = feat
 
@@ -116,7 +186,7 @@ def create_neighbours_dict(layer):
 
     return neighbours_dict
 
-def create_centroid_dict(input_layer, field_name, neighbours_dict):
+def create_centroid_dict(input_layer, field_name, neighbours_dict, tolerance=0.0, filter_ids=None, crs=None):
     """
     Compute centroids and initialize attributes.
 
@@ -130,16 +200,22 @@ def create_centroid_dict(input_layer, field_name, neighbours_dict):
         input_layer (QgsVectorLayer): Input polygon layer.
         field_name (str): Field used to compute raw radius.
         neighbours_dict (dict): Neighbour pairs (used to compute scale).
+        tolerance (float): Snapping tolerance, applied to the perimeter so that it matches the border lengths.
+        filter_ids (set): Feature IDs to process (None = all features).
+        crs (QgsCoordinateReferenceSystem): CRS into which geometries are transformed (None = layer CRS).
 
     Returns:
         dict: 
-            { fid: { 'x': x, 'y': y, 'perimeter': perimeter,'radius_raw': r_raw, 'radius_scaled': r_scaled, 'xvec': xvec, 'yvec': yvec } }
+            { fid: { 'x': x, 'y': y, 'x_orig': x, 'y_orig': y, 'perimeter': perimeter,'radius_raw': r_raw, 'radius_scaled': r_scaled, 'xvec': xvec, 'yvec': yvec } }
     """
 
     centroid_dict = {} # Dictionary to store results per feature
 
+    # Only the geometry and the value field are needed
+    request = build_feature_request(input_layer, [field_name], True, filter_ids, crs)
+
     # Iterate through each feature in the input layer
-    for feat in input_layer.getFeatures():
+    for feat in input_layer.getFeatures(request):
         fid = int(feat.id())
         geom = feat.geometry()
         if not geom:
@@ -150,7 +226,10 @@ def create_centroid_dict(input_layer, field_name, neighbours_dict):
         x, y = centroid.x(), centroid.y()
 
         # Compute perimeter of the polygon (used in attraction force weighting)
-        perimeter = geom.length()
+        if tolerance > 0:
+            perimeter = geom.snappedToGrid(tolerance, tolerance).length()
+        else:
+            perimeter = geom.length()
 
         # Get the value from the specified field and compute raw radius
         # The raw radius is proportional to sqrt(value / pi) for area-based scaling
@@ -161,6 +240,8 @@ def create_centroid_dict(input_layer, field_name, neighbours_dict):
         centroid_dict[fid] = {
             'x': x,
             'y': y,
+            'x_orig': x, # Original centroid, kept for quality metrics
+            'y_orig': y,
             'perimeter': perimeter,
             'radius_raw': radius_raw,
             'radius_scaled': 0.0, # To be computed after scale factor
@@ -217,4 +298,542 @@ def compute_scale_factor(centroid_dict, neighbours_dict):
         return 1.0
 
      # Return the scaling factor: average distance divided by average raw radius
-    return tdist / tradius
\ No newline at end of file
+    return tdist / tradius
+
+def read_layer_wkb(layer, field_name, filter_ids=None, crs=None):
+    """
+    Export every geometry of a layer as WKB in a single pass.
+
+    Features without geometry are skipped.
+
+    Args:
+        layer (QgsVectorLayer): A polygon vector layer.
+        field_name (str): Field used to compute raw radius.
+        filter_ids (set): Feature IDs to read (None = all features).
+        crs (QgsCoordinateReferenceSystem): CRS into which geometries are transformed (None = layer CRS).
+
+    Returns:
+        fids (list): Feature IDs.
+        wkbs (list): WKB bytes of each geometry.
+        values (list): Field values (0.0 for NULL).
+    """
+
+    fids, wkbs, values = [], [], []
+
+    # Only the geometry and the value field are needed
+    request = build_feature_request(layer, [field_name], True, filter_ids, crs)
+
+    for feat in layer.getFeatures(request):
+        geom = feat.geometry()
+        if not geom or geom.isEmpty():
+            continue # Skip invalid geometries
+
+        value = feat[field_name]
+
+        fids.append(int(feat.id()))
+        wkbs.append(bytes(geom.asWkb()))
+        values.append(float(value) if value else 0.0)
+
+    return fids, wkbs, values
+
+def build_feature_request(layer, attributes, geometry=True, filter_ids=None, crs=None):
+    """
+    Build a feature request fetching only what a step needs.
+
+    Args:
+        layer (QgsVectorLayer): Layer to read.
+        attributes (list): Names of the fields to fetch (empty list = no attributes).
+        geometry (bool): Whether geometries are fetched.
+        filter_ids (set): Feature IDs to fetch (None = all features).
+        crs (QgsCoordinateReferenceSystem): CRS into which geometries are transformed (None = layer CRS).
+
+    Returns:
+        QgsFeatureRequest: The feature request.
+    """
+
+    request = QgsFeatureRequest()
+
+    # Fetch only the requested attributes
+    if attributes:
+        request.setSubsetOfAttributes(attributes, layer.fields())
+    else:
+        request.setNoAttributes()
+
+    # Skip geometries when they are not needed
+    if not geometry:
+        request.setFlags(QgsFeatureRequest.NoGeometry)
+
+    # Restrict to the given features
+    if filter_ids is not None:
+        request.setFilterFids(list(filter_ids))
+
+    # Transform geometries as they are read, with the datum transformations of the project
+    if crs is not None and geometry:
+        request.setDestinationCrs(crs, QgsProject.instance().transformContext())
+
+    return request
+
+def filter_feature_ids(layer, selected_only=False, expression=None):
+    """
+    Resolve the current selection and/or a filter expression into a set of feature IDs.
+
+    The expression is evaluated in a single pass without geometry (unless the expression
+    needs it), fetching only the fields it references.
+
+    Args:
+        layer (QgsVectorLayer): Layer to filter.
+        selected_only (bool): Keep only the selected features.
+        expression (str): Filter expression (None or empty = no filter).
+
+    Returns:
+        set: Matching feature IDs, or None when no filter applies.
+
+    Raises:
+        FilterError: The expression cannot be parsed.
+    """
+
+    if not selected_only and not expression:
+        return None
+
+    filter_ids = set(layer.selectedFeatureIds()) if selected_only else None
+
+    if expression:
+        expr = QgsExpression(expression)
+        if expr.hasParserError():
+            raise FilterError(f"Invalid filter expression: {expr.parserErrorString()}")
+
+        request = QgsFeatureRequest().setFilterExpression(expression)
+        request.setExpressionContext(QgsExpressionContext(QgsExpressionContextUtils.globalProjectLayerScopes(layer)))
+
+        # Fetch only what the expression needs
+        columns = expr.referencedColumns()
+        if QgsFeatureRequest.ALL_ATTRIBUTES not in columns:
+            request.setSubsetOfAttributes(list(columns), layer.fields())
+        if not expr.needsGeometry():
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+
+        matching_ids = {feat.id() for feat in layer.getFeatures(request)}
+        filter_ids = matching_ids if filter_ids is None else filter_ids & matching_ids
+
+    return filter_ids
+
+def create_dicts_bulk(fids, wkbs, values, tolerance=0.0, transform=None):
+    """
+    Build the centroid and neighbours dictionaries with array-level geometry operations.
+
+    - Centroids and perimeters are computed on the whole geometry array at once.
+    - Candidate pairs come from a single bulk query of an STRtree with the 'touches' predicate.
+    - Shared border lengths are computed on all touching pairs at once.
+
+    When a tolerance is given, perimeters, neighbours and border lengths are computed
+    on snapped and simplified geometries (see simplify_geometries). Centroids always
+    come from the original geometries.
+
+    This function does not depend on QGIS.
+
+    Args:
+        fids (list): Feature IDs.
+        wkbs (list): WKB bytes of each geometry.
+        values (list): Field values used to compute raw radii.
+        tolerance (float): Snapping and simplification tolerance (map units). 0 disables it.
+        transform (function): Coordinate transformation applied to all geometries first,
+            on (N, 2) arrays (see reprojection.bulk_transformer). None = no reprojection.
+
+    Returns:
+        centroid_dict (dict): Same format as create_centroid_dict.
+        neighbours_dict (dict): Same format as create_neighbours_dict.
+    """
+
+    fids = np.asarray(fids, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+
+    # Decode all geometries at once
+    geoms = shapely.from_wkb(wkbs)
+
+    # Reproject all vertices at once
+    if transform is not None:
+        geoms = shapely.transform(geoms, transform)
+
+    # --- Centroids, perimeters and raw radii ---
+    centroids = shapely.centroid(geoms)
+    xs = shapely.get_x(centroids)
+    ys = shapely.get_y(centroids)
+    radii_raw = np.sqrt(np.where(values > 0, values, 0.0) / math.pi)
+
+    # Snap and simplify before neighbour detection
+    if tolerance > 0:
+        geoms = simplify_geometries(geoms, tolerance)
+    perimeters = shapely.length(geoms)
+
+    # --- Neighbours ---
+    # Bulk query: every (input, tree) pair whose geometries touch
+    tree = shapely.STRtree(geoms)
+    left, right = tree.query(geoms, predicate='touches')
+
+    # Keep each pair once
+    mask = left < right
+    left, right = left[mask], right[mask]
+
+    # Shared border lengths of all touching pairs
+    lengths = shapely.length(shapely.intersection(geoms[left], geoms[right]))
+
+    # --- Scale factor ---
+    # Average distance between neighbouring centroids divided by average combined raw radii
+    tdist = np.hypot(xs[right] - xs[left], ys[right] - ys[left]).sum()
+    tradius = (radii_raw[left] + radii_raw[right]).sum()
+    scale = float(tdist / tradius) if tradius != 0 else 1.0
+
+    # --- Build dictionaries ---
+    centroid_dict = {}
+    for fid, x, y, perimeter, radius_raw in zip(fids.tolist(), xs.tolist(), ys.tolist(), perimeters.tolist(), radii_raw.tolist()):
+        centroid_dict[fid] = {
+            'x': x,
+            'y': y,
+            'x_orig': x,
+            'y_orig': y,
+            'perimeter': perimeter,
+            'radius_raw': radius_raw,
+            'radius_scaled': radius_raw * scale,
+            'xvec': 0.0,
+            'yvec': 0.0
+        }
+
+    neighbours_dict = {fid: {} for fid in fids.tolist()}
+    for id1, id2, length in zip(fids[left].tolist(), fids[right].tolist(), lengths.tolist()):
+        neighbours_dict[id1][id2] = length
+        neighbours_dict[id2][id1] = length
+
+    return centroid_dict, neighbours_dict
+
+def simplify_geometries(geoms, tolerance):
+    """
+    Snap and simplify a geometry array while keeping shared borders shared.
+
+    - Vertices are snapped to a grid of size 'tolerance', which closes tiny slivers
+      and gaps that would otherwise break the 'touches' predicate.
+    - Shared borders are simplified once for both sides with the coverage simplifier
+      (GEOS >= 3.12). Older versions fall back to a per-polygon topology-preserving simplification.
+
+    Args:
+        geoms (np.ndarray): Array of shapely polygons.
+        tolerance (float): Snapping and simplification tolerance (map units).
+
+    Returns:
+        np.ndarray: Simplified geometries.
+    """
+
+    start_time = time.time()
+    vertices_before = shapely.get_num_coordinates(geoms).sum()
+
+    # Snap vertices to the grid
+    simplified = shapely.set_precision(geoms, tolerance)
+
+    # Simplify borders
+    if hasattr(shapely, 'coverage_simplify'):
+        simplified = shapely.coverage_simplify(simplified, tolerance)
+    else:
+        simplified = shapely.simplify(simplified, tolerance, preserve_topology=True)
+
+    # Keep the original geometry of polygons that collapsed on the grid
+    collapsed = shapely.is_empty(simplified)
+    simplified[collapsed] = geoms[collapsed]
+
+    vertices_after = shapely.get_num_coordinates(simplified).sum()
+    end_time = time.time()
+    print(f"[DorlingCartogram] Simplification: {vertices_before} -> {vertices_after} vertices in {end_time - start_time:.2f} seconds")
+
+    return simplified
+
+def create_dicts_chunked(layer, field_name, chunk_size, tolerance=0.0, filter_ids=None, bulk=None, crs=None):
+    """
+    Build the centroid and neighbours dictionaries while holding at most one chunk of geometries.
+
+    - A first pass streams the layer and keeps only a compact table: feature IDs,
+      bounding boxes and field values. Geometries are dropped as soon as they are read.
+    - Features are split into spatially coherent chunks of at most 'chunk_size'
+      features (see spatial_chunks).
+    - Each chunk is read again with a halo: every feature whose bounding box meets the chunk's
+      bounding box, widened by the tolerance (see chunk_box), so that all neighbours of the
+      chunk's features are loaded, including those that only touch once snapped. Centroids and
+      perimeters of the chunk's features and their shared borders are computed, then the
+      geometries of the chunk are freed.
+
+    A pair of neighbours spanning two chunks is found in both; it is kept in the chunk
+    with the lowest number only.
+
+    Only the snapping part of the tolerance is applied, as in the per-feature path:
+    simplifying a chunk on its own would break the borders shared with the next one.
+
+    Args:
+        layer (QgsVectorLayer): A polygon vector layer.
+        field_name (str): Field used to compute raw radius.
+        chunk_size (int): Maximum number of features per chunk (halo not included).
+        tolerance (float): Snapping tolerance (map units). 0 disables it.
+        filter_ids (set): Feature IDs to process (None = all features).
+        bulk (bool): Process each chunk with shapely arrays (defaults to HAS_BULK).
+        crs (QgsCoordinateReferenceSystem): CRS into which geometries are transformed (None = layer CRS).
+            Bounding boxes are read in this CRS too, so chunks and halos are built in it.
+
+    Returns:
+        centroid_dict (dict): Same format as create_centroid_dict.
+        neighbours_dict (dict): Same format as create_neighbours_dict.
+    """
+
+    if bulk is None:
+        bulk = HAS_BULK
+
+    # --- Pass 1: compact feature table ---
+    fids, bounds, values = read_layer_bounds(layer, field_name, filter_ids, crs)
+    if not fids:
+        return {}, {}
+
+    # --- Spatial chunks, split on bounding box centres ---
+    centres_x = [(b[0] + b[2]) / 2 for b in bounds]
+    centres_y = [(b[1] + b[3]) / 2 for b in bounds]
+    chunk_of, chunk_count = spatial_chunks(centres_x, centres_y, chunk_size)
+
+    # Members of each chunk, and position of each feature in the compact table
+    members = [[] for _ in range(chunk_count)]
+    for k, chunk in enumerate(chunk_of):
+        members[chunk].append(k)
+    position = {fid: k for k, fid in enumerate(fids)}
+
+    # Index of the bounding boxes only, to find the halo of each chunk
+    bounds_index = QgsSpatialIndex()
+    for fid, b in zip(fids, bounds):
+        bounds_index.addFeature(fid, QgsRectangle(*b))
+
+    centroid_dict = {}
+    neighbours_dict = {fid: {} for fid in fids}
+    max_loaded = 0
+
+    # --- Pass 2: one chunk (and its halo) at a time ---
+    for chunk in range(chunk_count):
+        home = members[chunk]
+
+        # Halo: every feature whose bounding box meets the bounding box of the chunk (widened by the tolerance)
+        loaded = bounds_index.intersects(QgsRectangle(*chunk_box(bounds, home, tolerance)))
+        max_loaded = max(max_loaded, len(loaded))
+
+        # Read the geometries of the chunk and its halo
+        request = build_feature_request(layer, [], True, set(loaded), crs)
+        geometries = {int(feat.id()): feat.geometry() for feat in layer.getFeatures(request)}
+        home_ids = {fids[k] for k in home}
+
+        if bulk:
+            stats, pairs = chunk_stats_bulk(geometries, home_ids, tolerance)
+        else:
+            stats, pairs = chunk_stats(geometries, home_ids, tolerance)
+
+        # Free the geometries of the chunk before reading the next one
+        del geometries
+
+        for fid, (x, y, perimeter) in stats.items():
+            centroid_dict[fid] = {
+                'x': x,
+                'y': y,
+                'x_orig': x,
+                'y_orig': y,
+                'perimeter': perimeter,
+                'radius_raw': math.sqrt(values[position[fid]] / math.pi) if values[position[fid]] > 0 else 0.0,
+                'radius_scaled': 0.0, # To be computed after scale factor
+                'xvec': 0.0,
+                'yvec': 0.0
+            }
+
+        # Keep each pair in one chunk only: the one of its lowest (chunk, fid)
+        for id1, id2, length in pairs:
+            key1 = (chunk_of[position[id1]], id1)
+            key2 = (chunk_of[position[id2]], id2)
+            if id1 in home_ids and key1 < key2:
+                neighbours_dict[id1][id2] = length
+                neighbours_dict[id2][id1] = length
+
+    # Compute and apply scaling factor to raw radii
+    scale = compute_scale_factor(centroid_dict, neighbours_dict)
+    for props in centroid_dict.values():
+        props['radius_scaled'] = props['radius_raw'] * scale
+
+    print(f"[DorlingCartogram] Chunked preprocessing: {len(fids)} features in {chunk_count} chunks, at most {max_loaded} geometries in memory")
+
+    return centroid_dict, neighbours_dict
+
+def chunk_box(bounds, members, tolerance=0.0):
+    """
+    Bounding box of the features of a chunk, widened by the snapping tolerance.
+
+    Snapping to a grid of size 'tolerance' moves each vertex by at most half of it, so two
+    features up to 'tolerance' apart can touch once snapped: their bounding boxes are then
+    within 'tolerance' of each other.
+
+    Args:
+        bounds (list): (xmin, ymin, xmax, ymax) of each feature.
+        members (list): Positions of the chunk's features in bounds.
+        tolerance (float): Snapping tolerance (map units).
+
+    Returns:
+        tuple: (xmin, ymin, xmax, ymax)
+    """
+
+    return (
+        min(bounds[k][0] for k in members) - tolerance, min(bounds[k][1] for k in members) - tolerance,
+        max(bounds[k][2] for k in members) + tolerance, max(bounds[k][3] for k in members) + tolerance
+    )
+
+def read_layer_bounds(layer, field_name, filter_ids=None, crs=None):
+    """
+    Stream a layer and keep only the bounding box and field value of each feature.
+
+    Features without geometry are skipped.
+
+    Args:
+        layer (QgsVectorLayer): A polygon vector layer.
+        field_name (str): Field used to compute raw radius.
+        filter_ids (set): Feature IDs to read (None = all features).
+        crs (QgsCoordinateReferenceSystem): CRS into which geometries are transformed (None = layer CRS).
+
+    Returns:
+        fids (list): Feature IDs.
+        bounds (list): (xmin, ymin, xmax, ymax) of each geometry.
+        values (list): Field values (0.0 for NULL).
+    """
+
+    fids, bounds, values = [], [], []
+
+    # Only the geometry and the value field are needed
+    request = build_feature_request(layer, [field_name], True, filter_ids, crs)
+
+    for feat in layer.getFeatures(request):
+        geom = feat.geometry()
+        if not geom or geom.isEmpty():
+            continue # Skip invalid geometries
+
+        box = geom.boundingBox()
+        value = feat[field_name]
+
+        fids.append(int(feat.id()))
+        bounds.append((box.xMinimum(), box.yMinimum(), box.xMaximum(), box.yMaximum()))
+        values.append(float(value) if value else 0.0)
+
+    return fids, bounds, values
+
+def spatial_chunks(xs, ys, chunk_size):
+    """
+    Split points into spatially coherent chunks of at most chunk_size points.
+
+    Chunks are built by recursive median splits along the longest side (k-d tree leaves),
+    so they stay balanced whatever the density of the layer.
+
+    Args:
+        xs, ys (list): Point coordinates.
+        chunk_size (int): Maximum number of points per chunk.
+
+    Returns:
+        chunk_of (list): Chunk number of each point.
+        chunk_count (int): Number of chunks.
+    """
+
+    chunk_size = max(1, int(chunk_size))
+    chunk_of = [0] * len(xs)
+    chunk_count = 0
+
+    stack = [list(range(len(xs)))]
+    while stack:
+        members = stack.pop()
+        if len(members) <= chunk_size:
+            for k in members:
+                chunk_of[k] = chunk_count
+            chunk_count += 1
+            continue
+
+        # Split at the median of the longest side
+        width = max(xs[k] for k in members) - min(xs[k] for k in members)
+        height = max(ys[k] for k in members) - min(ys[k] for k in members)
+        coords = xs if width >= height else ys
+        members.sort(key=lambda k: coords[k])
+        half = len(members) // 2
+        stack.append(members[half:])
+        stack.append(members[:half])
+
+    return chunk_of, chunk_count
+
+def chunk_stats(geometries, home_ids, tolerance=0.0):
+    """
+    Centroids, perimeters and shared borders of the features of a chunk (per-feature path).
+
+    Args:
+        geometries (dict): { fid: QgsGeometry } of the chunk and its halo.
+        home_ids (set): IDs of the chunk's own features.
+        tolerance (float): Snapping tolerance (map units). 0 disables it.
+
+    Returns:
+        stats (dict): { fid: (x, y, perimeter) } for the chunk's features.
+        pairs (list): [ (id1, id2, shared_border_length), ... ] with id1 in the chunk.
+    """
+
+    # Snap vertices to a grid so that nearly coincident borders become shared
+    if tolerance > 0:
+        snapped = {fid: geom.snappedToGrid(tolerance, tolerance) for fid, geom in geometries.items()}
+    else:
+        snapped = geometries
+
+    # Spatial index of the chunk and its halo
+    index = QgsSpatialIndex()
+    for fid, geom in snapped.items():
+        index.addFeature(fid, geom.boundingBox())
+
+    stats, pairs = {}, []
+    for id1 in home_ids:
+        if id1 not in geometries:
+            continue
+        geom1 = snapped[id1]
+
+        # Centroid from the original geometry, perimeter from the snapped one
+        centroid = geometries[id1].centroid().asPoint()
+        stats[id1] = (centroid.x(), centroid.y(), geom1.length())
+
+        for id2 in index.intersects(geom1.boundingBox()):
+            if id2 == id1:
+                continue
+            geom2 = snapped[id2]
+            if geom1.touches(geom2):
+                pairs.append((id1, id2, geom1.intersection(geom2).length()))
+
+    return stats, pairs
+
+def chunk_stats_bulk(geometries, home_ids, tolerance=0.0):
+    """
+    Same as chunk_stats, with array-level geometry operations (see create_dicts_bulk).
+    """
+
+    ids = np.fromiter(geometries.keys(), dtype=np.int64, count=len(geometries))
+    geoms = shapely.from_wkb([bytes(geom.asWkb()) for geom in geometries.values()])
+    home = np.isin(ids, np.fromiter(home_ids, dtype=np.int64, count=len(home_ids)))
+
+    # Centroids from the original geometries
+    centroids = shapely.centroid(geoms[home])
+    xs = shapely.get_x(centroids)
+    ys = shapely.get_y(centroids)
+
+    # Snap vertices to the grid before neighbour detection
+    if tolerance > 0:
+        snapped = shapely.set_precision(geoms, tolerance)
+        collapsed = shapely.is_empty(snapped)
+        snapped[collapsed] = geoms[collapsed]
+        geoms = snapped
+    perimeters = shapely.length(geoms[home])
+
+    stats = {
+        fid: (x, y, perimeter)
+        for fid, x, y, perimeter in zip(ids[home].tolist(), xs.tolist(), ys.tolist(), perimeters.tolist())
+    }
+
+    # Bulk query: every (chunk feature, loaded feature) pair whose geometries touch
+    home_index = np.nonzero(home)[0]
+    tree = shapely.STRtree(geoms)
+    left, right = tree.query(geoms[home], predicate='touches')
+    left = home_index[left]
+    lengths = shapely.length(shapely.intersection(geoms[left], geoms[right]))
+
+    pairs = list(zip(ids[left].tolist(), ids[right].tolist(), lengths.tolist()))
+    return stats, pairs
@@ -0,0 +1,163 @@
+"""
+    Session cache of preprocessing results.
+
+    Tuning friction, ratio or iterations reruns the dialog on the same layer: the centroids
+    and the neighbour graph do not change, only the simulation does. This cache keeps the
+    preprocessing results of the session, per layer and preprocessing parameters:
+
+    - entries are evicted least recently used first, when their estimated size exceeds
+      the memory budget
+    - all entries of a layer are dropped as soon as the layer changes: geometry or value edits,
+      added or deleted features, new data source or provider filter (subset string), or layer removal
+
+    compute_dorling moves circles in place, so every hit returns a fresh copy of the centroids.
+"""
+import sys
+
+from collections import OrderedDict
+
+# Layer signals after which the cached results of a layer are stale
+INVALIDATING_SIGNALS = (
+    'geometryChanged',
+    'attributeValueChanged',
+    'featureAdded',
+    'featuresDeleted',
+    'dataSourceChanged',
+    'subsetStringChanged',
+    'willBeDeleted'
+)
+
+class PreprocessingCache:
+    """
+    LRU cache of (centroid_dict, neighbours_dict) per layer and preprocessing parameters.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes (int): Memory budget of all entries (estimated, see estimate_size).
+        """
+
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # { key: (centroid_dict, neighbours_dict, size) }, least recent first
+        self.size = 0
+        self.watched = {} # { layer_id: (layer, slot) }
+
+    def key(self, layer, field_name, **params):
+        """
+        Build the cache key of a preprocessing run.
+
+        The key includes the provider filter of the layer (subset string), and with
+        'selected_only' the selected feature IDs, so that another filter or selection
+        is another entry.
+
+        Args:
+            layer (QgsVectorLayer): Input layer.
+            field_name (str): Field used to compute raw radius.
+            **params: Other preprocessing parameters (tolerance, expression, ...).
+
+        Returns:
+            tuple: Hashable key.
+        """
+
+        selection = frozenset(layer.selectedFeatureIds()) if params.get('selected_only') else None
+        return (layer.id(), layer.subsetString(), field_name, tuple(sorted(params.items())), selection)
+
+    def get(self, key):
+        """
+        Returns a copy of a cached result, or None.
+
+        Returns:
+            centroid_dict (dict): Fresh copy, safe to modify.
+            neighbours_dict (dict): Shared (not modified by the simulation).
+        """
+
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        # Most recently used last
+        self.entries.move_to_end(key)
+
+        centroid_dict, neighbours_dict, _ = entry
+        return {fid: dict(props) for fid, props in centroid_dict.items()}, neighbours_dict
+
+    def put(self, key, layer, centroid_dict, neighbours_dict):
+        """
+        Store a preprocessing result and watch its layer for changes.
+
+        The stored centroids are a copy, taken before the simulation moves them.
+        """
+
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[2]
+
+        size = estimate_size(centroid_dict, neighbours_dict)
+        if size > self.max_bytes:
+            return # Would evict everything else and still not fit
+
+        self.entries[key] = ({fid: dict(props) for fid, props in centroid_dict.items()}, neighbours_dict, size)
+        self.size += size
+        self.watch(layer)
+
+        # Evict least recently used entries until the budget is met
+        while self.size > self.max_bytes:
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+
+        print(f"[DorlingCartogram] Preprocessing cached ({len(self.entries)} entries, {self.size / 1e6:.1f} MB)")
+
+    def watch(self, layer):
+        """Invalidate the entries of a layer when it changes (connected once per layer)."""
+
+        layer_id = layer.id()
+        if layer_id in self.watched:
+            return
+
+        def slot(*args):
+            self.invalidate(layer_id)
+
+        for name in INVALIDATING_SIGNALS:
+            getattr(layer, name).connect(slot)
+        self.watched[layer_id] = (layer, slot)
+
+    def invalidate(self, layer_id):
+        """Drop all entries of a layer and stop watching it."""
+
+        for key in [key for key in self.entries if key[0] == layer_id]:
+            self.size -= self.entries.pop(key)[2]
+
+        layer, slot = self.watched.pop(layer_id, (None, None))
+        if layer is not None:
+            for name in INVALIDATING_SIGNALS:
+                try:
+                    getattr(layer, name).disconnect(slot)
+                except (RuntimeError, TypeError):
+                    pass # Layer already deleted, or signal already disconnected
+
+    def clear(self):
+        """Drop all entries and disconnect from all layers."""
+
+        for layer_id in list(self.watched):
+            self.invalidate(layer_id)
+        self.entries.clear()
+        self.size = 0
+
+def estimate_size(centroid_dict, neighbours_dict):
+    """
+    Estimate the memory used by a preprocessing result, in bytes.
+
+    Counts the dictionaries and their float values; small ints shared by Python are not counted.
+    """
+
+    float_size = sys.getsizeof(0.0)
+
+    size = sys.getsizeof(centroid_dict)
+    for props in centroid_dict.values():
+        size += sys.getsizeof(props) + len(props) * float_size
+
+    size += sys.getsizeof(neighbours_dict)
+    for neighbours in neighbours_dict.values():
+        size += sys.getsizeof(neighbours) + len(neighbours) * float_size
+
+    return size
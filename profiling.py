@@ -0,0 +1,136 @@
+"""
+    Opt-in CPU and memory profiling of the pipeline stages.
+
+    The plugin enables it when the 'DorlingCartogram/profile_dir' setting is set to a
+    directory (e.g. from the Python console with QSettings().setValue(...)). Each run then
+    writes a folder of files to be inspected offline:
+
+    - <stage>.prof: cProfile statistics of the stage (e.g. with python -m pstats or snakeviz)
+    - <stage>.txt: calls, time, peak traced memory and top allocation sites of the stage
+    - summary.txt: one line per stage
+
+    Stages that run many times (the phases of every iteration) are accumulated into one profile.
+
+    When profiling is disabled, the pipeline uses NULL_PROFILER, whose stages are a shared
+    no-op context: nothing is imported, traced or written.
+"""
+import contextlib
+import os
+import time
+
+class NullProfiler:
+    """Profiler that does nothing (profiling disabled)."""
+
+    _null_stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._null_stage
+
+    def close(self):
+        return None
+
+# Shared disabled profiler
+NULL_PROFILER = NullProfiler()
+
+class StageProfiler:
+    """
+    CPU (cProfile) and memory (tracemalloc) profiles accumulated per stage name.
+
+    Stages must not be nested: only one CPU profile can be active at a time.
+    """
+
+    def __init__(self, directory, top=25):
+        """
+        Args:
+            directory (str): Parent directory, a timestamped folder is created for the run.
+            top (int): Number of allocation sites listed per stage.
+        """
+
+        # Only needed when profiling is enabled
+        import cProfile
+        import tracemalloc
+        self._cProfile = cProfile
+        self._tracemalloc = tracemalloc
+
+        self.directory = os.path.join(directory, time.strftime("dorling_%Y%m%d_%H%M%S"))
+        os.makedirs(self.directory, exist_ok=True)
+        self.top = top
+
+        self.stages = {} # { name: { 'profile', 'calls', 'time', 'peak', 'allocations' } }
+
+        # Allocation sites are grouped by line: one frame per allocation is enough
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(1)
+
+        # Leave out the allocations of the snapshots themselves
+        self._filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Profile one run of a stage.
+
+        Args:
+            name (str): Stage name (runs with the same name are accumulated).
+        """
+
+        tracemalloc = self._tracemalloc
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {
+                'profile': self._cProfile.Profile(), 'calls': 0, 'time': 0.0, 'peak': 0, 'allocations': None
+            }
+
+        # Allocation sites are compared on the first run of the stage only (snapshots are slow)
+        before = tracemalloc.take_snapshot().filter_traces(self._filters) if stats['allocations'] is None else None
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+        start_time = time.perf_counter()
+        stats['profile'].enable()
+        try:
+            yield
+        finally:
+            stats['profile'].disable()
+            stats['time'] += time.perf_counter() - start_time
+            stats['calls'] += 1
+            stats['peak'] = max(stats['peak'], tracemalloc.get_traced_memory()[1] - current)
+            if before is not None:
+                after = tracemalloc.take_snapshot().filter_traces(self._filters)
+                stats['allocations'] = after.compare_to(before, 'lineno')[:self.top]
+
+    def close(self):
+        """
+        Stop tracing and write the files of every stage.
+
+        Returns:
+            str: Directory of the run.
+        """
+
+        if self._started_tracing:
+            self._tracemalloc.stop()
+
+        summary = []
+        for name, stats in self.stages.items():
+            stats['profile'].dump_stats(os.path.join(self.directory, f"{name}.prof"))
+
+            line = (
+                f"{name}: {stats['calls']} calls, {stats['time']:.3f} s, "
+                f"peak {stats['peak'] / 1e6:.1f} MB above the stage start"
+            )
+            summary.append(line)
+
+            with open(os.path.join(self.directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+                f.write(line + "\n\nTop allocations (first run, net size):\n")
+                for diff in stats['allocations'] or []:
+                    f.write(f"{diff}\n")
+
+        with open(os.path.join(self.directory, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n".join(summary) + "\n")
+
+        for line in summary:
+            print(f"[DorlingCartogram] Profile {line}")
+        print(f"[DorlingCartogram] Profiles written to {self.directory}")
+
+        return self.directory
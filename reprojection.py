@@ -0,0 +1,159 @@
+"""
+    Reprojection of the input layer inside the pipeline.
+
+    The simulation needs a projected CRS: distances, radii and border lengths in degrees
+    are meaningless. Instead of writing a reprojected copy of the layer before every run,
+    preprocessing reads the layer in its own CRS and transforms the geometries on the fly:
+
+    - bulk path with pyproj: all vertices of the geometry array are transformed in one call
+    - otherwise: each geometry is transformed as it is read (QgsFeatureRequest.setDestinationCrs)
+
+    Centroids, perimeters and shared border lengths are then measured in the projected CRS,
+    and the output layers are written in it.
+
+    The processing CRS is chosen with the 'DorlingCartogram/crs' setting (e.g. 'EPSG:3035').
+    Without it, geographic layers are projected with a Lambert azimuthal equal-area projection
+    centred on the layer extent (areas are preserved, shapes are barely distorted near the centre),
+    and projected layers are processed in their own CRS.
+
+    The pyproj helpers (laea_proj, array_transformer, is_geographic) do not need QGIS:
+    the local service (service.py) projects geographic input with them.
+"""
+# QGIS is optional here: the pyproj helpers also serve the service (see service.py)
+try:
+    from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsProject
+    HAS_QGIS = True
+except ImportError:
+    HAS_QGIS = False
+
+# Optional bulk transformation of coordinate arrays
+try:
+    import numpy as np
+    import pyproj
+    HAS_PYPROJ = True
+except ImportError:
+    HAS_PYPROJ = False
+
+def destination_crs(layer, authid=None):
+    """
+    Choose the CRS in which a layer is processed.
+
+    Args:
+        layer (QgsVectorLayer): Input layer.
+        authid (str): Chosen projected CRS (e.g. 'EPSG:3035'). Empty = automatic.
+
+    Returns:
+        QgsCoordinateReferenceSystem: Processing CRS, or None when the layer is processed in its own CRS.
+
+    Raises:
+        ValueError: The chosen CRS is unknown or geographic.
+    """
+
+    if authid:
+        crs = QgsCoordinateReferenceSystem(authid)
+        if not crs.isValid():
+            raise ValueError(f"Unknown CRS '{authid}'")
+        if crs.isGeographic():
+            raise ValueError(f"{authid} is a geographic CRS (in degrees), please choose a projected CRS")
+        return None if crs == layer.crs() else crs
+
+    if layer.crs().isGeographic():
+        return auto_projected_crs(layer)
+
+    return None
+
+def auto_projected_crs(layer):
+    """
+    Lambert azimuthal equal-area projection centred on the extent of a layer.
+
+    Args:
+        layer (QgsVectorLayer): Input layer (any CRS).
+
+    Returns:
+        QgsCoordinateReferenceSystem: Custom projected CRS, in metres.
+    """
+
+    # Centre of the extent, in longitude / latitude
+    extent = layer.extent()
+    wgs84 = QgsCoordinateReferenceSystem("EPSG:4326")
+    if layer.crs() != wgs84:
+        extent = QgsCoordinateTransform(layer.crs(), wgs84, QgsProject.instance()).transformBoundingBox(extent)
+    centre = extent.center()
+
+    return QgsCoordinateReferenceSystem.fromProj(laea_proj(centre.x(), centre.y()))
+
+def laea_proj(lon, lat):
+    """PROJ string of the Lambert azimuthal equal-area projection centred on (lon, lat), in metres."""
+
+    return f"+proj=laea +lat_0={lat:.6f} +lon_0={lon:.6f} +x_0=0 +y_0=0 +datum=WGS84 +units=m +no_defs"
+
+def bulk_transformer(source_crs, destination_crs):
+    """
+    Build a function transforming coordinate arrays, for shapely.transform.
+
+    pyproj picks its own transformation pipeline, which may differ from the datum
+    transformations set in the project (the per-feature path uses the project's).
+
+    Args:
+        source_crs (QgsCoordinateReferenceSystem): CRS of the layer.
+        destination_crs (QgsCoordinateReferenceSystem): Processing CRS.
+
+    Returns:
+        function: transform(coords) -> coords, on (N, 2) arrays, or None when pyproj is not available.
+    """
+
+    if not HAS_PYPROJ:
+        return None
+
+    return array_transformer(
+        pyproj.CRS.from_wkt(source_crs.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED)),
+        pyproj.CRS.from_wkt(destination_crs.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED))
+    )
+
+def array_transformer(source_crs, destination_crs):
+    """
+    Build a function transforming coordinate arrays with pyproj (requires HAS_PYPROJ).
+
+    Args:
+        source_crs, destination_crs: Any CRS accepted by pyproj (pyproj.CRS, 'EPSG:4326', PROJ string, WKT).
+
+    Returns:
+        function: transform(coords) -> coords, on (N, 2) arrays.
+    """
+
+    # QGIS and GeoJSON geometries are always in x = longitude / easting order
+    transformer = pyproj.Transformer.from_crs(
+        pyproj.CRS.from_user_input(source_crs), pyproj.CRS.from_user_input(destination_crs), always_xy=True
+    )
+
+    def transform(coords):
+        xs, ys = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack((xs, ys))
+
+    return transform
+
+def is_geographic(crs):
+    """
+    Whether a CRS (authority ID, PROJ string or WKT) is geographic, i.e. in degrees.
+
+    Without pyproj, only WKT definitions and the usual longitude / latitude IDs are recognised.
+
+    Raises:
+        ValueError: pyproj does not know the CRS.
+    """
+
+    if HAS_PYPROJ:
+        try:
+            return pyproj.CRS.from_user_input(crs).is_geographic
+        except pyproj.exceptions.CRSError as e:
+            raise ValueError(f"Unknown CRS '{crs}'") from e
+
+    return (
+        crs.strip().upper() in ('EPSG:4326', 'OGC:CRS84', 'URN:OGC:DEF:CRS:OGC:1.3:CRS84', 'URN:OGC:DEF:CRS:EPSG::4326')
+        or crs.lstrip().upper().startswith(('GEOGCS', 'GEOGCRS', 'GEOGRAPHICCRS'))
+    )
+
+def crs_name(crs):
+    """Short name of a CRS for messages and file names: its authority ID, or its PROJ string."""
+
+    return crs.authid() or crs.toProj()
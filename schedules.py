@@ -0,0 +1,94 @@
+"""
+    Cooling schedules for friction and ratio.
+
+    With constant parameters, early iterations are too timid to untangle large overlaps
+    and late iterations keep shaking a layout that is almost settled. A schedule varies
+    both parameters over the run:
+
+    - friction starts high (large moves) and cools down to the requested friction
+    - ratio starts low (repulsion first, to separate circles) and rises to the requested ratio,
+      so that attraction restores contacts once overlaps are resolved
+
+    The requested values are always reached at the end of the run, so a scheduled run
+    finishes with the same balance of forces as a constant one.
+
+    Schedules:
+        'constant': requested values at every iteration
+        'linear': linear interpolation over the iterations
+        'exponential': fast cooling at first, then slow (rate 'decay')
+        'displacement': progress follows the convergence, measured by the drop of the total
+            displacement since the first iteration (never moving backwards)
+"""
+import math
+
+SCHEDULES = ('constant', 'linear', 'exponential', 'displacement')
+
+def make_schedule(schedule, friction, ratio, iterations, start_friction=None, start_ratio=None, decay=5.0):
+    """
+    Build the parameter function of a schedule.
+
+    Args:
+        schedule (str): One of SCHEDULES.
+        friction (float): Final (requested) friction.
+        ratio (float): Final (requested) ratio.
+        iterations (int): Number of iterations of the run.
+        start_friction (float): Friction of the first iteration (defaults to halfway between friction and 1).
+        start_ratio (float): Ratio of the first iteration (defaults to a quarter of ratio).
+        decay (float): Rate of the exponential schedule.
+
+    Returns:
+        function: parameters(i, displacement) -> (friction, ratio), with i the iteration number (from 1)
+            and displacement the total displacement of the previous iteration (None before the first one).
+            The 'displacement' schedule depends on the past iterations: its state is the dict
+            parameters.state, saved and restored by checkpoints (see checkpoint.py).
+
+    Raises:
+        ValueError: Unknown schedule, or exponential schedule with a decay that is not positive.
+    """
+
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule '{schedule}', expected one of {', '.join(SCHEDULES)}")
+    if schedule == 'exponential' and decay <= 0:
+        raise ValueError(f"The exponential schedule needs a positive decay, got {decay}")
+
+    if start_friction is None:
+        start_friction = (friction + 1.0) / 2
+    if start_ratio is None:
+        start_ratio = ratio / 4
+
+    def interpolate(progress):
+        """Parameters at a progress between 0 (start) and 1 (requested values)."""
+        return (
+            start_friction + (friction - start_friction) * progress,
+            start_ratio + (ratio - start_ratio) * progress
+        )
+
+    if schedule == 'constant':
+        return lambda i, displacement: (friction, ratio)
+
+    if schedule == 'linear':
+        def parameters(i, displacement):
+            return interpolate((i - 1) / max(iterations - 1, 1))
+        return parameters
+
+    if schedule == 'exponential':
+        # Normalized so that the progress is exactly 0 at the first iteration and 1 at the last
+        scale = 1.0 - math.exp(-decay)
+        def parameters(i, displacement):
+            t = (i - 1) / max(iterations - 1, 1)
+            return interpolate((1.0 - math.exp(-decay * t)) / scale)
+        return parameters
+
+    # --- Displacement-driven ---
+    state = {'first': None, 'progress': 0.0}
+    def parameters(i, displacement):
+        if i >= iterations:
+            return friction, ratio # Always end on the requested values
+        if displacement is not None:
+            if state['first'] is None:
+                state['first'] = displacement
+            elif state['first'] > 0:
+                state['progress'] = max(state['progress'], min(1.0, 1.0 - displacement / state['first']))
+        return interpolate(state['progress'])
+    parameters.state = state
+    return parameters
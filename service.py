@@ -0,0 +1,597 @@
+"""
+    Local cartogram service, without QGIS.
+
+    A small HTTP server that computes Dorling cartograms on demand:
+
+    - input: a GeoJSON FeatureCollection (inline or file) or a GeoPackage layer
+    - geographic input (longitude / latitude, e.g. plain GeoJSON) is projected with pyproj to a
+      Lambert azimuthal equal-area projection centred on its extent (see reprojection.py),
+      and the circle centres are transformed back; it is rejected when pyproj is missing
+    - output: a GeoJSON FeatureCollection of circle centres in the CRS of the input, with the
+      feature id and radius (in the units of the processing CRS: metres for geographic input)
+    - a pool of worker processes is started and warmed up once (imports, first allocations),
+      so requests only pay for the computation
+    - preprocessing results (centroids and adjacency) are cached per input, field and tolerance:
+      repeated requests on the same input only run the simulation
+
+    Only the Python standard library, numpy and shapely >= 2.0 are needed (and pyproj for
+    geographic input). The server only
+    listens on the local host by default and never needs a network connection.
+
+    Start the service from the directory containing the plugin folder:
+
+        python -m dorling_cartogram.service --port 8765 --workers 4
+
+    Request a cartogram:
+
+        curl -X POST http://127.0.0.1:8765/cartogram -d '{
+            "path": "/data/regions.gpkg", "layer": "regions", "field": "population",
+            "friction": 0.25, "ratio": 0.4, "iterations": 200
+        }'
+
+    Request body (JSON):
+        field (str): Field used to compute the radii (required).
+        geojson (dict): Inline FeatureCollection, or
+        path (str): GeoJSON or GeoPackage file (read by the workers),
+        layer (str): GeoPackage table (defaults to the first feature table).
+        crs (str): CRS of the input (e.g. 'EPSG:3857'), overriding the one it declares:
+            the 'crs' member of GeoJSON (EPSG:4326 without it), the srs_id of a GeoPackage table.
+        friction, ratio (float): As in the plugin dialog, between 0 and 1.
+        iterations (int): Number of iterations, at least 1.
+        tolerance (float): Snapping and simplification tolerance, at least 0.
+        remove_overlaps (bool): Run the finishing pass (see finishing.py).
+
+    Invalid requests are answered with status 400, failures during the computation with 500.
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .dorling_core import compute_dorling
+from .reprojection import HAS_PYPROJ, array_transformer, is_geographic, laea_proj
+from .sweep import python_executable
+
+# Default parameters of a request (same as the plugin dialog)
+DEFAULTS = {'friction': 0.25, 'ratio': 0.4, 'iterations': 200, 'tolerance': 0.0, 'remove_overlaps': False}
+
+class CartogramService:
+    """
+    Warm worker pool and preprocessing cache shared by all requests.
+    """
+
+    def __init__(self, workers=None, cache_entries=16):
+        """
+        Args:
+            workers (int): Number of worker processes (defaults to the CPU count).
+            cache_entries (int): Number of preprocessing results kept (least recently used evicted first).
+        """
+
+        # Spawned workers, as in sweep.py
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(python_executable())
+
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=warm_worker)
+
+        self.cache_entries = cache_entries
+        self.cache = OrderedDict() # { key: (centroid_dict, neighbours_dict, ids, crs) }
+        self.lock = threading.Lock()
+
+    def warm_up(self):
+        """Start every worker now, rather than on the first requests."""
+
+        start_time = time.time()
+        pids = set(self.executor.map(worker_pid, range(self.workers)))
+        end_time = time.time()
+        print(f"[DorlingCartogram] {len(pids)} workers ready in {end_time - start_time:.2f} seconds")
+
+    def cartogram(self, request):
+        """
+        Compute a cartogram.
+
+        Args:
+            request (dict): Request body (see the module docstring).
+
+        Returns:
+            dict: GeoJSON FeatureCollection of circle centres.
+        """
+
+        start_time = time.time()
+
+        if 'field' not in request:
+            raise ValueError("Missing 'field'")
+        if 'geojson' not in request and 'path' not in request:
+            raise ValueError("Missing 'geojson' or 'path'")
+
+        params = parse_params(request)
+        source = {name: request[name] for name in ('geojson', 'path', 'layer', 'crs') if name in request}
+        key = (source_key(source), source.get('crs'), request['field'], params['tolerance'])
+
+        # --- Preprocessing, from the cache when possible ---
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+
+        if cached is None:
+            cached = self.executor.submit(preprocess_task, source, request['field'], params['tolerance']).result()
+            with self.lock:
+                self.cache[key] = cached
+                while len(self.cache) > self.cache_entries:
+                    self.cache.popitem(last=False)
+
+        # --- Simulation ---
+        centroid_dict, neighbours_dict, ids, crs = cached
+        features = self.executor.submit(simulate_task, centroid_dict, neighbours_dict, ids, params, crs).result()
+
+        end_time = time.time()
+        print(f"[DorlingCartogram] Service request: {len(features)} circles in {end_time - start_time:.2f} seconds")
+
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def close(self):
+        """Stop the workers."""
+        self.executor.shutdown()
+
+class CartogramHandler(BaseHTTPRequestHandler):
+    """
+    HTTP endpoints:
+        GET /health: service status
+        POST /cartogram: compute a cartogram
+    """
+
+    service = None # CartogramService, set by serve()
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok', 'workers': self.service.workers, 'cached_inputs': len(self.service.cache)})
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path != '/cartogram':
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            result = self.service.cartogram(request)
+        except (ValueError, KeyError, OSError, sqlite3.Error) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            # Any other failure (invalid geometry, worker lost, ...) still gets an answer
+            print(f"[DorlingCartogram] Service request failed: {type(e).__name__}: {e}")
+            self.send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+
+        self.send_json(200, result)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve(host='127.0.0.1', port=8765, workers=None, cache_entries=16):
+    """
+    Start the service and handle requests until interrupted.
+
+    Args:
+        host (str): Listening address (local host only by default).
+        port (int): Listening port.
+        workers (int): Number of worker processes.
+        cache_entries (int): Number of preprocessing results kept.
+    """
+
+    service = CartogramService(workers, cache_entries)
+    service.warm_up()
+
+    CartogramHandler.service = service
+    server = ThreadingHTTPServer((host, port), CartogramHandler)
+    print(f"[DorlingCartogram] Service listening on http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+def parse_params(request):
+    """
+    Read and check the simulation parameters of a request, with DEFAULTS for the missing ones.
+
+    Returns:
+        dict: { 'friction', 'ratio', 'iterations', 'tolerance', 'remove_overlaps' }
+
+    Raises:
+        ValueError: A parameter is not a number, or out of range.
+    """
+
+    params = {name: request.get(name, value) for name, value in DEFAULTS.items()}
+    return {
+        'friction': parse_number(params['friction'], 'friction', 0.0, 1.0),
+        'ratio': parse_number(params['ratio'], 'ratio', 0.0, 1.0),
+        'iterations': parse_count(params['iterations'], 'iterations'),
+        'tolerance': parse_number(params['tolerance'], 'tolerance', 0.0),
+        'remove_overlaps': parse_bool(params['remove_overlaps'], 'remove_overlaps')
+    }
+
+def parse_number(value, name, minimum, maximum=math.inf):
+    """
+    Read a numeric request parameter: a JSON number or a numeric string, finite, between minimum and maximum.
+
+    Raises:
+        ValueError: The value is not a number, or out of range.
+    """
+
+    number = None
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        try:
+            number = float(value)
+        except ValueError:
+            pass
+    if number is None or not math.isfinite(number):
+        raise ValueError(f"'{name}' must be a number, got {value!r}")
+
+    if not minimum <= number <= maximum:
+        bounds = f"between {minimum:g} and {maximum:g}" if maximum < math.inf else f"at least {minimum:g}"
+        raise ValueError(f"'{name}' must be {bounds}, got {value!r}")
+
+    return number
+
+def parse_count(value, name, minimum=1):
+    """
+    Read an integer request parameter: a JSON integer (or integral number) or an integer string, at least minimum.
+
+    Raises:
+        ValueError: The value is not an integer, or below minimum.
+    """
+
+    count = None
+    if isinstance(value, int) and not isinstance(value, bool):
+        count = value
+    elif isinstance(value, float) and value.is_integer():
+        count = int(value)
+    elif isinstance(value, str) and value.strip().lstrip('+-').isdigit():
+        count = int(value)
+    if count is None:
+        raise ValueError(f"'{name}' must be an integer, got {value!r}")
+
+    if count < minimum:
+        raise ValueError(f"'{name}' must be at least {minimum}, got {value!r}")
+
+    return count
+
+def parse_bool(value, name):
+    """
+    Read a boolean request parameter: JSON true / false, 0 / 1, or the strings 'true' / 'false'.
+
+    Raises:
+        ValueError: The value is not a boolean.
+    """
+
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false', '1', '0'):
+        return value.strip().lower() in ('true', '1')
+
+    raise ValueError(f"'{name}' must be a boolean, got {value!r}")
+
+def source_key(source):
+    """
+    Cache key of an input: a hash of inline GeoJSON, or the path, table and modification time of a file.
+    """
+
+    if 'geojson' in source:
+        return hashlib.sha1(json.dumps(source['geojson'], sort_keys=True).encode('utf-8')).hexdigest()
+
+    stat = os.stat(source['path'])
+    return (os.path.abspath(source['path']), source.get('layer'), stat.st_mtime_ns, stat.st_size)
+
+# --- Worker tasks ---
+
+def warm_worker():
+    """Import the numeric modules once per worker."""
+    import numpy
+    import shapely
+    from . import preprocessing, dorling_core, finishing
+
+def worker_pid(_):
+    """Returns the worker process ID (used to start every worker)."""
+    time.sleep(0.1) # Keep the worker busy so that the next task starts another one
+    return os.getpid()
+
+def preprocess_task(source, field_name, tolerance=0.0):
+    """
+    Read an input and compute its centroids and adjacency (create_dicts_bulk).
+
+    The dictionaries are keyed by the position of each feature, so that any feature id
+    (integer or string) can be returned as is. Geographic input is projected first (see project).
+
+    Returns:
+        centroid_dict, neighbours_dict, ids (list): Feature id of each position,
+        crs (tuple): (input CRS, processing CRS) when the input was projected, else None.
+    """
+
+    from .preprocessing import HAS_BULK, create_dicts_bulk
+    if not HAS_BULK:
+        raise ValueError("The service needs numpy and shapely >= 2.0")
+
+    if 'geojson' in source:
+        fids, wkbs, values, crs = read_geojson(source['geojson'], field_name)
+    elif source['path'].lower().endswith('.gpkg'):
+        fids, wkbs, values, crs = read_geopackage(source['path'], field_name, source.get('layer'))
+    else:
+        with open(source['path'], encoding='utf-8') as f:
+            fids, wkbs, values, crs = read_geojson(json.load(f), field_name)
+
+    if not fids:
+        raise ValueError("No features with a geometry")
+
+    crs = source.get('crs') or crs
+    transform, crs = project(wkbs, crs)
+
+    centroid_dict, neighbours_dict = create_dicts_bulk(list(range(len(fids))), wkbs, values, tolerance, transform)
+    return centroid_dict, neighbours_dict, fids, crs
+
+def project(wkbs, crs):
+    """
+    Choose how an input is processed: geographic input is projected to a Lambert azimuthal
+    equal-area projection centred on its extent, other input is processed in its own CRS.
+
+    Args:
+        wkbs (list): Geometries of the input.
+        crs (str): CRS of the input (authority ID, PROJ string or WKT), None when unknown.
+
+    Returns:
+        transform (function): Coordinate transformation for create_dicts_bulk, or None,
+        crs (tuple): (input CRS, processing CRS), or None when the input is not projected.
+
+    Raises:
+        ValueError: The CRS is unknown, or the input is geographic and pyproj is not available
+            or its coordinates are not longitudes / latitudes.
+    """
+
+    if crs is None:
+        return None, None
+
+    if not is_geographic(crs):
+        return None, None
+
+    if not HAS_PYPROJ:
+        raise ValueError("Geographic input (longitude / latitude) needs pyproj to be projected, or a projected CRS")
+
+    import shapely
+    xmin, ymin, xmax, ymax = shapely.total_bounds(shapely.from_wkb(wkbs))
+    if xmin < -180 or xmax > 180 or ymin < -90 or ymax > 90:
+        raise ValueError(f"Coordinates outside the longitude / latitude range for {crs}: set 'crs' for projected input")
+
+    processing_crs = laea_proj((xmin + xmax) / 2, (ymin + ymax) / 2)
+    print(f"[DorlingCartogram] Service: projecting geographic input to {processing_crs}")
+
+    return array_transformer(crs, processing_crs), (crs, processing_crs)
+
+def simulate_task(centroid_dict, neighbours_dict, ids, params, crs=None):
+    """
+    Run the simulation on a preprocessing result.
+
+    Args:
+        crs (tuple): (input CRS, processing CRS) of a projected input (see project):
+            the circle centres are transformed back to the input CRS. None = no reprojection.
+
+    Returns:
+        list: GeoJSON point features { fid, radius }, with the feature ids of the input.
+    """
+
+    compute_dorling(
+        centroid_dict, neighbours_dict, params['friction'], params['ratio'], params['iterations'], index='grid'
+    )
+
+    if params['remove_overlaps']:
+        from .finishing import remove_overlaps
+        remove_overlaps(centroid_dict)
+
+    keys = list(centroid_dict)
+    coords = [[centroid_dict[k]['x'], centroid_dict[k]['y']] for k in keys]
+    if crs is not None and keys:
+        import numpy as np
+        coords = array_transformer(crs[1], crs[0])(np.array(coords, dtype=float)).tolist()
+
+    return [
+        {
+            'type': 'Feature',
+            'id': ids[k],
+            'geometry': {'type': 'Point', 'coordinates': xy},
+            'properties': {'fid': ids[k], 'radius': centroid_dict[k]['radius_scaled']}
+        }
+        for k, xy in zip(keys, coords)
+    ]
+
+# --- Input readers ---
+
+def read_geojson(collection, field_name):
+    """
+    Read a GeoJSON FeatureCollection.
+
+    Feature IDs are the 'id' of each feature (integer or string), or its position in the
+    collection when it has none. Coordinates are longitudes / latitudes (RFC 7946), unless the
+    collection has a legacy 'crs' member.
+
+    Returns:
+        fids (list), wkbs (list), values (list): As read_layer_wkb in preprocessing.py,
+        crs (str): CRS of the coordinates.
+
+    Raises:
+        ValueError: Two features have the same ID, or a field value is not a number.
+    """
+
+    import shapely
+    from shapely.geometry import shape
+
+    fids, geoms, values = [], [], []
+    seen = set()
+    for k, feature in enumerate(collection.get('features', [])):
+        if not feature.get('geometry'):
+            continue # Skip features without geometry
+
+        fid = feature.get('id')
+        fid = k if fid is None else fid
+        if not isinstance(fid, (int, float, str)):
+            raise ValueError(f"Invalid feature id {fid!r}")
+        if fid in seen:
+            raise ValueError(f"Duplicate feature id {fid!r}")
+        seen.add(fid)
+        value = (feature.get('properties') or {}).get(field_name)
+
+        fids.append(fid)
+        geoms.append(shape(feature['geometry']))
+        values.append(field_value(value, field_name, fid))
+
+    crs = ((collection.get('crs') or {}).get('properties') or {}).get('name') or 'EPSG:4326'
+
+    return fids, shapely.to_wkb(geoms).tolist() if geoms else [], values, crs
+
+def read_geopackage(path, field_name, layer=None):
+    """
+    Read a GeoPackage feature table with sqlite3.
+
+    Args:
+        path (str): GeoPackage file.
+        field_name (str): Field used to compute the radii.
+        layer (str): Table name (defaults to the first feature table).
+
+    Returns:
+        fids (list), wkbs (list), values (list): As read_layer_wkb in preprocessing.py,
+        crs (str): CRS of the table (see gpkg_crs), None when undefined.
+
+    Raises:
+        ValueError: The layer is not a feature table of the GeoPackage, or the field is missing.
+    """
+
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        # The layer name comes from the request: only accept the feature tables listed by the GeoPackage
+        tables = [row[0] for row in connection.execute("SELECT table_name FROM gpkg_contents WHERE data_type = 'features'")]
+        if layer is None:
+            if not tables:
+                raise ValueError(f"No feature table in {path}")
+            layer = tables[0]
+        elif layer not in tables:
+            raise ValueError(f"No feature table '{layer}' in {path}")
+
+        row = connection.execute("SELECT column_name, srs_id FROM gpkg_geometry_columns WHERE table_name = ?", (layer,)).fetchone()
+        if row is None:
+            raise ValueError(f"No geometry column for '{layer}' in {path}")
+        geometry_column, srs_id = row
+        crs = gpkg_crs(connection, srs_id)
+
+        # Integer primary key, as used by QGIS for the feature IDs
+        columns = connection.execute(f'PRAGMA table_info({quote_identifier(layer)})').fetchall()
+        pk = next((column[1] for column in columns if column[5] == 1), 'rowid')
+        if field_name not in [column[1] for column in columns]:
+            raise ValueError(f"No field '{field_name}' in '{layer}'")
+
+        fids, wkbs, values = [], [], []
+        query = 'SELECT {}, {}, {} FROM {}'.format(*map(quote_identifier, (pk, geometry_column, field_name, layer)))
+        for fid, blob, value in connection.execute(query):
+            wkb = gpkg_wkb(blob)
+            if wkb is None:
+                continue # Skip empty geometries
+
+            fids.append(int(fid))
+            wkbs.append(wkb)
+            values.append(field_value(value, field_name, fid))
+    finally:
+        connection.close()
+
+    return fids, wkbs, values, crs
+
+def gpkg_crs(connection, srs_id):
+    """
+    CRS of a GeoPackage spatial reference system: its authority ID (e.g. 'EPSG:4326'), or its WKT
+    definition for other organisations. None for the undefined systems (srs_id 0 and -1).
+    """
+
+    row = connection.execute(
+        "SELECT organization, organization_coordsys_id, definition FROM gpkg_spatial_ref_sys WHERE srs_id = ?", (srs_id,)
+    ).fetchone()
+    if row is None or srs_id in (0, -1):
+        return None
+
+    organization, code, definition = row
+    if organization and organization.upper() in ('EPSG', 'ESRI', 'IGNF'):
+        return f"{organization.upper()}:{code}"
+    return definition if definition and definition.strip().lower() != 'undefined' else None
+
+def quote_identifier(name):
+    """Quote an SQLite identifier (table or column name), doubling its embedded quotes."""
+
+    return '"' + str(name).replace('"', '""') + '"'
+
+def field_value(value, field_name, fid):
+    """
+    Read the radius field of a feature: a number, 0.0 for missing (null) values.
+
+    Raises:
+        ValueError: The value is not a number.
+    """
+
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Field '{field_name}' of feature {fid!r} is not a number: {value!r}") from None
+
+def gpkg_wkb(blob):
+    """
+    Extract the WKB of a GeoPackage geometry blob (None for empty geometries).
+
+    Header: 'GP', version, flags, srs_id (4 bytes), envelope (0, 32, 48 or 64 bytes, from the flags).
+    """
+
+    if blob is None or len(blob) < 8 or blob[:2] != b'GP':
+        return None
+
+    flags = blob[3]
+    if flags & 0b10000:
+        return None # Empty geometry flag
+
+    envelope_size = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}.get((flags >> 1) & 0b111)
+    if envelope_size is None:
+        raise ValueError("Invalid GeoPackage geometry header")
+
+    return bytes(blob[8 + envelope_size:])
+
+def main(argv=None):
+    """Command line entry point."""
+
+    parser = argparse.ArgumentParser(description="Local Dorling cartogram service")
+    parser.add_argument('--host', default='127.0.0.1', help="Listening address (default: local host only)")
+    parser.add_argument('--port', type=int, default=8765, help="Listening port")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--cache', type=int, default=16, help="Number of preprocessed inputs kept in memory")
+    args = parser.parse_args(argv)
+
+    serve(args.host, args.port, args.workers, args.cache)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+    Parallel parameter sweep over friction, ratio and iterations.
+
+    Every combination of the parameter grid is simulated in a worker process, starting
+    from the same preprocessing result (sent once to each worker). Each layout is scored
+    and the runs are returned as a ranked table together with the best layout.
+
+    Workers do not need QGIS: they use the grid broad phase of dorling_core.
+
+    Example from the QGIS Python console:
+
+        from dorling_cartogram.sweep import sweep_layer
+        rows, layer = sweep_layer(iface.activeLayer(), "population", [0.1, 0.25, 0.5], [0.2, 0.4, 0.6], [100, 200])
+"""
+import itertools
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .dorling_core import compute_dorling
+from .metrics import compute_metrics
+
+# Preprocessing result shared by all tasks of a worker (set by init_worker)
+_worker_data = {}
+
+def parameter_sweep(centroid_dict, neighbours_dict, frictions, ratios, iterations_list, processes=None):
+    """
+    Run compute_dorling for every combination of parameters in parallel.
+
+    Args:
+        centroid_dict (dict): Preprocessed centroid dictionary (not modified).
+        neighbours_dict (dict): Neighbour pairs with shared border lengths.
+        frictions (list): Friction values to try.
+        ratios (list): Ratio values to try.
+        iterations_list (list): Iteration counts to try.
+        processes (int): Number of worker processes (defaults to the CPU count).
+
+    Returns:
+        rows (list): One dict per run ({ 'friction', 'ratio', 'iterations', 'score', ... }), best first.
+        best_dict (dict): Centroid dictionary of the best run.
+    """
+
+    # Start the timer to measure execution time
+    start_time = time.time()
+
+    grid = list(itertools.product(frictions, ratios, iterations_list))
+
+    # Spawned workers work the same way inside and outside QGIS
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(python_executable())
+
+    rows = []
+    best_score, best_positions = None, None
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=init_worker, initargs=(centroid_dict, neighbours_dict)) as executor:
+        for row, positions in executor.map(run_simulation, grid):
+            # Keep only the layout of the best run so far
+            if best_score is None or row['score'] < best_score:
+                best_score, best_positions = row['score'], positions
+            rows.append(row)
+
+    # Rank runs, best first
+    rows.sort(key=lambda row: row['score'])
+
+    # Rebuild the best layout
+    best_dict = {fid: dict(props) for fid, props in centroid_dict.items()}
+    for fid, (x, y) in best_positions.items():
+        best_dict[fid]['x'] = x
+        best_dict[fid]['y'] = y
+
+    # End the timer and display the ranked table
+    end_time = time.time()
+    print(f"[DorlingCartogram] Sweep of {len(grid)} runs completed in {end_time - start_time:.2f} seconds")
+    for rank, row in enumerate(rows, 1):
+        print(
+            f"[DorlingCartogram] #{rank} friction={row['friction']}, ratio={row['ratio']}, iterations={row['iterations']}: "
+            f"score {row['score']:.4f} (overlaps {row['overlap_count']}, {row['overlap_ratio']:.2%} of the area, "
+            f"contacts {row['contacts']:.2%}, displacement {row['displacement_mean']:.1f}, "
+            f"angular distortion {row['angular_distortion']:.1f}°)"
+        )
+
+    return rows, best_dict
+
+def sweep_layer(input_layer, field_name, frictions, ratios, iterations_list, processes=None):
+    """
+    Preprocess a layer once, run a parameter sweep and add the best layout to the project.
+
+    Args:
+        input_layer (QgsVectorLayer): Input polygon layer.
+        field_name (str): Field used to compute raw radius.
+        frictions, ratios, iterations_list (list): Parameter grid.
+        processes (int): Number of worker processes.
+
+    Returns:
+        rows (list): Ranked table (see parameter_sweep).
+        layer (QgsVectorLayer): Point layer of the best layout.
+    """
+
+    # QGIS modules are only needed here, not in the workers
+    from qgis.core import QgsProject
+    from .preprocessing import preprocessing
+    from .layer_builder import create_point_layer, style_layer
+
+    centroid_dict, neighbours_dict = preprocessing(input_layer, field_name)
+    rows, best_dict = parameter_sweep(centroid_dict, neighbours_dict, frictions, ratios, iterations_list, processes)
+
+    best = rows[0]
+    layer_name = f"{input_layer.name()}_{field_name}_dorling_f{best['friction']}_r{best['ratio']}_i{best['iterations']}"
+    layer = create_point_layer(input_layer, best_dict, layer_name)
+    style_layer(layer)
+    QgsProject.instance().addMapLayer(layer)
+
+    return rows, layer
+
+def init_worker(centroid_dict, neighbours_dict):
+    """Store the shared preprocessing result in the worker process."""
+    _worker_data['centroid_dict'] = centroid_dict
+    _worker_data['neighbours_dict'] = neighbours_dict
+
+def run_simulation(params):
+    """
+    Run one simulation in a worker and score it.
+
+    Args:
+        params (tuple): (friction, ratio, iterations)
+
+    Returns:
+        row (dict): Parameters and scores.
+        positions (dict): { fid: (x, y) } final positions.
+    """
+
+    friction, ratio, iterations = params
+    original = _worker_data['centroid_dict']
+    neighbours_dict = _worker_data['neighbours_dict']
+
+    # Work on a copy so that every task starts from the same state
+    centroid_dict = {fid: dict(props) for fid, props in original.items()}
+    compute_dorling(centroid_dict, neighbours_dict, friction, ratio, iterations, index='grid')
+
+    row = {'friction': friction, 'ratio': ratio, 'iterations': iterations}
+    row.update(score_layout(centroid_dict, neighbours_dict))
+
+    positions = {fid: (props['x'], props['y']) for fid, props in centroid_dict.items()}
+    return row, positions
+
+def score_layout(centroid_dict, neighbours_dict):
+    """
+    Score a layout (lower is better) from its quality metrics (see metrics.py).
+
+    score = overlap_ratio + (1 - contacts) + 0.1 * displacement_mean / mean radius
+
+    Args:
+        centroid_dict (dict): Solved centroid dictionary.
+        neighbours_dict (dict): Neighbour pairs.
+
+    Returns:
+        dict: The quality metrics and the 'score'.
+    """
+
+    metrics = compute_metrics(centroid_dict, neighbours_dict)
+
+    mean_radius = sum(props['radius_scaled'] for props in centroid_dict.values()) / len(centroid_dict)
+    displacement = metrics['displacement_mean'] / mean_radius if mean_radius > 0 else 0.0
+
+    metrics['score'] = metrics['overlap_ratio'] + (1.0 - metrics['contacts']) + 0.1 * displacement
+    return metrics
+
+def python_executable():
+    """
+    Returns the Python interpreter used to spawn workers.
+
+    Inside QGIS, sys.executable is the QGIS binary, so the bundled interpreter is looked up instead.
+    """
+
+    executable = sys.executable
+    if os.path.basename(executable).lower().startswith('python'):
+        return executable
+
+    candidates = [
+        os.path.join(sys.exec_prefix, 'python.exe'), # Windows (OSGeo4W, standalone installer)
+        os.path.join(sys.exec_prefix, 'bin', 'python3'), # macOS, Linux
+        shutil.which('python3')
+    ]
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return candidate
+
+    return executable
@@ -0,0 +1,55 @@
+"""
+    Test configuration: the plugin uses relative imports, so its directory is imported as the
+    package 'dorling_cartogram' (as installed in QGIS). Spawned workers (tiled.py, components.py)
+    inherit sys.path and import it the same way.
+
+    Run from the plugin directory:
+
+        python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+PACKAGE = 'dorling_cartogram'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def pytest_configure(config):
+    if os.path.basename(ROOT) == PACKAGE:
+        config.package_path = None
+        sys.path.insert(0, os.path.dirname(ROOT))
+        return
+
+    # Any other checkout name: link it under the package name in a temporary directory
+    path = tempfile.mkdtemp()
+    os.symlink(ROOT, os.path.join(path, PACKAGE), target_is_directory=True)
+    config.package_path = path
+    sys.path.insert(0, path)
+
+def pytest_unconfigure(config):
+    path = getattr(config, 'package_path', None)
+    if path:
+        os.unlink(os.path.join(path, PACKAGE))
+        os.rmdir(path)
+
+@pytest.fixture
+def layout():
+    """Small heavy-tailed layout of synthetic_dicts, with a few islands."""
+    from dorling_cartogram.benchmark import synthetic_dicts
+    return synthetic_dicts(8, alpha=1.5, islands=3)
+
+@pytest.fixture
+def heavy_layout():
+    """Layout large and heavy-tailed enough for the radius classes to skip far small circles."""
+    from dorling_cartogram.benchmark import synthetic_dicts
+    return synthetic_dicts(15, alpha=1.2)
+
+def copy_dict(centroid_dict):
+    """Independent copy of a centroid dictionary."""
+    return {fid: dict(props) for fid, props in centroid_dict.items()}
+
+def positions(centroid_dict):
+    """{ fid: (x, y, xvec, yvec) } of a centroid dictionary."""
+    return {fid: (p['x'], p['y'], p['xvec'], p['yvec']) for fid, p in centroid_dict.items()}
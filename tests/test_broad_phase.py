@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from dorling_cartogram.broad_phase import PackedClassIndex, RadiusClassIndex, class_pairs, grid_pairs
+
+def heavy_tailed_circles(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 40, n)
+    y = rng.uniform(0, 40, n)
+    r = 0.2 * (rng.pareto(1.2, n) + 1)
+    return x, y, np.minimum(r, 8.0)
+
+def brute_force_pairs(x, y, distance):
+    i, j = np.triu_indices(len(x), 1)
+    close = np.hypot(x[j] - x[i], y[j] - y[i]) < distance[i, j]
+    return set(zip(i[close].tolist(), j[close].tolist()))
+
+def as_set(i, j):
+    pairs = [(min(a, b), max(a, b)) for a, b in zip(i.tolist(), j.tolist())]
+    assert all(a != b for a, b in pairs)
+    assert len(set(pairs)) == len(pairs), "a pair is enumerated twice"
+    return set(pairs)
+
+def test_grid_pairs_finds_every_close_pair():
+    x, y, _ = heavy_tailed_circles()
+    distance = np.full((len(x), len(x)), 3.0)
+    assert brute_force_pairs(x, y, distance) <= as_set(*grid_pairs(x, y, 3.0))
+
+@pytest.mark.parametrize('margin, relative_margin', [(0.0, 0.0), (0.5, 0.0), (0.0, 1.0)])
+def test_class_pairs_finds_every_close_pair(margin, relative_margin):
+    x, y, r = heavy_tailed_circles()
+    distance = r[:, None] + r[None, :] + margin + relative_margin * np.maximum(r[:, None], r[None, :])
+    expected = brute_force_pairs(x, y, distance)
+
+    candidates = as_set(*class_pairs(x, y, r, margin, relative_margin))
+    assert expected <= candidates
+    # Far fewer candidates than pairs on heavy-tailed radii
+    assert len(candidates) < len(x) * (len(x) - 1) // 4
+
+def test_radius_class_index_finds_every_overlap():
+    x, y, r = heavy_tailed_circles()
+    centroid_dict = {k: {'x': x[k], 'y': y[k], 'radius_scaled': r[k]} for k in range(len(x))}
+    index = RadiusClassIndex(centroid_dict)
+
+    overlaps = brute_force_pairs(x, y, r[:, None] + r[None, :])
+    for a, b in overlaps:
+        assert b in index.query(x[a], y[a], r[a])
+        assert a in index.query(x[b], y[b], r[b])
+
+def test_packed_class_index_follows_moves():
+    x, y, r = heavy_tailed_circles()
+    index = PackedClassIndex(x, y, r)
+
+    # Move a tenth of the circles, then compare with a brute force query of every circle
+    rng = np.random.default_rng(1)
+    moved = rng.choice(len(x), len(x) // 10, replace=False)
+    x, y = x.copy(), y.copy()
+    for k in moved.tolist():
+        x[k], y[k] = rng.uniform(0, 40, 2)
+        index.move(k, x[k], y[k])
+
+    for k in range(len(x)):
+        overlapping = np.nonzero(np.hypot(x - x[k], y - y[k]) < r + r[k])[0]
+        assert set(overlapping.tolist()) <= set(index.query(x[k], y[k], r[k]).tolist())
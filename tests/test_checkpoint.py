@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from conftest import copy_dict, positions
+from dorling_cartogram.checkpoint import load_checkpoint, restore_checkpoint, save_checkpoint
+from dorling_cartogram.dorling_core import compute_dorling
+
+class Interrupt(Exception):
+    pass
+
+class InterruptingProfiler:
+    """Profiler that raises in the iteration stage after 'after' iterations (a crash)."""
+
+    def __init__(self, after):
+        self.after = after
+        self.count = 0
+
+    def stage(self, name):
+        if name == 'iteration':
+            self.count += 1
+            if self.count > self.after:
+                raise Interrupt()
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        return None
+
+@pytest.mark.parametrize('schedule', ['constant', 'linear', 'exponential', 'displacement'])
+@pytest.mark.parametrize('attraction', ['loop', 'symmetric'])
+def test_resume_matches_uninterrupted_run(layout, tmp_path, schedule, attraction):
+    centroid_dict, neighbours_dict = layout
+    path = str(tmp_path / 'run.ckpt')
+    options = dict(iterations=40, index='grid', attraction=attraction, schedule=schedule)
+
+    reference = copy_dict(centroid_dict)
+    compute_dorling(reference, neighbours_dict, **options)
+
+    interrupted = copy_dict(centroid_dict)
+    with pytest.raises(Interrupt):
+        compute_dorling(interrupted, neighbours_dict, checkpoint_path=path, checkpoint_every=10,
+                        profiler=InterruptingProfiler(25), **options)
+    assert load_checkpoint(path)['iteration'] == 20
+
+    # Resume from the state left by the crash (iterations 21 to 25 are discarded)
+    compute_dorling(interrupted, neighbours_dict, checkpoint_path=path, checkpoint_every=10, resume=True, **options)
+
+    assert positions(interrupted) == positions(reference)
+
+def test_truncated_checkpoint_is_rejected(layout, tmp_path):
+    centroid_dict, _ = layout
+    path = str(tmp_path / 'run.ckpt')
+    save_checkpoint(path, centroid_dict, 10, 0.25, 0.4, 100)
+    size = os.path.getsize(path)
+
+    for length in (10, size // 2, size - 1):
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path + '.cut', 'wb') as f:
+            f.write(data[:length])
+        with pytest.raises(ValueError):
+            restore_checkpoint(path + '.cut', copy_dict(centroid_dict), 0.25, 0.4, 100)
+
+def test_checkpoint_of_another_run_is_rejected(layout, tmp_path):
+    centroid_dict, _ = layout
+    path = str(tmp_path / 'run.ckpt')
+    save_checkpoint(path, centroid_dict, 10, 0.25, 0.4, 100, schedule='linear')
+
+    with pytest.raises(ValueError):
+        restore_checkpoint(path, copy_dict(centroid_dict), 0.3, 0.4, 100, schedule='linear')
+    with pytest.raises(ValueError):
+        restore_checkpoint(path, copy_dict(centroid_dict), 0.25, 0.4, 200, schedule='linear')
+    with pytest.raises(ValueError):
+        restore_checkpoint(path, copy_dict(centroid_dict), 0.25, 0.4, 100, schedule='constant')
+    with pytest.raises(ValueError):
+        restore_checkpoint(path, copy_dict(centroid_dict), 0.25, 0.4, 100, schedule='linear', schedule_options={'start_ratio': 0.2})
+    assert restore_checkpoint(path, copy_dict(centroid_dict), 0.25, 0.4, 100, schedule='linear') == (10, None)
+
+def test_schedule_state_is_restored(tmp_path):
+    centroid_dict = {0: {'x': 0.0, 'y': 0.0, 'xvec': 0.0, 'yvec': 0.0, 'radius_scaled': 1.0}}
+    path = str(tmp_path / 'run.ckpt')
+    save_checkpoint(path, centroid_dict, 10, 0.25, 0.4, 100, schedule='displacement',
+                    schedule_state={'first': 50.0, 'progress': 0.3}, displacement=12.5)
+
+    state = {'first': None, 'progress': 0.0}
+    assert restore_checkpoint(path, dict(centroid_dict), 0.25, 0.4, 100, 'displacement', None, state) == (10, 12.5)
+    assert state == {'first': 50.0, 'progress': 0.3}
+
+    # A stateful schedule cannot resume from a checkpoint without its state
+    save_checkpoint(path, centroid_dict, 10, 0.25, 0.4, 100, schedule='displacement')
+    with pytest.raises(ValueError):
+        restore_checkpoint(path, dict(centroid_dict), 0.25, 0.4, 100, 'displacement', None, {'first': None, 'progress': 0.0})
@@ -0,0 +1,75 @@
+import math
+
+from conftest import copy_dict
+from dorling_cartogram.components import compute_dorling_components, cross_component_overlaps, find_components
+
+def brute_force_components(centroid_dict, neighbours_dict, margin=None):
+    fids = list(centroid_dict)
+    groups = {fid: {fid} for fid in fids}
+
+    def join(a, b):
+        if groups[a] is not groups[b]:
+            merged = groups[a] | groups[b]
+            for fid in merged:
+                groups[fid] = merged
+
+    for id1, neighbours in neighbours_dict.items():
+        for id2 in neighbours:
+            join(id1, id2)
+    for k, a in enumerate(fids):
+        pa = centroid_dict[a]
+        for b in fids[k + 1:]:
+            pb = centroid_dict[b]
+            extra = max(pa['radius_scaled'], pb['radius_scaled']) if margin is None else margin
+            if math.hypot(pb['x'] - pa['x'], pb['y'] - pa['y']) < pa['radius_scaled'] + pb['radius_scaled'] + extra:
+                join(a, b)
+
+    return {frozenset(group) for group in groups.values()}
+
+def test_find_components_matches_brute_force(layout):
+    centroid_dict, neighbours_dict = layout
+
+    # Separate the grid into its rows: only proximity joins them
+    rows = {fid: {other for other in neighbours if other // 8 == fid // 8} for fid, neighbours in neighbours_dict.items()}
+    for margin in (None, 0.0, 0.5):
+        components = find_components(centroid_dict, rows, margin)
+        assert {frozenset(fids) for fids in components} == brute_force_components(centroid_dict, rows, margin)
+        assert [len(fids) for fids in components] == sorted((len(fids) for fids in components), reverse=True)
+
+def test_islands_are_independent_components(layout):
+    centroid_dict, neighbours_dict = layout
+    components = find_components(centroid_dict, neighbours_dict)
+
+    assert len(components) == 4
+    assert sorted(len(fids) for fids in components) == [4, 4, 4, 64]
+
+def test_components_are_solved_without_meeting(layout):
+    centroid_dict, neighbours_dict = layout
+    solved = copy_dict(centroid_dict)
+
+    rows = compute_dorling_components(solved, neighbours_dict, iterations=30, processes=1)
+
+    assert sum(row['size'] for row in rows) == len(centroid_dict)
+    assert any(solved[fid]['x'] != centroid_dict[fid]['x'] for fid in centroid_dict)
+    assert cross_component_overlaps(solved, find_components(centroid_dict, neighbours_dict)) == set()
+
+def test_components_that_meet_are_moved_apart(capsys):
+    # Two clusters of overlapping circles, separate components with no margin, that collide as they spread
+    centroid_dict, neighbours_dict = {}, {}
+    for cluster, offset in enumerate((0.0, 3.2)):
+        fids = [4 * cluster + k for k in range(4)]
+        for fid, (dx, dy) in zip(fids, ((0, 0), (1, 0), (0, 1), (1, 1))):
+            x, y = offset + dx, float(dy)
+            centroid_dict[fid] = {
+                'x': x, 'y': y, 'x_orig': x, 'y_orig': y, 'perimeter': 4.0,
+                'radius_raw': 1.0, 'radius_scaled': 1.0, 'xvec': 0.0, 'yvec': 0.0
+            }
+            neighbours_dict[fid] = {other: 1.0 for other in fids if other != fid}
+
+    components = find_components(centroid_dict, neighbours_dict, margin=0.0)
+    assert len(components) == 2
+
+    compute_dorling_components(centroid_dict, neighbours_dict, iterations=50, margin=0.0, processes=1)
+
+    assert "overlap another component" in capsys.readouterr().out
+    assert cross_component_overlaps(centroid_dict, components) == set()
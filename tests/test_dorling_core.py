@@ -0,0 +1,16 @@
+import pytest
+
+from dorling_cartogram.dorling_core import compute_dorling
+
+@pytest.mark.parametrize('metrics_every', [None, 0, 7, 10])
+def test_returns_the_last_iteration_run(layout, metrics_every):
+    centroid_dict, neighbours_dict = layout
+    assert compute_dorling(centroid_dict, neighbours_dict, iterations=25, index='grid', metrics_every=metrics_every) == 25
+
+def test_returns_the_iteration_of_the_early_stop(layout, capsys):
+    centroid_dict, neighbours_dict = layout
+    last_iteration = compute_dorling(centroid_dict, neighbours_dict, iterations=500, index='grid', metrics_every=10, tolerance=0.02)
+
+    # Converges between two measurements
+    assert last_iteration < 500 and last_iteration % 10 != 0
+    assert f"Converged at iteration {last_iteration}" in capsys.readouterr().out
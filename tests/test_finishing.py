@@ -0,0 +1,44 @@
+from conftest import copy_dict
+from dorling_cartogram.dorling_core import compute_dorling
+from dorling_cartogram.finishing import overlapping_ids, remove_overlaps
+
+def test_remove_overlaps_leaves_no_overlap(layout):
+    centroid_dict, neighbours_dict = layout
+    compute_dorling(centroid_dict, neighbours_dict, iterations=5, index='grid')
+    fids = list(centroid_dict)
+    conflicts = set(overlapping_ids(centroid_dict, fids))
+    assert conflicts
+
+    before = copy_dict(centroid_dict)
+    result = remove_overlaps(centroid_dict)
+
+    assert result['conflicts'] == len(conflicts)
+    assert overlapping_ids(centroid_dict, fids) == set()
+    # Only conflicting circles move
+    assert all(centroid_dict[fid] == before[fid] for fid in fids if fid not in conflicts)
+
+def test_remove_overlaps_without_conflict(layout):
+    centroid_dict, _ = layout
+    spread = copy_dict(centroid_dict)
+    for props in spread.values():
+        props['radius_scaled'] = 0.1
+
+    result = remove_overlaps(spread)
+
+    assert result['moved'] == 0
+    assert spread == {fid: dict(props, radius_scaled=0.1) for fid, props in centroid_dict.items()}
+
+def test_remove_overlaps_moves_only_movable_circles(layout):
+    centroid_dict, neighbours_dict = layout
+    compute_dorling(centroid_dict, neighbours_dict, iterations=5, index='grid')
+    fids = list(centroid_dict)
+    conflicts = overlapping_ids(centroid_dict, fids)
+    movable = set(sorted(conflicts)[::2])
+
+    before = copy_dict(centroid_dict)
+    result = remove_overlaps(centroid_dict, movable=movable)
+
+    assert result['conflicts'] == len(movable)
+    assert all(centroid_dict[fid] == before[fid] for fid in fids if fid not in movable)
+    # Movable circles overlap nothing anymore
+    assert not overlapping_ids(centroid_dict, fids) & movable
@@ -0,0 +1,34 @@
+import pytest
+
+from conftest import positions
+from dorling_cartogram.dorling_core import compute_dorling
+from dorling_cartogram.incremental import IncrementalSolver
+
+@pytest.fixture
+def solver(layout):
+    centroid_dict, neighbours_dict = layout
+    compute_dorling(centroid_dict, neighbours_dict, iterations=30, index='grid')
+    return IncrementalSolver(centroid_dict, neighbours_dict)
+
+def test_empty_update_changes_nothing(solver):
+    before = positions(solver.centroid_dict)
+    assert solver.update({}) == set()
+    assert positions(solver.centroid_dict) == before
+
+def test_unknown_region_is_rejected_before_any_change(solver):
+    before = {fid: dict(props) for fid, props in solver.centroid_dict.items()}
+    with pytest.raises(ValueError, match="Unknown regions"):
+        solver.update({0: 5000.0, 'missing': 10.0})
+    assert solver.centroid_dict == before
+
+def test_update_resolves_the_changed_region(solver):
+    before = positions(solver.centroid_dict)
+    radius = solver.centroid_dict[27]['radius_scaled']
+
+    active = solver.update({27: 20000.0})
+
+    assert 27 in active
+    assert solver.centroid_dict[27]['radius_scaled'] > radius
+    # Circles outside the active set did not move
+    after = positions(solver.centroid_dict)
+    assert all(after[fid] == before[fid] for fid in before if fid not in active)
@@ -0,0 +1,40 @@
+import pytest
+
+from conftest import copy_dict
+from dorling_cartogram.dorling_core import compute_dorling
+
+def largest_difference(a, b):
+    return max(max(abs(p['x'] - b[fid]['x']), abs(p['y'] - b[fid]['y'])) for fid, p in a.items())
+
+def mean_radius(centroid_dict):
+    return sum(p['radius_scaled'] for p in centroid_dict.values()) / len(centroid_dict)
+
+@pytest.mark.parametrize('index', ['grid', 'radius_class'])
+@pytest.mark.parametrize('attraction', ['sparse', 'symmetric'])
+def test_kernel_matches_loop(heavy_layout, index, attraction):
+    centroid_dict, neighbours_dict = heavy_layout
+
+    loop = copy_dict(centroid_dict)
+    compute_dorling(loop, neighbours_dict, iterations=30, index=index, attraction='loop')
+    kernel = copy_dict(centroid_dict)
+    compute_dorling(kernel, neighbours_dict, iterations=30, index=index, attraction=attraction)
+
+    # Same forces, summed in another order
+    assert largest_difference(loop, kernel) < 1e-9 * mean_radius(centroid_dict)
+
+def test_sparse_attraction_keeps_precision_far_from_origin(layout):
+    centroid_dict, neighbours_dict = layout
+
+    # Same layout in projected coordinates around 1e6: the forces must not change
+    shifted = copy_dict(centroid_dict)
+    for props in shifted.values():
+        props['x'] += 3e6
+        props['y'] += 3e6
+
+    near = copy_dict(centroid_dict)
+    compute_dorling(near, neighbours_dict, iterations=1, index='grid', attraction='sparse')
+    compute_dorling(shifted, neighbours_dict, iterations=1, index='grid', attraction='sparse')
+
+    for fid, props in near.items():
+        assert shifted[fid]['xvec'] == pytest.approx(props['xvec'], abs=1e-6)
+        assert shifted[fid]['yvec'] == pytest.approx(props['yvec'], abs=1e-6)
@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+import pytest
+
+from dorling_cartogram.metrics import compute_metrics, lens_area
+
+def circles(*specs):
+    """centroid_dict of circles (x, y, r), unmoved from their original centroids."""
+    return {
+        fid: {'x': x, 'y': y, 'x_orig': x, 'y_orig': y, 'radius_scaled': r}
+        for fid, (x, y, r) in enumerate(specs)
+    }
+
+def test_lens_area_limits():
+    # Touching, half-overlapping unit circles, and a circle inside another
+    d = np.array([2.0, 1.0, 0.5])
+    r1 = np.array([1.0, 1.0, 2.0])
+    r2 = np.array([1.0, 1.0, 1.0])
+    area = lens_area(d, r1, r2)
+
+    assert area[0] == pytest.approx(0.0, abs=1e-9)
+    assert area[1] == pytest.approx(2 * math.pi / 3 - math.sqrt(3) / 2)
+    assert area[2] == pytest.approx(math.pi)
+
+def test_lens_area_is_symmetric():
+    rng = np.random.default_rng(0)
+    r1, r2 = rng.uniform(0.1, 2, 100), rng.uniform(0.1, 2, 100)
+    d = rng.uniform(0, 1, 100) * (r1 + r2)
+    assert lens_area(d, r1, r2) == pytest.approx(lens_area(d, r2, r1))
+
+def test_compute_metrics_on_a_known_layout():
+    centroid_dict = circles((0, 0, 1), (1, 0, 1), (10, 0, 1), (12.01, 0, 1))
+    # Circle 2 moved up by 3 from its original centroid
+    centroid_dict[2]['y'] = 3.0
+    neighbours_dict = {0: {1: 1.0}, 1: {0: 1.0}, 2: {3: 1.0}, 3: {2: 1.0}}
+
+    metrics = compute_metrics(centroid_dict, neighbours_dict)
+
+    assert metrics['overlap_count'] == 1
+    assert metrics['overlap_area'] == pytest.approx(2 * math.pi / 3 - math.sqrt(3) / 2)
+    assert metrics['overlap_ratio'] == pytest.approx(metrics['overlap_area'] / (4 * math.pi))
+    # Pair 2-3 is now sqrt(2.01^2 + 3^2) apart: no longer touching
+    assert metrics['contacts'] == 0.5
+    assert metrics['displacement_mean'] == pytest.approx(0.75)
+    assert metrics['displacement_max'] == pytest.approx(3.0)
+    assert metrics['angular_distortion'] == pytest.approx(math.degrees(math.atan2(3, 2.01)) / 2)
+
+def test_overlaps_match_brute_force():
+    rng = np.random.default_rng(2)
+    n = 300
+    x, y = rng.uniform(0, 30, n), rng.uniform(0, 30, n)
+    r = np.minimum(0.3 * (rng.pareto(1.2, n) + 1), 6.0)
+    centroid_dict = circles(*zip(x.tolist(), y.tolist(), r.tolist()))
+
+    i, j = np.triu_indices(n, 1)
+    d = np.hypot(x[j] - x[i], y[j] - y[i])
+    overlapping = d < r[i] + r[j]
+
+    metrics = compute_metrics(centroid_dict, {})
+    assert metrics['overlap_count'] == int(overlapping.sum())
+    assert metrics['overlap_area'] == pytest.approx(lens_area(d[overlapping], r[i][overlapping], r[j][overlapping]).sum())
@@ -0,0 +1,186 @@
+import math
+
+import pytest
+
+shapely = pytest.importorskip('shapely')
+np = pytest.importorskip('numpy')
+
+from dorling_cartogram.preprocessing import (
+    chunk_box, chunk_stats_bulk, create_dicts_bulk, simplify_geometries, spatial_chunks
+)
+
+def gapped_squares(side, size=1.85, gap=0.15):
+    """Squares of a side x side grid, 'gap' apart: they only touch once snapped to a grid of 1."""
+    step = size + gap
+    geoms = [
+        shapely.box(i * step + gap, j * step + gap, i * step + step, j * step + step)
+        for i in range(side) for j in range(side)
+    ]
+    return list(range(len(geoms))), geoms
+
+def test_create_dicts_bulk_on_a_grid():
+    # 3 x 3 unit squares, fids 10..18 row by row
+    geoms = [shapely.box(i, j, i + 1, j + 1) for j in range(3) for i in range(3)]
+    fids = list(range(10, 19))
+    values = [math.pi] * 8 + [4 * math.pi]
+
+    centroid_dict, neighbours_dict = create_dicts_bulk(fids, shapely.to_wkb(geoms), values)
+
+    assert centroid_dict[14]['x'] == pytest.approx(1.5) and centroid_dict[14]['y'] == pytest.approx(1.5)
+    assert centroid_dict[14]['perimeter'] == pytest.approx(4.0)
+    assert centroid_dict[18]['radius_raw'] == pytest.approx(2.0)
+
+    # The centre touches all others: sides of length 1, corners of length 0
+    assert neighbours_dict[14] == pytest.approx({10: 0.0, 11: 1.0, 12: 0.0, 13: 1.0, 15: 1.0, 16: 0.0, 17: 1.0, 18: 0.0})
+    assert neighbours_dict[10] == pytest.approx({11: 1.0, 13: 1.0, 14: 0.0})
+    assert all(neighbours_dict[id2][id1] == length for id1 in fids for id2, length in neighbours_dict[id1].items())
+
+    # Scale factor: mean distance between neighbouring centroids / mean sum of raw radii
+    pairs = [(id1, id2) for id1 in fids for id2 in neighbours_dict[id1] if id1 < id2]
+    distance = sum(math.hypot(centroid_dict[a]['x'] - centroid_dict[b]['x'], centroid_dict[a]['y'] - centroid_dict[b]['y']) for a, b in pairs)
+    radii = sum(centroid_dict[a]['radius_raw'] + centroid_dict[b]['radius_raw'] for a, b in pairs)
+    for props in centroid_dict.values():
+        assert props['radius_scaled'] == pytest.approx(props['radius_raw'] * distance / radii)
+        assert (props['x_orig'], props['y_orig'], props['xvec'], props['yvec']) == (props['x'], props['y'], 0.0, 0.0)
+
+def test_create_dicts_bulk_null_values_and_islands():
+    geoms = [shapely.box(0, 0, 1, 1), shapely.box(5, 5, 6, 6)]
+    centroid_dict, neighbours_dict = create_dicts_bulk([1, 2], shapely.to_wkb(geoms), [-3.0, 0.0])
+
+    assert neighbours_dict == {1: {}, 2: {}}
+    assert all(props['radius_raw'] == props['radius_scaled'] == 0.0 for props in centroid_dict.values())
+
+def test_tolerance_closes_gaps_and_keeps_centroids():
+    fids, geoms = gapped_squares(3)
+    wkbs = shapely.to_wkb(geoms)
+
+    exact_dict, exact_neighbours = create_dicts_bulk(fids, wkbs, [1.0] * len(fids))
+    snapped_dict, snapped_neighbours = create_dicts_bulk(fids, wkbs, [1.0] * len(fids), tolerance=1.0)
+
+    # 0.15 gaps: no neighbours, until the squares are snapped to [k * 2, k * 2 + 2]
+    assert all(not neighbours for neighbours in exact_neighbours.values())
+    assert snapped_neighbours[4] == pytest.approx({0: 0.0, 1: 2.0, 2: 0.0, 3: 2.0, 5: 2.0, 6: 0.0, 7: 2.0, 8: 0.0})
+
+    # Centroids from the original geometries, perimeters from the snapped ones
+    for fid in fids:
+        assert (snapped_dict[fid]['x'], snapped_dict[fid]['y']) == (exact_dict[fid]['x'], exact_dict[fid]['y'])
+        assert exact_dict[fid]['perimeter'] == pytest.approx(4 * 1.85)
+        assert snapped_dict[fid]['perimeter'] == pytest.approx(8.0)
+
+def test_simplification_keeps_collapsed_polygons():
+    geoms = np.array([shapely.box(0, 0, 10, 10), shapely.box(20.1, 20.1, 20.3, 20.3)])
+    simplified = simplify_geometries(geoms, 1.0)
+
+    assert shapely.equals(simplified[0], geoms[0])
+    assert simplified[1] is geoms[1] # Smaller than the grid: kept as is
+
+@pytest.mark.parametrize('chunk_size', [5, 12])
+def test_chunk_halo_holds_every_snapped_neighbour(chunk_size):
+    fids, geoms = gapped_squares(8)
+    _, neighbours_dict = create_dicts_bulk(fids, shapely.to_wkb(geoms), [1.0] * len(fids), tolerance=1.0)
+    # Rook neighbours share a side, diagonal ones a corner
+    assert sum(len(neighbours) for neighbours in neighbours_dict.values()) == 2 * (2 * 8 * 7 + 2 * 7 * 7)
+
+    bounds = [tuple(shapely.bounds(geom)) for geom in geoms]
+    chunk_of, chunk_count = spatial_chunks(
+        [(b[0] + b[2]) / 2 for b in bounds], [(b[1] + b[3]) / 2 for b in bounds], chunk_size
+    )
+    assert chunk_count > 1
+
+    for chunk in range(chunk_count):
+        home = [k for k in fids if chunk_of[k] == chunk]
+        xmin, ymin, xmax, ymax = chunk_box(bounds, home, tolerance=1.0)
+        halo = {k for k, b in enumerate(bounds) if b[0] <= xmax and b[2] >= xmin and b[1] <= ymax and b[3] >= ymin}
+        for k in home:
+            assert set(neighbours_dict[k]) <= halo
+
+        # Without the tolerance, neighbours across the chunk edge are missed
+        xmin, ymin, xmax, ymax = chunk_box(bounds, home)
+        tight = {k for k, b in enumerate(bounds) if b[0] <= xmax and b[2] >= xmin and b[1] <= ymax and b[3] >= ymin}
+        assert tight == set(home)
+
+class Geometry:
+    """The part of QgsGeometry used by chunk_stats_bulk."""
+
+    def __init__(self, geom):
+        self.wkb = shapely.to_wkb(geom)
+
+    def asWkb(self):
+        return self.wkb
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 50, 400])
+def test_spatial_chunks_are_balanced_and_disjoint(chunk_size):
+    rng = np.random.default_rng(4)
+    xs, ys = rng.uniform(0, 100, 300).tolist(), rng.exponential(5, 300).tolist()
+
+    chunk_of, chunk_count = spatial_chunks(xs, ys, chunk_size)
+
+    sizes = np.bincount(chunk_of, minlength=chunk_count)
+    assert len(sizes) == chunk_count and sizes.max() <= chunk_size
+    assert sizes.min() >= min(chunk_size, 300) // 2 # Median splits
+
+    # k-d tree leaves: the bounding boxes of two chunks never cross
+    boxes = [shapely.box(*shapely.total_bounds(shapely.points(
+        [(x, y) for x, y, c in zip(xs, ys, chunk_of) if c == chunk]
+    ))) for chunk in range(chunk_count)]
+    tree = shapely.STRtree(boxes)
+    left, right = tree.query(boxes, predicate='overlaps')
+    assert len(left) == 0
+
+def test_chunk_stats_bulk_matches_create_dicts_bulk():
+    fids, geoms = gapped_squares(6)
+    centroid_dict, neighbours_dict = create_dicts_bulk(fids, shapely.to_wkb(geoms), [1.0] * len(fids), tolerance=1.0)
+
+    bounds = [tuple(shapely.bounds(geom)) for geom in geoms]
+    chunk_of, chunk_count = spatial_chunks([(b[0] + b[2]) / 2 for b in bounds], [(b[1] + b[3]) / 2 for b in bounds], 8)
+
+    pairs = {}
+    for chunk in range(chunk_count):
+        home = {k for k in fids if chunk_of[k] == chunk}
+        xmin, ymin, xmax, ymax = chunk_box(bounds, home, tolerance=1.0)
+        halo = {k: Geometry(geoms[k]) for k, b in enumerate(bounds) if b[0] <= xmax and b[2] >= xmin and b[1] <= ymax and b[3] >= ymin}
+
+        stats, chunk_pairs = chunk_stats_bulk(halo, home, tolerance=1.0)
+
+        assert set(stats) == home
+        for fid, (x, y, perimeter) in stats.items():
+            assert (x, y) == pytest.approx((centroid_dict[fid]['x'], centroid_dict[fid]['y']))
+            assert perimeter == pytest.approx(centroid_dict[fid]['perimeter'])
+        for id1, id2, length in chunk_pairs:
+            assert id1 in home
+            pairs.setdefault(id1, {})[id2] = length
+
+    assert pairs == {fid: neighbours for fid, neighbours in neighbours_dict.items() if neighbours} # Snapped: exact lengths
+
+@pytest.fixture(scope='module')
+def qgis_application():
+    qgis_core = pytest.importorskip('qgis.core')
+    application = qgis_core.QgsApplication([], False)
+    application.initQgis()
+    yield qgis_core
+    application.exitQgis()
+
+def memory_layer(qgis_core, geoms, values):
+    layer = qgis_core.QgsVectorLayer("Polygon?field=value:double", "squares", "memory")
+    features = []
+    for geom, value in zip(geoms, values):
+        feature = qgis_core.QgsFeature(layer.fields())
+        feature.setGeometry(qgis_core.QgsGeometry.fromWkt(shapely.to_wkt(geom)))
+        feature['value'] = value
+        features.append(feature)
+    layer.dataProvider().addFeatures(features)
+    return layer
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_chunked_neighbours_match_bulk_with_tolerance(qgis_application, bulk):
+    from dorling_cartogram.preprocessing import create_dicts_chunked
+
+    fids, geoms = gapped_squares(8)
+    values = [float(k + 1) for k in fids]
+    layer = memory_layer(qgis_application, geoms, values)
+    layer_fids = [feature.id() for feature in layer.getFeatures()]
+
+    _, expected = create_dicts_bulk(layer_fids, shapely.to_wkb(geoms), values, tolerance=1.0)
+    _, chunked = create_dicts_chunked(layer, 'value', chunk_size=5, tolerance=1.0, bulk=bulk)
+
+    assert {fid: set(neighbours) for fid, neighbours in chunked.items()} == {fid: set(neighbours) for fid, neighbours in expected.items()}
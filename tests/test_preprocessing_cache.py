@@ -0,0 +1,74 @@
+from dorling_cartogram.preprocessing_cache import INVALIDATING_SIGNALS, PreprocessingCache
+
+class Signal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot):
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+class Layer:
+    """The parts of QgsVectorLayer used by the cache."""
+
+    def __init__(self, layer_id, subset=''):
+        self.layer_id = layer_id
+        self.subset = subset
+        for name in INVALIDATING_SIGNALS:
+            setattr(self, name, Signal())
+
+    def id(self):
+        return self.layer_id
+
+    def subsetString(self):
+        return self.subset
+
+    def selectedFeatureIds(self):
+        return []
+
+def result():
+    return {1: {'x': 0.0, 'y': 0.0}}, {1: {}}
+
+def test_hit_returns_a_fresh_copy():
+    cache, layer = PreprocessingCache(), Layer('a')
+    key = cache.key(layer, 'pop', tolerance=0.0)
+    cache.put(key, layer, *result())
+
+    centroid_dict, _ = cache.get(key)
+    centroid_dict[1]['x'] = 5.0
+    assert cache.get(key)[0][1]['x'] == 0.0
+
+def test_subset_string_is_part_of_the_key():
+    cache, layer = PreprocessingCache(), Layer('a', subset='"pop" > 10')
+    cache.put(cache.key(layer, 'pop'), layer, *result())
+
+    layer.subset = '"pop" > 100'
+    assert cache.get(cache.key(layer, 'pop')) is None
+
+def test_layer_changes_invalidate_its_entries():
+    for name in INVALIDATING_SIGNALS:
+        cache, layer, other = PreprocessingCache(), Layer('a'), Layer('b')
+        cache.put(cache.key(layer, 'pop'), layer, *result())
+        cache.put(cache.key(other, 'pop'), other, *result())
+
+        getattr(layer, name).emit()
+
+        assert cache.get(cache.key(layer, 'pop')) is None, name
+        assert cache.get(cache.key(other, 'pop')) is not None, name
+        assert not getattr(layer, name).slots
+
+def test_clear_drops_every_entry():
+    cache, layer = PreprocessingCache(), Layer('a')
+    key = cache.key(layer, 'pop')
+    cache.put(key, layer, *result())
+
+    cache.clear()
+
+    assert cache.get(key) is None and cache.size == 0
+    assert all(not getattr(layer, name).slots for name in INVALIDATING_SIGNALS)
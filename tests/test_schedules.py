@@ -0,0 +1,32 @@
+import pytest
+
+from dorling_cartogram.schedules import SCHEDULES, make_schedule
+
+@pytest.mark.parametrize('schedule', SCHEDULES)
+def test_schedule_ends_on_requested_values(schedule):
+    parameters = make_schedule(schedule, 0.25, 0.4, 50)
+    displacement = None
+    for i in range(1, 51):
+        friction, ratio = parameters(i, displacement)
+        displacement = 100.0 / i
+    assert (friction, ratio) == pytest.approx((0.25, 0.4))
+
+@pytest.mark.parametrize('schedule', ['linear', 'exponential', 'displacement'])
+def test_schedule_starts_on_start_values(schedule):
+    parameters = make_schedule(schedule, 0.25, 0.4, 50, start_friction=0.8, start_ratio=0.1)
+    assert parameters(1, None) == pytest.approx((0.8, 0.1))
+
+def test_displacement_schedule_progress_never_goes_back():
+    parameters = make_schedule('displacement', 0.25, 0.4, 100)
+    ratios = [parameters(i, displacement)[1] for i, displacement in enumerate([None, 100.0, 50.0, 80.0, 20.0, 90.0], 1)]
+    assert ratios == sorted(ratios)
+    assert parameters.state == {'first': 100.0, 'progress': pytest.approx(0.8)}
+
+def test_unknown_schedule_is_rejected():
+    with pytest.raises(ValueError):
+        make_schedule('cosine', 0.25, 0.4, 50)
+
+@pytest.mark.parametrize('decay', [0, -1.0])
+def test_exponential_schedule_rejects_non_positive_decay(decay):
+    with pytest.raises(ValueError):
+        make_schedule('exponential', 0.25, 0.4, 50, decay=decay)
@@ -0,0 +1,219 @@
+import sqlite3
+import struct
+
+import pytest
+
+shapely = pytest.importorskip('shapely')
+
+from dorling_cartogram import service
+from dorling_cartogram.reprojection import HAS_PYPROJ, array_transformer
+from dorling_cartogram.service import (
+    DEFAULTS, gpkg_wkb, parse_bool, parse_params, preprocess_task, project, read_geojson, read_geopackage, simulate_task
+)
+
+needs_pyproj = pytest.mark.skipif(not HAS_PYPROJ, reason="pyproj is not installed")
+
+def square(x, y, size=1.0):
+    return {'type': 'Polygon', 'coordinates': [[[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]]}
+
+def collection(*values, x=0.0, y=0.0, size=1.0):
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'geometry': square(x + k * size, y, size), 'properties': {'pop': value}}
+            for k, value in enumerate(values)
+        ]
+    }
+
+def gpkg_blob(wkb, envelope=(), empty=False):
+    """GeoPackage geometry blob: header (little endian), envelope, WKB."""
+    envelope_code = {0: 0, 4: 1, 6: 2, 8: 4}[len(envelope)]
+    flags = 0b1 | envelope_code << 1 | (0b10000 if empty else 0)
+    return b'GP' + bytes([0, flags]) + struct.pack('<i', 4326) + struct.pack(f'<{len(envelope)}d', *envelope) + wkb
+
+def geopackage(path, tables, srs_id=3857):
+    """Minimal GeoPackage: { table name: [(fid, geometry, pop)] } feature tables, and one attribute table."""
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE gpkg_spatial_ref_sys (srs_id INTEGER, organization TEXT, organization_coordsys_id INTEGER, definition TEXT)"
+    )
+    connection.executemany("INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?)", [
+        (-1, 'NONE', -1, 'undefined'), (0, 'NONE', 0, 'undefined'), (3857, 'EPSG', 3857, ''), (4326, 'epsg', 4326, '')
+    ])
+    connection.execute("CREATE TABLE gpkg_contents (table_name TEXT, data_type TEXT, srs_id INTEGER)")
+    connection.execute("CREATE TABLE gpkg_geometry_columns (table_name TEXT, column_name TEXT, srs_id INTEGER)")
+    connection.execute("CREATE TABLE secrets (fid INTEGER PRIMARY KEY, geom BLOB, pop REAL)")
+    connection.execute("INSERT INTO gpkg_contents VALUES ('secrets', 'attributes', 0)")
+    for name, rows in tables.items():
+        quoted = '"' + name.replace('"', '""') + '"'
+        connection.execute(f"CREATE TABLE {quoted} (fid INTEGER PRIMARY KEY, geom BLOB, pop REAL)")
+        connection.execute("INSERT INTO gpkg_contents VALUES (?, 'features', ?)", (name, srs_id))
+        connection.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', ?)", (name, srs_id))
+        connection.executemany(
+            f"INSERT INTO {quoted} VALUES (?, ?, ?)",
+            [(fid, gpkg_blob(shapely.to_wkb(geometry)), pop) for fid, geometry, pop in rows]
+        )
+    connection.commit()
+    connection.close()
+    return str(path)
+
+# --- Parameters ---
+
+def test_defaults_are_valid():
+    assert parse_params({}) == DEFAULTS
+
+def test_numeric_strings_are_accepted():
+    params = parse_params({'friction': '0.5', 'iterations': '50', 'tolerance': 2, 'remove_overlaps': 'true'})
+    assert params == {'friction': 0.5, 'ratio': 0.4, 'iterations': 50, 'tolerance': 2.0, 'remove_overlaps': True}
+
+@pytest.mark.parametrize('name, value, message', [
+    ('iterations', 0, "'iterations' must be at least 1"),
+    ('iterations', -5, "'iterations' must be at least 1"),
+    ('iterations', 2.5, "'iterations' must be an integer"),
+    ('iterations', True, "'iterations' must be an integer"),
+    ('iterations', 'many', "'iterations' must be an integer"),
+    ('friction', -0.1, "'friction' must be between 0 and 1"),
+    ('friction', 1.5, "'friction' must be between 0 and 1"),
+    ('ratio', 2, "'ratio' must be between 0 and 1"),
+    ('ratio', None, "'ratio' must be a number"),
+    ('tolerance', -1, "'tolerance' must be at least 0"),
+    ('tolerance', 'inf', "'tolerance' must be a number"),
+    ('tolerance', 'nan', "'tolerance' must be a number"),
+])
+def test_invalid_parameters_are_rejected(name, value, message):
+    with pytest.raises(ValueError, match=message):
+        parse_params({name: value})
+
+@pytest.mark.parametrize('value, expected', [
+    (True, True), (False, False), (1, True), (0, False), ('true', True), (' False ', False), ('1', True), ('0', False)
+])
+def test_parse_bool(value, expected):
+    assert parse_bool(value, 'remove_overlaps') is expected
+
+@pytest.mark.parametrize('value', [2, 'yes', None, 1.0])
+def test_parse_bool_rejects(value):
+    with pytest.raises(ValueError, match="'remove_overlaps' must be a boolean"):
+        parse_bool(value, 'remove_overlaps')
+
+# --- Input readers ---
+
+def test_read_geojson():
+    data = collection(10, '2.5', None)
+    data['features'][1]['id'] = 'b'
+    data['features'].append({'type': 'Feature', 'geometry': None, 'properties': {'pop': 1}})
+
+    fids, wkbs, values, crs = read_geojson(data, 'pop')
+
+    assert fids == [0, 'b', 2] and crs == 'EPSG:4326'
+    assert values == [10.0, 2.5, 0.0]
+    assert shapely.from_wkb(wkbs[1]).equals(shapely.geometry.shape(square(1, 0)))
+
+def test_read_geojson_legacy_crs():
+    data = collection(1)
+    data['crs'] = {'type': 'name', 'properties': {'name': 'urn:ogc:def:crs:EPSG::3857'}}
+    assert read_geojson(data, 'pop')[3] == 'urn:ogc:def:crs:EPSG::3857'
+
+def test_read_geojson_rejects_duplicate_ids():
+    data = collection(1, 2)
+    data['features'][1]['id'] = 0
+    with pytest.raises(ValueError, match="Duplicate feature id 0"):
+        read_geojson(data, 'pop')
+
+def test_read_geojson_rejects_non_numeric_values():
+    with pytest.raises(ValueError, match="Field 'pop' of feature 1 is not a number: 'n/a'"):
+        read_geojson(collection(1, 'n/a'), 'pop')
+
+@pytest.mark.parametrize('envelope', [(), (0, 1, 0, 1), (0, 1, 0, 1, 0, 0), (0, 1, 0, 1, 0, 0, 0, 0)])
+def test_gpkg_wkb_skips_the_envelope(envelope):
+    wkb = shapely.to_wkb(shapely.Point(3, 4))
+    assert gpkg_wkb(gpkg_blob(wkb, envelope)) == wkb
+
+def test_gpkg_wkb_empty_and_invalid():
+    wkb = shapely.to_wkb(shapely.Point(3, 4))
+    assert gpkg_wkb(None) is None
+    assert gpkg_wkb(b'XX' + bytes(10)) is None
+    assert gpkg_wkb(gpkg_blob(wkb, empty=True)) is None
+
+    blob = bytearray(gpkg_blob(wkb))
+    blob[3] |= 5 << 1 # Reserved envelope code
+    with pytest.raises(ValueError, match="Invalid GeoPackage geometry header"):
+        gpkg_wkb(bytes(blob))
+
+def test_read_geopackage(tmp_path):
+    rows = [(3, shapely.box(0, 0, 1, 1), 5.0), (7, shapely.box(1, 0, 2, 1), None)]
+    path = geopackage(tmp_path / 'data.gpkg', {'regions': rows, 'say "hi"': rows[:1]})
+
+    fids, wkbs, values, crs = read_geopackage(path, 'pop')
+    assert fids == [3, 7] and values == [5.0, 0.0] and crs == 'EPSG:3857'
+    assert shapely.from_wkb(wkbs[0]).equals(rows[0][1])
+
+    fids, _, _, _ = read_geopackage(path, 'pop', 'say "hi"')
+    assert fids == [3]
+
+@pytest.mark.parametrize('layer', ['secrets', 'missing', 'regions" UNION SELECT fid, geom, pop FROM "secrets', 'regions; --'])
+def test_read_geopackage_only_reads_feature_tables(tmp_path, layer):
+    path = geopackage(tmp_path / 'data.gpkg', {'regions': [(1, shapely.box(0, 0, 1, 1), 1.0)]})
+    with pytest.raises(ValueError, match="No feature table"):
+        read_geopackage(path, 'pop', layer)
+
+def test_read_geopackage_rejects_missing_fields(tmp_path):
+    path = geopackage(tmp_path / 'data.gpkg', {'regions': [(1, shapely.box(0, 0, 1, 1), 1.0)]})
+    with pytest.raises(ValueError, match="No field 'area' in 'regions'"):
+        read_geopackage(path, 'area')
+
+@pytest.mark.parametrize('srs_id, crs', [(4326, 'EPSG:4326'), (0, None), (-1, None)])
+def test_read_geopackage_crs(tmp_path, srs_id, crs):
+    path = geopackage(tmp_path / 'data.gpkg', {'regions': [(1, shapely.box(0, 0, 1, 1), 1.0)]}, srs_id)
+    assert read_geopackage(path, 'pop')[3] == crs
+
+# --- Reprojection ---
+
+def wkbs_of(data):
+    return read_geojson(data, 'pop')[1]
+
+@pytest.mark.parametrize('crs', [None, 'EPSG:3857'])
+def test_projected_input_is_kept(crs):
+    assert project(wkbs_of(collection(1, 2, x=5e5, size=1e3)), crs) == (None, None)
+
+@needs_pyproj
+def test_geographic_input_is_projected_to_equal_area():
+    wkbs = wkbs_of(collection(1, 2, 3, x=9.85, y=50.0, size=0.1))
+    transform, crs = project(wkbs, 'EPSG:4326')
+
+    assert crs[0] == 'EPSG:4326' and crs[1].startswith('+proj=laea +lat_0=50.050000 +lon_0=10.000000')
+
+    # Areas in m2 match the geodesic areas, and the transformation goes back to the input
+    geoms = shapely.from_wkb(wkbs)
+    projected = shapely.transform(geoms, transform)
+    geod = __import__('pyproj').Geod(ellps='WGS84')
+    for geom, area in zip(geoms, shapely.area(projected)):
+        assert area == pytest.approx(abs(geod.geometry_area_perimeter(geom)[0]), rel=1e-6)
+    back = shapely.transform(projected, array_transformer(crs[1], crs[0]))
+    assert shapely.get_coordinates(back) == pytest.approx(shapely.get_coordinates(geoms), abs=1e-8) # About 1 mm
+
+@needs_pyproj
+def test_geographic_cartogram_is_returned_in_longitude_latitude():
+    data = collection(4, 1, 9, 2, x=9.8, y=50.0, size=0.1)
+    centroid_dict, neighbours_dict, ids, crs = preprocess_task({'geojson': data}, 'pop')
+
+    # Centroids in metres, around the centre of the projection
+    assert abs(centroid_dict[0]['x'] - centroid_dict[1]['x']) == pytest.approx(7160, rel=0.01)
+
+    features = simulate_task(centroid_dict, neighbours_dict, ids, parse_params({'iterations': 20}), crs)
+    lon, lat = features[0]['geometry']['coordinates']
+    assert 9.6 < lon < 10.4 and 49.8 < lat < 50.3
+    assert features[2]['properties']['radius'] > 1000 # Metres
+
+def test_projected_coordinates_declared_geographic_are_rejected():
+    with pytest.raises(ValueError, match="set 'crs' for projected input"):
+        project(wkbs_of(collection(1, x=5e5, size=1e3)), 'EPSG:4326')
+
+@needs_pyproj
+def test_unknown_crs_is_rejected():
+    with pytest.raises(ValueError, match="Unknown CRS 'EPSG:99999999'"):
+        project(wkbs_of(collection(1)), 'EPSG:99999999')
+
+def test_geographic_input_without_pyproj_is_rejected(monkeypatch):
+    monkeypatch.setattr(service, 'HAS_PYPROJ', False)
+    with pytest.raises(ValueError, match="needs pyproj"):
+        project(wkbs_of(collection(1)), 'EPSG:4326')
@@ -0,0 +1,44 @@
+import math
+
+import pytest
+
+from conftest import copy_dict
+
+from dorling_cartogram.dorling_core import compute_dorling
+from dorling_cartogram.sweep import parameter_sweep, score_layout
+
+def test_score_layout_on_a_known_layout():
+    centroid_dict = {
+        fid: {'x': x, 'y': y, 'x_orig': x, 'y_orig': 0.0, 'radius_scaled': 1.0}
+        for fid, (x, y) in enumerate([(0, 0), (1, 0), (10, 3), (12.01, 0)])
+    }
+    neighbours_dict = {0: {1: 1.0}, 1: {0: 1.0}, 2: {3: 1.0}, 3: {2: 1.0}}
+
+    metrics = score_layout(centroid_dict, neighbours_dict)
+
+    # Overlap of circles 0-1, half the neighbours touching, mean displacement 0.75 for a radius of 1
+    overlap_ratio = (2 * math.pi / 3 - math.sqrt(3) / 2) / (4 * math.pi)
+    assert metrics['overlap_ratio'] == pytest.approx(overlap_ratio)
+    assert metrics['score'] == pytest.approx(overlap_ratio + 0.5 + 0.1 * 0.75)
+
+def test_score_layout_without_radii():
+    centroid_dict = {fid: {'x': fid, 'y': 1.0, 'x_orig': fid, 'y_orig': 0.0, 'radius_scaled': 0.0} for fid in range(2)}
+    # No displacement term (no mean radius to scale it), only the lost contact
+    assert score_layout(centroid_dict, {0: {1: 1.0}, 1: {0: 1.0}})['score'] == pytest.approx(1.0)
+
+def test_sweep_ranks_runs_and_returns_the_best_layout(layout):
+    centroid_dict, neighbours_dict = layout
+    original = copy_dict(centroid_dict)
+
+    rows, best_dict = parameter_sweep(centroid_dict, neighbours_dict, [0.1, 0.4], [0.4], [20, 60], processes=2)
+
+    assert len(rows) == 4
+    assert [row['score'] for row in rows] == sorted(row['score'] for row in rows)
+    assert centroid_dict == original # Not modified
+
+    # The best layout is the one of a sequential run with the best parameters
+    best = rows[0]
+    expected = copy_dict(original)
+    compute_dorling(expected, neighbours_dict, best['friction'], best['ratio'], best['iterations'], index='grid')
+    assert {fid: (p['x'], p['y']) for fid, p in best_dict.items()} == {fid: (p['x'], p['y']) for fid, p in expected.items()}
+    assert score_layout(best_dict, neighbours_dict)['score'] == best['score']
@@ -0,0 +1,42 @@
+import pytest
+
+from conftest import copy_dict
+from dorling_cartogram.dorling_core import compute_dorling
+from dorling_cartogram.tiled import compute_dorling_tiled
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_tiled_matches_single_domain(layout, processes):
+    centroid_dict, neighbours_dict = layout
+
+    single = copy_dict(centroid_dict)
+    compute_dorling(single, neighbours_dict, iterations=20, index='grid')
+    tiled = copy_dict(centroid_dict)
+    compute_dorling_tiled(tiled, neighbours_dict, iterations=20, tiles=4, processes=processes, exchange_every=1)
+
+    for fid, props in single.items():
+        assert tiled[fid]['x'] == pytest.approx(props['x'], abs=1e-9)
+        assert tiled[fid]['y'] == pytest.approx(props['y'], abs=1e-9)
+
+@pytest.mark.parametrize('option', ['tiles', 'processes', 'exchange_every'])
+@pytest.mark.parametrize('value', [0, -1])
+def test_tiled_rejects_values_below_one(layout, option, value):
+    centroid_dict, neighbours_dict = layout
+    with pytest.raises(ValueError):
+        compute_dorling_tiled(copy_dict(centroid_dict), neighbours_dict, iterations=5, **{option: value})
+
+def test_tiled_without_circles():
+    assert compute_dorling_tiled({}, {}, iterations=5, processes=2)['exchanges'] == 0
+    assert compute_dorling({}, {}, iterations=5, index='grid') == 0
+
+def test_more_tiles_than_circles(layout):
+    centroid_dict, neighbours_dict = layout
+    few = {fid: dict(centroid_dict[fid]) for fid in (0, 1, 8)}
+    few_neighbours = {fid: {other: length for other, length in neighbours_dict[fid].items() if other in few} for fid in few}
+
+    single = copy_dict(few)
+    compute_dorling(single, few_neighbours, iterations=10, index='grid')
+    stats = compute_dorling_tiled(few, few_neighbours, iterations=10, tiles=8, processes=2)
+
+    assert stats['tiles'] == 3
+    for fid, props in single.items():
+        assert few[fid]['x'] == pytest.approx(props['x'], abs=1e-9)
@@ -0,0 +1,324 @@
+"""
+    Domain-decomposed solver: tiles simulated in parallel, with halo exchange.
+
+    For continental layers, one simulation over all circles is too slow and too large for
+    a single process. compute_dorling_tiled splits the circles into spatial tiles and hands
+    them to worker processes, each keeping only its own tiles in memory:
+
+    - tiles are balanced k-d leaves of the centroids (see preprocessing.spatial_chunks)
+    - each tile moves its own circles with dorling_iteration. Circles of other tiles that
+      may interact with them form the tile's halo: they repel and attract the tile's circles,
+      but stay frozen (active_ids)
+    - every 'exchange_every' iterations, tiles send the positions of their boundary circles
+      to the coordinator, which routes them to the tiles whose halo needs them
+
+    The halo of a tile holds the circles of other tiles whose centre lies within reach of
+    the tile (its centre bounding box, widened by the circle radius, the tile's largest
+    radius and a margin for the moves between two exchanges), and its geographic neighbours
+    from other tiles (for attraction). Halos are rebuilt at every exchange, so circles
+    can drift across tile borders.
+
+    Between two exchanges halo positions are stale: with exchange_every=1 the result follows
+    the single-domain compute_dorling (grid broad phase) closely; larger values trade accuracy
+    for fewer exchanges (see benchmark.benchmark_tiled).
+
+    Workers do not need QGIS.
+"""
+import math
+import multiprocessing
+import os
+import time
+
+from .broad_phase import GridIndex
+from .dorling_core import dorling_iteration
+from .preprocessing import spatial_chunks
+from .schedules import make_schedule
+from .sweep import python_executable
+
+def compute_dorling_tiled(centroid_dict, neighbours_dict, friction=0.25, ratio=0.4, iterations=200,
+                          tiles=None, processes=None, exchange_every=1, schedule='constant', schedule_options=None):
+    """
+    Run the Dorling iterations over spatial tiles in parallel worker processes.
+
+    Args:
+        centroid_dict (dict): Dictionary of centroids (see compute_dorling), updated in place.
+        neighbours_dict (dict): Neighbour pairs with shared border lengths.
+        friction (float): Damping factor applied to motion vectors.
+        ratio (float): Balance between repulsion and attraction forces.
+        iterations (int): Number of iterations to run.
+        tiles (int): Approximate number of tiles (defaults to the number of processes).
+        processes (int): Number of worker processes (defaults to the CPU count, at most one per tile).
+        exchange_every (int): Number of iterations between two halo exchanges.
+        schedule (str): Cooling schedule (see schedules.py). The 'displacement' schedule sees
+            the total displacement of the last exchange.
+        schedule_options (dict): Optional arguments of make_schedule.
+
+    Returns:
+        dict: Statistics of the run { 'tiles', 'processes', 'exchanges', 'halo_mean', 'tile_seconds' },
+            with tile_seconds the CPU time of each tile at each exchange.
+
+    Raises:
+        ValueError: tiles, processes or exchange_every is below 1.
+    """
+
+    # Start the timer to measure execution time
+    start_time = time.time()
+
+    # Every round must run at least one iteration, otherwise the coordinator never ends
+    for name, value in (('tiles', tiles), ('processes', processes), ('exchange_every', exchange_every)):
+        if value is not None and value < 1:
+            raise ValueError(f"{name} must be at least 1, got {value}")
+
+    processes = processes or os.cpu_count() or 1
+    tiles = tiles or processes
+
+    # Nothing to solve
+    if not centroid_dict:
+        return {'tiles': 0, 'processes': 0, 'exchanges': 0, 'halo_mean': 0.0, 'tile_seconds': []}
+
+    # --- Tiles: balanced k-d split of the centroids ---
+    fids = list(centroid_dict)
+    chunk_of, _ = spatial_chunks(
+        [centroid_dict[fid]['x'] for fid in fids], [centroid_dict[fid]['y'] for fid in fids],
+        math.ceil(len(fids) / tiles)
+    )
+
+    # Empty chunks have nothing to solve (and no bounding box): tiles are the chunks in use
+    tile_number = {chunk: tile for tile, chunk in enumerate(sorted(set(chunk_of)))}
+    tile_of = {fid: tile_number[chunk] for fid, chunk in zip(fids, chunk_of)}
+    tile_count = len(tile_number)
+    processes = min(processes, tile_count)
+
+    states = {tile: {'ids': [], 'owned': {}, 'neighbours': {}, 'needed_by': {}} for tile in range(tile_count)}
+    for fid in fids:
+        state = states[tile_of[fid]]
+        state['ids'].append(fid)
+        state['owned'][fid] = dict(centroid_dict[fid])
+        state['neighbours'][fid] = neighbours_dict.get(fid, {})
+
+    # Geographic neighbours in another tile are always in its halo (attraction)
+    for fid in fids:
+        tile = tile_of[fid]
+        for neighbour in neighbours_dict.get(fid, ()):
+            other = tile_of[neighbour]
+            if other != tile:
+                states[tile]['needed_by'].setdefault(other, set()).add(fid)
+
+    # --- Initial halos, from the starting positions ---
+    boxes = {tile: tile_box(state['owned']) for tile, state in states.items()}
+    halos = route_exports({tile: halo_exports(state['owned'], tile, boxes, state['needed_by']) for tile, state in states.items()}, tile_count)
+
+    # --- Workers, each owning the tiles tile % processes == worker ---
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(python_executable())
+
+    connections, workers = [], []
+    for worker in range(processes):
+        parent, child = context.Pipe()
+        worker_tiles = {tile: states[tile] for tile in range(worker, tile_count, processes)}
+        process = context.Process(target=tile_worker, args=(child, worker_tiles), daemon=True)
+        process.start()
+        child.close()
+        connections.append((parent, list(worker_tiles)))
+        workers.append(process)
+
+    parameters = make_schedule(schedule, friction, ratio, iterations, **(schedule_options or {}))
+    total_displacement = None
+    exchanges = 0
+    halo_sizes = []
+    tile_seconds = []
+
+    try:
+        # --- Rounds of exchange_every iterations, then a halo exchange ---
+        i = 1
+        while i <= iterations:
+            round_parameters = [parameters(j, total_displacement) for j in range(i, min(i + exchange_every, iterations + 1))]
+            halo_sizes.append(sum(len(halo) for halo in halos.values()) / tile_count)
+
+            for connection, worker_tiles in connections:
+                connection.send(({tile: halos[tile] for tile in worker_tiles}, boxes, round_parameters))
+
+            exports = {}
+            total_displacement = 0.0
+            seconds = {}
+            for connection, _ in connections:
+                for tile, (box, displacement, tile_exports, elapsed) in connection.recv().items():
+                    boxes[tile] = box
+                    exports[tile] = tile_exports
+                    seconds[tile] = elapsed
+                    total_displacement += displacement
+            halos = route_exports(exports, tile_count)
+            tile_seconds.append(seconds)
+
+            exchanges += 1
+            i += len(round_parameters)
+
+        # --- Final positions ---
+        for connection, _ in connections:
+            connection.send(None)
+        for connection, _ in connections:
+            for fid, (x, y, xvec, yvec) in connection.recv().items():
+                props = centroid_dict[fid]
+                props['x'], props['y'], props['xvec'], props['yvec'] = x, y, xvec, yvec
+
+    finally:
+        for process in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    halo_mean = sum(halo_sizes) / len(halo_sizes) if halo_sizes else 0.0
+
+    # End the timer and display the execution time
+    end_time = time.time()
+    print(
+        f"[DorlingCartogram] Tiled iterations completed in {end_time - start_time:.2f} seconds "
+        f"({tile_count} tiles, {processes} processes, {exchanges} exchanges, {halo_mean:.0f} halo circles per tile)"
+    )
+
+    return {'tiles': tile_count, 'processes': processes, 'exchanges': exchanges, 'halo_mean': halo_mean, 'tile_seconds': tile_seconds}
+
+def tile_worker(connection, tiles):
+    """
+    Worker process: run the rounds of its tiles until the coordinator sends None.
+
+    Args:
+        connection (Connection): Pipe to the coordinator.
+        tiles (dict): { tile: state } owned by this worker.
+    """
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        halos, boxes, round_parameters = message
+        replies = {}
+        for tile, state in tiles.items():
+            replies[tile] = run_tile(state, tile, halos[tile], boxes, round_parameters)
+        connection.send(replies)
+
+    # Send back the final state of the owned circles
+    connection.send({
+        fid: (props['x'], props['y'], props['xvec'], props['yvec'])
+        for state in tiles.values() for fid, props in state['owned'].items()
+    })
+    connection.close()
+
+def run_tile(state, tile, halo, boxes, round_parameters):
+    """
+    Run the iterations of a round on one tile, its halo being frozen.
+
+    Args:
+        state (dict): Tile state { 'ids', 'owned', 'neighbours', 'needed_by' }.
+        tile (int): Tile number.
+        halo (dict): { fid: (x, y, r) } circles of other tiles.
+        boxes (dict): Reach of every tile (see tile_box).
+        round_parameters (list): (friction, ratio) of each iteration.
+
+    Returns:
+        box (tuple): Reach of the tile after the round.
+        displacement (float): Total displacement of the last iteration.
+        exports (dict): { other_tile: { fid: (x, y, r) } } boundary circles for the other tiles.
+        elapsed (float): CPU time of the round (not counting the time waiting for a core).
+    """
+
+    start_time = time.process_time()
+
+    # Owned circles and the frozen halo
+    local = dict(state['owned'])
+    for fid, (x, y, r) in halo.items():
+        local[fid] = {'x': x, 'y': y, 'radius_scaled': r}
+    rmax = max(props['radius_scaled'] for props in local.values())
+
+    displacement = 0.0
+    for friction, ratio in round_parameters:
+        index = GridIndex(local)
+        displacement = dorling_iteration(local, state['neighbours'], index, rmax, friction, ratio, active_ids=state['ids'])
+
+    box = tile_box(state['owned'])
+    exports = halo_exports(state['owned'], tile, boxes, state['needed_by'])
+
+    return box, displacement, exports, time.process_time() - start_time
+
+def tile_box(owned):
+    """
+    Reach of a tile: bounding box of its centres and largest radius.
+
+    Returns:
+        tuple: (xmin, ymin, xmax, ymax, rmax)
+    """
+
+    xs = [props['x'] for props in owned.values()]
+    ys = [props['y'] for props in owned.values()]
+    rmax = max(props['radius_scaled'] for props in owned.values())
+    return (min(xs), min(ys), max(xs), max(ys), rmax)
+
+def halo_exports(owned, tile, boxes, needed_by):
+    """
+    Select the circles of a tile that belong to the halo of other tiles.
+
+    A circle of radius r is sent to another tile when it is one of the geographic neighbours
+    of its circles, or when its centre lies within r + 2 * rmax of the other tile's centre
+    bounding box (rmax of the other tile: one for the overlap, one as a margin for the moves
+    before the next exchange).
+
+    Args:
+        owned (dict): { fid: props } circles of the tile.
+        tile (int): Tile number.
+        boxes (dict): { tile: (xmin, ymin, xmax, ymax, rmax) } reach of every tile.
+        needed_by (dict): { other_tile: set of fids } geographic neighbours of other tiles.
+
+    Returns:
+        dict: { other_tile: { fid: (x, y, r) } }
+    """
+
+    own_xmin, own_ymin, own_xmax, own_ymax, own_rmax = boxes[tile]
+    exports = {}
+
+    for other, (xmin, ymin, xmax, ymax, other_rmax) in boxes.items():
+        if other == tile:
+            continue
+
+        needed = needed_by.get(other, ())
+        margin = 2 * other_rmax
+
+        # Tiles too far apart only exchange geographic neighbours
+        reach = own_rmax + margin
+        near = not (own_xmin - reach > xmax or own_xmax + reach < xmin or own_ymin - reach > ymax or own_ymax + reach < ymin)
+
+        selected = {}
+        if near:
+            for fid, props in owned.items():
+                x, y, r = props['x'], props['y'], props['radius_scaled']
+                w = r + margin
+                if fid in needed or (xmin - w <= x <= xmax + w and ymin - w <= y <= ymax + w):
+                    selected[fid] = (x, y, r)
+        else:
+            for fid in needed:
+                props = owned[fid]
+                selected[fid] = (props['x'], props['y'], props['radius_scaled'])
+
+        if selected:
+            exports[other] = selected
+
+    return exports
+
+def route_exports(exports, tile_count):
+    """
+    Gather the exports of all tiles into the halo of each tile.
+
+    Args:
+        exports (dict): { tile: { other_tile: { fid: (x, y, r) } } }
+        tile_count (int): Number of tiles.
+
+    Returns:
+        dict: { tile: { fid: (x, y, r) } }
+    """
+
+    halos = {tile: {} for tile in range(tile_count)}
+    for tile_exports in exports.values():
+        for other, selected in tile_exports.items():
+            halos[other].update(selected)
+
+    return halos